@@ -2,22 +2,52 @@
 Dashboard TV App – aplicație Python care actualizează directorul WORKSPACE
 (al echipe, playlist-uri) pentru Digital Signage. Rulează local; poate fi împachetată ca .exe cu PyInstaller.
 """
+import atexit
+import functools
+import hashlib
 import json
+import math
+import multiprocessing
 import os
 import shutil
 import subprocess
+import threading
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Callable, Optional, Tuple
 
 from dotenv import load_dotenv
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, g, jsonify, request, send_file, send_from_directory, stream_with_context
+from werkzeug.exceptions import ClientDisconnected
 from werkzeug.utils import secure_filename
 
+from browser_pool import BrowserPool
+from change_feed import ChangeFeed
+from chunked_upload import TEMP_PREFIX as UPLOAD_TEMP_PREFIX, UploadManager, UploadOffsetMismatch
+from conversion_cache import ConversionCache
+from git_queue import GitQueue
+from git_sparse import SparseSync
+from git_status import GitStatus
+from image_derivatives import DERIVED_DIR, ImageDerivatives, derived_dir, original_for
+from jobs import JobError, JobManager
+from json_store import JsonStore
+from media_offload import MediaOffload
+from media_store import MediaStore, save_stream
+from metrics import REGISTRY, UPLOAD_BYTES, timed_git
+from office_server import OfficeServer
+from pdf_render import PdfRenderer
+from profiling import RequestProfiler, safe_params
+from video_ingest import MP4_EXT, VideoIngest, mp4_layout
+from workspace_index import WorkspaceIndex
+
 load_dotenv()
 
 app = Flask(__name__, static_folder="static", template_folder="templates")
+# În spatele unui nginx/Apache configurat pentru X-Sendfile, fișierele media sunt trimise direct de server
+app.config["USE_X_SENDFILE"] = os.environ.get("MEDIA_X_SENDFILE", "0").strip().lower() in ("1", "true", "yes")
 
 # Calea către WORKSPACE (rădăcina proiectului TV_App = parent al acestui folder)
 BASE_DIR = Path(__file__).resolve().parent
@@ -38,6 +68,26 @@ TEAM_SECTION_DIRS = (
     "meeting_rooms",
     "traffic",
 )
+MEDIA_DIRS = ("documents", "photos", "videos", "stretching")
+
+# playlist.json / content.json: cache de documente parsate + scriere atomică (orjson dacă e instalat)
+json_store = JsonStore.from_env()
+
+# Index în memorie al WORKSPACE (watchdog + rescanare periodică); endpoint-urile de citire nu mai parcurg discul
+workspace_index = WorkspaceIndex.from_env(WORKSPACE_DIR, TEAM_SECTION_DIRS, MEDIA_DIRS)
+atexit.register(workspace_index.stop)
+
+
+# Foldere media deduplicate: fiecare conținut e stocat o singură dată, fișierele echipelor sunt hardlink-uri
+DEDUP_MEDIA_DIRS = ("photos", "videos", "stretching")
+media_store = MediaStore.from_env(WORKSPACE_DIR)
+atexit.register(media_store.flush)
+
+
+def _workspace_index() -> WorkspaceIndex:
+    """Indexul WORKSPACE, construit la prima utilizare (nu și în procesele worker de randare)."""
+    workspace_index.start()
+    return workspace_index
 
 
 def _team_path(name: str) -> Path:
@@ -51,17 +101,104 @@ def _team_path(name: str) -> Path:
     return p
 
 
+# Scrieri concurente: un lock per echipă + fișiere JSON scrise atomic (temp + rename)
+_team_locks: dict = {}
+_team_locks_guard = threading.Lock()
+
+
+def _team_lock(team_name: str) -> threading.RLock:
+    """Lock pentru scrierile unei echipe (playlist, secțiuni, creare / ștergere)."""
+    with _team_locks_guard:
+        lock = _team_locks.get(team_name)
+        if lock is None:
+            lock = _team_locks[team_name] = threading.RLock()
+        return lock
+
+
 @app.route("/")
 def index():
     return send_from_directory("templates", "dashboard.html")
 
 
+# Statusul calculat e refolosit până se schimbă mtime-ul unui fișier de intrare sau trece pragul de timp
+_restaurant_status_cache: dict = {}
+_restaurant_status_lock = threading.Lock()
+
+
+def _restaurant_status_inputs() -> tuple:
+    """Amprenta fișierelor de intrare: mtime restaurant_api_status.json + mtime-urile canteen_menu/content.json din index."""
+    p_status = WORKSPACE_DIR / "restaurant_api_status.json"
+    try:
+        status_mtime = p_status.stat().st_mtime_ns
+    except OSError:
+        status_mtime = None
+    index = _workspace_index()
+    teams = index.teams_with_content("canteen_menu")
+    return status_mtime, tuple((t, index.section_mtime(t, "canteen_menu")) for t in teams)
+
+
+def _compute_restaurant_status(now: datetime) -> Tuple[dict, datetime]:
+    """Returns (body, valid_until): the body stays correct until the inputs change or valid_until passes."""
+    cutoff_24h = now - timedelta(hours=24)
+    today_str = now.strftime("%Y-%m-%d")
+    yesterday_str = (now - timedelta(days=1)).strftime("%Y-%m-%d")
+    # "azi/ieri" se schimbă la miezul nopții (UTC)
+    valid_until = datetime(now.year, now.month, now.day, tzinfo=timezone.utc) + timedelta(days=1)
+    last_run_iso = None
+    ok = False
+    message = ""
+
+    # 1) Încearcă restaurant_api_status.json (lastRun în ultimele 24h)
+    p_status = WORKSPACE_DIR / "restaurant_api_status.json"
+    if p_status.exists():
+        try:
+            data = json_store.read(p_status)
+            last_run_iso = data.get("lastRun")
+            if last_run_iso:
+                try:
+                    dt = datetime.fromisoformat(last_run_iso.replace("Z", "+00:00"))
+                    if dt.tzinfo is None:
+                        dt = dt.replace(tzinfo=timezone.utc)
+                    if dt >= cutoff_24h:
+                        ok = True
+                        valid_until = min(valid_until, dt + timedelta(hours=24))
+                    last_run_iso = dt.isoformat()
+                except (ValueError, TypeError):
+                    pass
+        except Exception:
+            pass
+
+    # 2) Fallback: content.json per echipă, restaurantLastUpdated (azi sau ieri)
+    if not ok:
+        try:
+            for team_name in _workspace_index().teams_with_content("canteen_menu"):
+                content_path = WORKSPACE_DIR / team_name / "canteen_menu" / "content.json"
+                try:
+                    content = json_store.read(content_path)
+                    updated = (content.get("restaurantLastUpdated") or "").strip()
+                    if updated in (today_str, yesterday_str):
+                        ok = True
+                        if not last_run_iso:
+                            last_run_iso = f"{updated}T00:00:00+00:00"
+                        break
+                except Exception:
+                    continue
+        except Exception:
+            pass
+
+    if not message:
+        message = "OK" if ok else "Niciun update în ultimele 24h"
+
+    return {"ok": ok, "message": message, "lastRun": last_run_iso}, valid_until
+
+
 @app.route("/api/restaurant-status", methods=["GET"])
 def restaurant_status():
     """
     Status Restaurant of the Day: doar citire din WORKSPACE (Git), fără interfață grafică.
     OK (verde) dacă restaurantul e actualizat în ultimele 24h sau în ziua respectivă (azi/ieri);
     NOK (roșu) altfel. Folosește restaurant_api_status.json (lastRun) sau content.json (restaurantLastUpdated).
+    Răspunsul are ETag: clienții pot trimite If-None-Match și primesc 304 dacă statusul nu s-a schimbat.
     """
     try:
         if not WORKSPACE_DIR or not WORKSPACE_DIR.exists():
@@ -72,62 +209,19 @@ def restaurant_status():
             })
 
         now = datetime.now(timezone.utc)
-        cutoff_24h = now - timedelta(hours=24)
-        today_str = now.strftime("%Y-%m-%d")
-        yesterday_str = (now - timedelta(days=1)).strftime("%Y-%m-%d")
-        last_run_iso = None
-        ok = False
-        message = ""
-
-        # 1) Încearcă restaurant_api_status.json (lastRun în ultimele 24h)
-        p_status = WORKSPACE_DIR / "restaurant_api_status.json"
-        if p_status.exists():
-            try:
-                data = json.loads(p_status.read_text(encoding="utf-8"))
-                last_run_iso = data.get("lastRun")
-                if last_run_iso:
-                    try:
-                        dt = datetime.fromisoformat(last_run_iso.replace("Z", "+00:00"))
-                        if dt.tzinfo is None:
-                            dt = dt.replace(tzinfo=timezone.utc)
-                        if dt >= cutoff_24h:
-                            ok = True
-                        last_run_iso = dt.isoformat()
-                    except (ValueError, TypeError):
-                        pass
-            except Exception:
-                pass
-
-        # 2) Fallback: content.json per echipă, restaurantLastUpdated (azi sau ieri)
-        if not ok:
-            try:
-                for team_dir in WORKSPACE_DIR.iterdir():
-                    if not team_dir.is_dir() or team_dir.name.startswith("."):
-                        continue
-                    content_path = team_dir / "canteen_menu" / "content.json"
-                    if not content_path.exists():
-                        continue
-                    try:
-                        content = json.loads(content_path.read_text(encoding="utf-8"))
-                        updated = (content.get("restaurantLastUpdated") or "").strip()
-                        if updated in (today_str, yesterday_str):
-                            ok = True
-                            if not last_run_iso:
-                                last_run_iso = f"{updated}T00:00:00+00:00"
-                            break
-                    except Exception:
-                        continue
-            except Exception:
-                pass
-
-        if not message:
-            message = "OK" if ok else "Niciun update în ultimele 24h"
-
-        return jsonify({
-            "ok": ok,
-            "message": message,
-            "lastRun": last_run_iso,
-        })
+        inputs = _restaurant_status_inputs()
+        with _restaurant_status_lock:
+            cached = _restaurant_status_cache.get("entry")
+            if not cached or cached["inputs"] != inputs or now >= cached["valid_until"]:
+                body, valid_until = _compute_restaurant_status(now)
+                etag = hashlib.sha1(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()
+                cached = {"inputs": inputs, "valid_until": valid_until, "body": body, "etag": etag}
+                _restaurant_status_cache["entry"] = cached
+
+        response = jsonify(cached["body"])
+        response.set_etag(cached["etag"])
+        response.headers["Cache-Control"] = "no-cache"
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({
             "ok": False,
@@ -139,10 +233,7 @@ def restaurant_status():
 # ---------- API Echipe ----------
 @app.route("/api/teams", methods=["GET"])
 def list_teams():
-    if not WORKSPACE_DIR.exists():
-        return jsonify([])
-    teams = [d.name for d in WORKSPACE_DIR.iterdir() if d.is_dir() and not d.name.startswith(".")]
-    return jsonify(sorted(teams))
+    return jsonify(_workspace_index().teams())
 
 
 @app.route("/api/teams", methods=["POST"])
@@ -154,14 +245,14 @@ def create_team():
     safe = "".join(c for c in name if c.isalnum() or c in " -_").strip() or "team"
     team_dir = _team_path(safe)
     try:
-        team_dir.mkdir(parents=True, exist_ok=True)
-        (team_dir / "playlist.json").write_text(
-            json.dumps({"slides": []}, indent=2), encoding="utf-8"
-        )
-        for sub in ("documents", "photos", "videos"):
-            (team_dir / sub).mkdir(exist_ok=True)
-        for sub in TEAM_SECTION_DIRS:
-            (team_dir / sub).mkdir(exist_ok=True)
+        with _team_lock(team_dir.name):
+            team_dir.mkdir(parents=True, exist_ok=True)
+            json_store.write(team_dir / "playlist.json", {"slides": []})
+            for sub in ("documents", "photos", "videos"):
+                (team_dir / sub).mkdir(exist_ok=True)
+            for sub in TEAM_SECTION_DIRS:
+                (team_dir / sub).mkdir(exist_ok=True)
+        _workspace_index().refresh(team_dir.name)
         return jsonify({"ok": True, "name": safe})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -185,10 +276,18 @@ def delete_team_resource(name):
             return jsonify({"error": "invalid path"}), 400
         if not target.exists():
             return jsonify({"ok": True, "message": "already gone"})
+        released = [src]
         if target.is_dir():
             shutil.rmtree(target)
         else:
             target.unlink()
+            if parts[0] in ("photos", "videos") and len(parts) == 2:
+                # Variantele derivate / metadatele dispar odată cu originalul
+                shutil.rmtree(team_dir / derived_dir(src), ignore_errors=True)
+                released.append(derived_dir(src))
+        # Obiectul din media store se șterge doar când nu mai e referit de nicio echipă
+        media_store.release(f"{team_dir.name}/{r}" for r in released)
+        _workspace_index().refresh(team_dir.name, parts[0])
         return jsonify({"ok": True})
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
@@ -203,7 +302,10 @@ def delete_team(name):
         if not team_dir.exists():
             return jsonify({"error": "not found"}), 404
         import shutil
-        shutil.rmtree(team_dir)
+        with _team_lock(team_dir.name):
+            shutil.rmtree(team_dir)
+        media_store.release([team_dir.name])
+        _workspace_index().refresh(team_dir.name)
         return jsonify({"ok": True})
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
@@ -221,10 +323,7 @@ def get_team_section(name, section_id):
         if section_id not in TEAM_SECTION_DIRS:
             return jsonify({"error": "invalid section"}), 400
         content_path = team_dir / section_id / "content.json"
-        if not content_path.exists():
-            return jsonify(None)
-        data = json.loads(content_path.read_text(encoding="utf-8"))
-        return jsonify(data)
+        return jsonify(json_store.read(content_path, None))
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
@@ -244,30 +343,36 @@ def put_team_section(name, section_id):
         data = request.get_json()
         if data is None:
             return jsonify({"error": "JSON body required"}), 400
-        content_path = section_dir / "content.json"
-        if section_id == "stretching":
-            old_video_path = None
-            if content_path.exists():
-                try:
-                    old_content = json.loads(content_path.read_text(encoding="utf-8"))
-                    items = old_content.get("items") if isinstance(old_content.get("items"), list) else []
-                    if items and isinstance(items[0], dict):
-                        old_video = (items[0].get("video") or "").strip().replace("\\", "/")
-                        if old_video.startswith("stretching/"):
-                            old_video_path = team_dir / old_video
-                except Exception:
-                    pass
-            new_video = ""
-            new_items = data.get("items") if isinstance(data.get("items"), list) else []
-            if new_items and isinstance(new_items[0], dict):
-                new_video = (new_items[0].get("video") or "").strip().replace("\\", "/")
-            if old_video_path and old_video_path.exists() and old_video_path.is_file():
-                if not new_video or not new_video.startswith("stretching/") or old_video_path != (team_dir / new_video.replace("\\", "/")):
+        # Citirea conținutului vechi (video stretching) și scrierea noului conținut sunt atomice per echipă
+        with _team_lock(team_dir.name):
+            content_path = section_dir / "content.json"
+            if section_id == "stretching":
+                old_video_path = None
+                if content_path.exists():
                     try:
-                        old_video_path.unlink()
+                        old_content = json_store.read(content_path)
+                        items = old_content.get("items") if isinstance(old_content.get("items"), list) else []
+                        if items and isinstance(items[0], dict):
+                            old_video = (items[0].get("video") or "").strip().replace("\\", "/")
+                            if old_video.startswith("stretching/"):
+                                old_video_path = team_dir / old_video
                     except Exception:
                         pass
-        content_path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+                new_video = ""
+                new_items = data.get("items") if isinstance(data.get("items"), list) else []
+                if new_items and isinstance(new_items[0], dict):
+                    new_video = (new_items[0].get("video") or "").strip().replace("\\", "/")
+                if old_video_path and old_video_path.exists() and old_video_path.is_file():
+                    if not new_video or not new_video.startswith("stretching/") or old_video_path != (team_dir / new_video.replace("\\", "/")):
+                        try:
+                            old_video_path.unlink()
+                            old_rel = old_video_path.relative_to(team_dir).as_posix()
+                            shutil.rmtree(team_dir / derived_dir(old_rel), ignore_errors=True)
+                            media_store.release([f"{team_dir.name}/{old_rel}"])
+                        except Exception:
+                            pass
+            json_store.write(content_path, data)
+        _workspace_index().refresh(team_dir.name, section_id)
         return jsonify({"ok": True})
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
@@ -289,6 +394,7 @@ def ensure_team_section_dirs(name):
         team_dir.mkdir(parents=True, exist_ok=True)
         for sub in TEAM_SECTION_DIRS:
             (team_dir / sub).mkdir(exist_ok=True)
+        _workspace_index().refresh(team_dir.name)
         return jsonify({"ok": True})
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
@@ -297,16 +403,115 @@ def ensure_team_section_dirs(name):
 
 
 # ---------- API Playlist ----------
+class PlaylistVersionMismatch(Exception):
+    """If-Match / expected version differs from the stored playlist version."""
+
+    def __init__(self, current: int):
+        super().__init__("Playlist was modified in the meantime.")
+        self.current = current
+
+
+def _read_playlist(team_dir: Path) -> Tuple[list, int]:
+    """(slides, version) from playlist.json; the slides list is shared with the JSON cache (copy before editing)."""
+    data = json_store.read(team_dir / "playlist.json", None)
+    if not isinstance(data, dict):
+        return [], 0
+    slides = data.get("slides") if isinstance(data.get("slides"), list) else []
+    version = data.get("version")
+    return slides, version if isinstance(version, int) and version >= 0 else 0
+
+
+def _check_playlist_version(current: int, expected=None) -> None:
+    """Optimistic concurrency: If-Match header (or "version" in the body) must match the stored version."""
+    if request.if_match and not request.if_match.contains(str(current)):
+        raise PlaylistVersionMismatch(current)
+    if expected is not None and str(expected) != str(current):
+        raise PlaylistVersionMismatch(current)
+
+
+def _version_conflict(e: PlaylistVersionMismatch):
+    resp = jsonify({"error": str(e), "version": e.current})
+    resp.status_code = 412
+    resp.set_etag(str(e.current))
+    return resp
+
+
+def _needs_duration(s: dict) -> bool:
+    return (s.get("type") or "").lower() == "video" and s.get("duration") in (None, "", 0, "auto")
+
+
+def _prepare_slide(team_dir: Path, s: dict, default_id: str) -> dict:
+    if not s.get("id"):
+        s["id"] = default_id
+    if _needs_duration(s):
+        # Durata implicită a unui slide video = lungimea reală a fișierului (job-ul de ingest o completează altfel)
+        probed = _video_duration(team_dir, s.get("src"))
+        if probed:
+            s["duration"] = probed
+    return s
+
+
 @app.route("/api/teams/<name>/playlist", methods=["GET"])
 def get_playlist(name):
     try:
         team_dir = _team_path(name)
-        pl_path = team_dir / "playlist.json"
-        if not pl_path.exists():
-            return jsonify({"slides": []})
-        data = json.loads(pl_path.read_text(encoding="utf-8"))
-        slides = data.get("slides") if isinstance(data.get("slides"), list) else []
-        return jsonify({"slides": slides})
+        slides, version = _read_playlist(team_dir)
+        resp = jsonify({"slides": slides, "version": version})
+        resp.set_etag(str(version))
+        return resp
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def _snapshot_fields(raw: Optional[str]) -> list:
+    """?fields=playlist,announcements,... ("sections" = all sections); default: playlist + all sections."""
+    if not raw:
+        return ["playlist", *TEAM_SECTION_DIRS]
+    fields = []
+    for f in (x.strip() for x in raw.split(",")):
+        names = TEAM_SECTION_DIRS if f == "sections" else (f,)
+        for n in names:
+            if n != "playlist" and n not in TEAM_SECTION_DIRS:
+                raise ValueError(f"unknown field: {n}")
+            if n not in fields:
+                fields.append(n)
+    return fields
+
+
+@app.route("/api/teams/<name>/snapshot", methods=["GET"])
+def get_team_snapshot(name):
+    """
+    Playlist + conținutul secțiunilor într-un singur răspuns (?fields= pentru o parte din ele).
+    ETag comun din mtime / dimensiunea fișierelor: la reîncărcare fără modificări răspunsul e 304.
+    """
+    try:
+        team_dir = _team_path(name)
+        fields = _snapshot_fields(request.args.get("fields"))
+        paths = {f: team_dir / ("playlist.json" if f == "playlist" else f"{f}/content.json") for f in fields}
+        h = hashlib.sha1()
+        for f, p in paths.items():
+            try:
+                st = p.stat()
+                h.update(f"{f}:{st.st_mtime_ns}:{st.st_size};".encode())
+            except OSError:
+                h.update(f"{f}:-;".encode())
+        version = h.hexdigest()[:20]
+        if request.if_none_match.contains(version):
+            resp = Response(status=304)
+        else:
+            out = {"team": team_dir.name, "version": version, "sections": {}}
+            for f, p in paths.items():
+                if f == "playlist":
+                    slides, pl_version = _read_playlist(team_dir)
+                    out["playlist"] = {"slides": slides, "version": pl_version}
+                else:
+                    out["sections"][f] = json_store.read(p, None)
+            resp = Response(json_store.dumps(out, indent=None), mimetype="application/json")
+        resp.set_etag(version)
+        resp.headers["Cache-Control"] = "no-cache"
+        return resp
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
@@ -315,6 +520,7 @@ def get_playlist(name):
 
 @app.route("/api/teams/<name>/playlist", methods=["PUT"])
 def save_playlist(name):
+    """Înlocuiește tot playlist-ul. If-Match (sau "version" în body) opțional: 412 dacă între timp s-a modificat."""
     try:
         team_dir = _team_path(name)
         team_dir.mkdir(parents=True, exist_ok=True)
@@ -323,16 +529,108 @@ def save_playlist(name):
             return jsonify({"error": "body required"}), 400
         slides = data.get("slides") if isinstance(data.get("slides"), list) else []
         for i, s in enumerate(slides):
-            if not isinstance(s, dict):
-                continue
-            if not s.get("id"):
-                s["id"] = f"slide-{i + 1}"
+            if isinstance(s, dict):
+                _prepare_slide(team_dir, s, f"slide-{i + 1}")
         pl_path = team_dir / "playlist.json"
-        pl_path.write_text(
-            json.dumps({"slides": slides}, indent=2, ensure_ascii=False),
-            encoding="utf-8",
-        )
-        return jsonify({"ok": True})
+        with _team_lock(team_dir.name):
+            _slides, current = _read_playlist(team_dir)
+            _check_playlist_version(current, data.get("version"))
+            version = current + 1
+            json_store.write(pl_path, {"slides": slides, "version": version})
+        _workspace_index().refresh(team_dir.name, "playlist.json")
+        resp = jsonify({"ok": True, "version": version})
+        resp.set_etag(str(version))
+        return resp
+    except PlaylistVersionMismatch as e:
+        return _version_conflict(e)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def _slide_index(slides: list, slide_id) -> int:
+    for i, s in enumerate(slides):
+        if isinstance(s, dict) and s.get("id") == slide_id:
+            return i
+    raise ValueError(f"slide not found: {slide_id}")
+
+
+def _target_index(slides: list, op: dict) -> int:
+    """Position for insert / move: "index", or "after" (slide id; null = first), default the end."""
+    if "after" in op:
+        return 0 if op["after"] is None else _slide_index(slides, op["after"]) + 1
+    index = op.get("index")
+    if index is None:
+        return len(slides)
+    if not isinstance(index, int):
+        raise ValueError("index must be an integer")
+    return max(0, min(index, len(slides)))
+
+
+def _apply_slide_op(team_dir: Path, slides: list, op: dict) -> None:
+    kind = op.get("op") if isinstance(op, dict) else None
+    if kind == "insert":
+        slide = op.get("slide")
+        if not isinstance(slide, dict):
+            raise ValueError("insert: slide object required")
+        slide = _prepare_slide(team_dir, dict(slide), f"slide-{uuid.uuid4().hex[:8]}")
+        if any(isinstance(s, dict) and s.get("id") == slide["id"] for s in slides):
+            raise ValueError(f"duplicate slide id: {slide['id']}")
+        slides.insert(_target_index(slides, op), slide)
+    elif kind == "update":
+        changes = op.get("changes")
+        if not isinstance(changes, dict):
+            raise ValueError("update: changes object required")
+        i = _slide_index(slides, op.get("id"))
+        # Slide nou (nu modificare pe loc): documentul din cache-ul JSON rămâne neatins
+        slide = {**slides[i], **{k: v for k, v in changes.items() if k != "id"}}
+        for key in op.get("unset") or ():
+            if key != "id":
+                slide.pop(key, None)
+        slides[i] = _prepare_slide(team_dir, slide, slide["id"])
+    elif kind == "move":
+        i = _slide_index(slides, op.get("id"))
+        if "after" in op and op["after"] == op.get("id"):
+            return  # după el însuși: rămâne pe loc
+        slide = slides.pop(i)
+        slides.insert(_target_index(slides, op), slide)
+    elif kind == "delete":
+        del slides[_slide_index(slides, op.get("id"))]
+    else:
+        raise ValueError(f"unknown op: {kind}")
+
+
+@app.route("/api/teams/<name>/playlist", methods=["PATCH"])
+def patch_playlist(name):
+    """
+    Modificări pe slide-uri, după id: { "ops": [ { "op": "insert" | "update" | "move" | "delete", ... } ] }.
+    Operațiile se aplică toate sau niciuna; If-Match (sau "version") = versiunea playlist-ului citită de client.
+    Răspuns: { ok, version } – doar noua versiune, nu tot playlist-ul.
+    """
+    try:
+        team_dir = _team_path(name)
+        data = request.get_json(silent=True) or {}
+        ops = data.get("ops")
+        if not isinstance(ops, list) or not ops:
+            return jsonify({"error": "ops list required"}), 400
+        pl_path = team_dir / "playlist.json"
+        if not pl_path.is_file():
+            return jsonify({"error": "not found"}), 404
+        with _team_lock(team_dir.name):
+            current_slides, current = _read_playlist(team_dir)
+            _check_playlist_version(current, data.get("version"))
+            slides = list(current_slides)
+            for op in ops:
+                _apply_slide_op(team_dir, slides, op)
+            version = current + 1
+            json_store.write(pl_path, {"slides": slides, "version": version})
+        _workspace_index().refresh(team_dir.name, "playlist.json")
+        resp = jsonify({"ok": True, "version": version})
+        resp.set_etag(str(version))
+        return resp
+    except PlaylistVersionMismatch as e:
+        return _version_conflict(e)
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
@@ -344,6 +642,125 @@ ALLOWED_IMAGE = {"image/jpeg", "image/png", "image/gif", "image/webp"}
 ALLOWED_VIDEO = {"video/mp4", "video/webm", "video/quicktime", "video/x-msvideo"}
 
 
+def _media_folder(kind: str, section: str, content_type: Optional[str]) -> str:
+    """Folderul destinație pentru imagine/video; ValueError dacă tipul MIME nu e permis."""
+    if kind not in ("image", "video"):
+        raise ValueError("kind must be image or video")
+    if section == "stretching" and kind == "video":
+        folder = "stretching"
+        allowed = ALLOWED_VIDEO | {"application/octet-stream"}
+        if content_type and content_type not in allowed:
+            raise ValueError("invalid video type")
+    elif kind == "image":
+        folder = "photos"
+        if content_type and content_type not in ALLOWED_IMAGE:
+            raise ValueError("invalid image type")
+    else:
+        folder = "videos"
+        allowed = ALLOWED_VIDEO | {"application/octet-stream"}
+        if content_type and content_type not in allowed:
+            raise ValueError("invalid video type")
+    return folder
+
+
+def _media_unique_name(filename: str, kind: str) -> str:
+    fn = secure_filename(filename) or "file"
+    base, ext = os.path.splitext(fn)
+    if not ext:
+        ext = ".jpg" if kind == "image" else ".mp4"
+    return f"{base}_{uuid.uuid4().hex[:8]}{ext}"
+
+
+# Variante derivate pentru imagini (rezoluție TV + thumbnail), generate în fundal după upload
+image_derivatives = ImageDerivatives.from_env()
+
+
+def _queue_image_derivatives(team_name: str, src: str) -> Optional[dict]:
+    """Pune în coadă generarea variantelor pentru photos/<file>; None dacă Pillow lipsește sau e dezactivat."""
+    if not image_derivatives.enabled:
+        return None
+    team_dir = WORKSPACE_DIR / team_name
+
+    def body(job):
+        meta = image_derivatives.build(team_dir, src)
+        for variant in meta["variants"].values():
+            if variant["path"] != src:
+                media_store.ingest(f"{team_name}/{variant['path']}", team_dir / variant["path"])
+        _workspace_index().refresh(team_name, "photos")
+        return meta
+
+    job = conversion_jobs.submit("image-derivatives", team_name, body, params={"src": src})
+    return {"jobId": job.id, "status": job.status}
+
+
+# Ingest video în fundal: remux faststart (ffmpeg) + metadate (ffprobe) în .derived/<fișier>/meta.json
+video_ingest = VideoIngest.from_env()
+
+
+def _queue_video_ingest(team_name: str, src: str) -> Optional[dict]:
+    """Pune în coadă ingest-ul pentru videos/<file> sau stretching/<file>; None dacă e dezactivat."""
+    if not video_ingest.enabled:
+        return None
+    team_dir = WORKSPACE_DIR / team_name
+
+    def body(job):
+        meta = video_ingest.run(team_dir, src)
+        if meta["remuxed"]:
+            # Conținut nou: referința din media store trece pe noul hash
+            media_store.ingest(f"{team_name}/{src}", team_dir / src)
+        _workspace_index().refresh(team_name, src.split("/", 1)[0])
+        # Slide-urile salvate înainte de ingest (ex. webm, fără durată în antet) primesc acum durata
+        _fill_video_durations(team_dir, src, meta)
+        return meta
+
+    job = conversion_jobs.submit("video-ingest", team_name, body, params={"src": src})
+    return {"jobId": job.id, "status": job.status}
+
+
+def _video_src(src) -> Optional[str]:
+    src = (src or "").strip().replace("\\", "/").strip("/")
+    if not src.startswith(("videos/", "stretching/")) or ".." in src:
+        return None
+    return src
+
+
+def _duration_seconds(meta: Optional[dict]) -> Optional[int]:
+    duration = (meta or {}).get("duration")
+    return max(1, math.ceil(duration)) if duration else None
+
+
+def _video_duration(team_dir: Path, src) -> Optional[int]:
+    """
+    Durata (secunde, rotunjită în sus) din sidecar-ul de ingest sau, până la ingest, din antetul MP4 (câteva
+    citiri, fără ffprobe): se apelează din cereri, uneori sub lock-ul echipei.
+    """
+    src = _video_src(src)
+    if src is None:
+        return None
+    meta = VideoIngest.read(team_dir, src)
+    if meta is None and Path(src).suffix.lower() in MP4_EXT:
+        meta = mp4_layout(team_dir / src)
+    return _duration_seconds(meta)
+
+
+def _fill_video_durations(team_dir: Path, src: str, meta: dict) -> None:
+    """After ingest: set the probed duration on playlist video slides for src that were saved without one."""
+    seconds = _duration_seconds(meta)
+    if not seconds:
+        return
+    with _team_lock(team_dir.name):
+        slides, version = _read_playlist(team_dir)
+        if not any(isinstance(s, dict) and _needs_duration(s) and _video_src(s.get("src")) == src for s in slides):
+            return
+        slides = [
+            {**s, "duration": seconds}
+            if isinstance(s, dict) and _needs_duration(s) and _video_src(s.get("src")) == src else s
+            for s in slides
+        ]
+        json_store.write(team_dir / "playlist.json", {"slides": slides, "version": version + 1})
+    _workspace_index().refresh(team_dir.name, "playlist.json")
+
+
 @app.route("/api/teams/<name>/upload", methods=["POST"])
 def upload_team_file(name):
     try:
@@ -357,32 +774,88 @@ def upload_team_file(name):
             return jsonify({"error": "kind must be image or video"}), 400
         if not f or not f.filename:
             return jsonify({"error": "no file selected"}), 400
-        fn = secure_filename(f.filename) or "file"
-        base, ext = os.path.splitext(fn)
-        if not ext:
-            ext = ".jpg" if kind == "image" else ".mp4"
-        unique = f"{base}_{uuid.uuid4().hex[:8]}{ext}"
+        unique = _media_unique_name(f.filename, kind)
         section = (request.form.get("section") or "").strip().lower()
-        if section == "stretching" and kind == "video":
-            folder = "stretching"
-            allowed = ALLOWED_VIDEO | {"application/octet-stream"}
-            if f.content_type and f.content_type not in allowed:
-                return jsonify({"error": "invalid video type"}), 400
-        elif kind == "image":
-            folder = "photos"
-            if f.content_type and f.content_type not in ALLOWED_IMAGE:
-                return jsonify({"error": "invalid image type"}), 400
-        else:
-            folder = "videos"
-            allowed = ALLOWED_VIDEO | {"application/octet-stream"}
-            if f.content_type and f.content_type not in allowed:
-                return jsonify({"error": "invalid video type"}), 400
+        folder = _media_folder(kind, section, f.content_type)
         dest_dir = team_dir / folder
         dest_dir.mkdir(exist_ok=True)
         dest = dest_dir / unique
-        f.save(str(dest))
+        sha = save_stream(f.stream, dest)
+        UPLOAD_BYTES.inc(dest.stat().st_size, kind=kind)
+        media_store.ingest(f"{team_dir.name}/{folder}/{unique}", dest, sha)
+        _workspace_index().refresh(team_dir.name, folder)
         path = f"{folder}/{unique}"
-        return jsonify({"ok": True, "path": path})
+        out = {"ok": True, "path": path}
+        if folder == "photos":
+            out["derivatives"] = _queue_image_derivatives(team_dir.name, path)
+        else:
+            out["ingest"] = _queue_video_ingest(team_dir.name, path)
+        return jsonify(out)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/teams/<name>/derivatives", methods=["GET"])
+def get_image_derivatives(name):
+    """Variantele unei imagini: ?src=photos/x.png -> { original, variants: { screen, thumb } } (căi relative la echipă)."""
+    try:
+        team_dir = _team_path(name)
+        src = (request.args.get("src") or "").strip().replace("\\", "/").strip("/")
+        if not src.startswith("photos/") or ".." in src or src.count("/") != 1:
+            return jsonify({"error": "src must be photos/<file>"}), 400
+        meta = ImageDerivatives.read(team_dir, src)
+        if meta is None:
+            return jsonify({"error": "no derivatives"}), 404
+        return jsonify(meta)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# ---------- Servire fișiere media din WORKSPACE (preview în dashboard) ----------
+SERVED_MEDIA_DIRS = ("photos", "videos", "documents", "stretching")
+
+
+def _media_cache_max_age() -> int:
+    try:
+        return max(0, int(os.environ.get("MEDIA_CACHE_MAX_AGE", "").strip() or 0))
+    except ValueError:
+        return 0
+
+
+@app.route("/api/teams/<name>/media/<path:subpath>", methods=["GET", "HEAD"])
+def serve_team_media(name, subpath):
+    """
+    Servește WORKSPACE/<team>/{photos,videos,documents,stretching}/... cu suport Range (206),
+    ETag puternic din dimensiune + mtime și 304 la If-None-Match / If-Modified-Since.
+    """
+    try:
+        team_dir = _team_path(name)
+        parts = subpath.replace("\\", "/").strip("/").split("/")
+        if parts[0] not in SERVED_MEDIA_DIRS or len(parts) < 2 or ".." in parts:
+            return jsonify({"error": "path must be under photos, videos, documents or stretching"}), 400
+        # Fișierele temporare (.upload-*, .tmp-*) nu se servesc; variantele din .derived/ da
+        if any(p.startswith(".") and p != DERIVED_DIR for p in parts):
+            return jsonify({"error": "not found"}), 404
+        target = (team_dir / "/".join(parts)).resolve()
+        if not str(target).startswith(str(team_dir / parts[0])) or not target.is_file():
+            return jsonify({"error": "not found"}), 404
+        st = target.stat()
+        max_age = _media_cache_max_age()
+        response = send_file(
+            target,
+            conditional=True,
+            etag=f"{st.st_size:x}-{st.st_mtime_ns:x}",
+            last_modified=st.st_mtime,
+            max_age=max_age or None,
+        )
+        if not max_age:
+            response.cache_control.no_cache = True
+        response.headers["Accept-Ranges"] = "bytes"
+        return response
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
@@ -407,6 +880,17 @@ def _safe_folder_name(name: str) -> str:
     return base[:50]
 
 
+def _document_target(filename: str) -> Tuple[str, str]:
+    """(folder_name, safe file name) pentru un document; ValueError dacă extensia nu e permisă."""
+    fn = (filename or "").strip()
+    base, ext = os.path.splitext(fn)
+    ext = ext.lower()
+    if ext not in DOC_EXT:
+        raise ValueError("allowed: pdf, docx, doc, xlsx, xls, pptx, ppt")
+    folder_name = _safe_folder_name(base) + "_" + uuid.uuid4().hex[:8]
+    return folder_name, secure_filename(fn) or base + ext
+
+
 @app.route("/api/teams/<name>/upload-document", methods=["POST"])
 def upload_document(name):
     """Upload PDF/Word/Excel/PPTX to team/documents/<folder_name>/."""
@@ -420,17 +904,13 @@ def upload_document(name):
         f = request.files["file"]
         if not f or not f.filename:
             return jsonify({"error": "no file selected"}), 400
-        fn = (f.filename or "").strip()
-        base, ext = os.path.splitext(fn)
-        ext = ext.lower()
-        if ext not in DOC_EXT:
-            return jsonify({"error": "allowed: pdf, docx, doc, xlsx, xls, pptx, ppt"}), 400
-        folder_name = _safe_folder_name(base) + "_" + uuid.uuid4().hex[:8]
+        folder_name, safe_fn = _document_target(f.filename)
         dest_dir = docs_dir / folder_name
         dest_dir.mkdir(parents=True, exist_ok=True)
-        safe_fn = secure_filename(fn) or base + ext
         dest_file = dest_dir / safe_fn
         f.save(str(dest_file))
+        UPLOAD_BYTES.inc(dest_file.stat().st_size, kind="document")
+        _workspace_index().refresh(team_dir.name, "documents")
         path = f"documents/{folder_name}"
         return jsonify({"ok": True, "path": path})
     except ValueError as e:
@@ -439,6 +919,140 @@ def upload_document(name):
         return jsonify({"error": str(e)}), 500
 
 
+# ---------- Upload pe bucăți (reluabil) pentru fișiere mari ----------
+upload_sessions = UploadManager.from_env()
+
+
+@app.route("/api/teams/<name>/uploads", methods=["POST"])
+def init_chunked_upload(name):
+    """
+    Începe un upload pe bucăți. Body: { filename, size, kind: 'image'|'video'|'document', section?, contentType?, sha256? }.
+    Răspuns 201 { uploadId, offset, size, chunkSize }; apoi PUT .../uploads/<uploadId> cu header Upload-Offset.
+    """
+    try:
+        team_dir = _team_path(name)
+        data = request.get_json() or {}
+        filename = (data.get("filename") or "").strip()
+        if not filename:
+            return jsonify({"error": "filename required"}), 400
+        try:
+            size = int(data.get("size"))
+        except (TypeError, ValueError):
+            return jsonify({"error": "size required"}), 400
+        kind = (data.get("kind") or "").strip().lower()
+        section = (data.get("section") or "").strip().lower()
+        content_type = (data.get("contentType") or "").strip() or None
+        meta = {"kind": kind, "section": section, "contentType": content_type, "filename": filename}
+        if kind == "document":
+            folder_name, safe_fn = _document_target(filename)
+            dest = team_dir / "documents" / folder_name / safe_fn
+            meta.update({"ownsDir": True, "path": f"documents/{folder_name}", "folder": "documents"})
+        else:
+            folder = _media_folder(kind, section, content_type)
+            unique = _media_unique_name(filename, kind)
+            dest = team_dir / folder / unique
+            meta.update({"path": f"{folder}/{unique}", "folder": folder})
+        session = upload_sessions.create(team_dir.name, dest, size, meta, data.get("sha256"))
+        return jsonify({**session.to_dict(), "ok": True, "chunkSize": upload_sessions.chunk_size}), 201
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/teams/<name>/uploads/<upload_id>", methods=["GET"])
+def get_chunked_upload(name, upload_id):
+    """Offset-ul confirmat (pentru reluare după deconectare)."""
+    try:
+        session = upload_sessions.get(upload_id, _team_path(name).name)
+        if not session:
+            return jsonify({"error": "upload not found"}), 404
+        return jsonify(session.to_dict())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route("/api/teams/<name>/uploads/<upload_id>", methods=["PUT"])
+def put_upload_chunk(name, upload_id):
+    """
+    Scrie un chunk (body binar) la offset-ul dat în header Upload-Offset (sau ?offset=).
+    Opțional Upload-Checksum: sha256 <hex> pentru verificarea chunk-ului. 409 + offset dacă offset-ul nu corespunde.
+    """
+    try:
+        session = upload_sessions.get(upload_id, _team_path(name).name)
+        if not session:
+            return jsonify({"error": "upload not found"}), 404
+        try:
+            offset = int(request.headers.get("Upload-Offset", request.args.get("offset", "")))
+        except ValueError:
+            return jsonify({"error": "Upload-Offset header required"}), 400
+        checksum = (request.headers.get("Upload-Checksum") or "").strip()
+        if checksum:
+            algo, _, value = checksum.partition(" ")
+            if algo.lower() != "sha256" or not value:
+                return jsonify({"error": "Upload-Checksum must be 'sha256 <hex>'"}), 400
+            checksum = value
+        try:
+            new_offset = session.write(request.stream, offset, checksum or None)
+            UPLOAD_BYTES.inc(new_offset - offset, kind="chunk")
+        except UploadOffsetMismatch as e:
+            return jsonify({"error": str(e), "offset": e.offset}), 409
+        except ClientDisconnected:
+            return jsonify({"error": "client disconnected", "offset": session.offset}), 400
+        return jsonify({"ok": True, "offset": new_offset, "size": session.size})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/teams/<name>/uploads/<upload_id>/finalize", methods=["POST"])
+def finalize_chunked_upload(name, upload_id):
+    """Verifică dimensiunea, hash-ul și tipul fișierului, apoi îl mută la numele final. Răspuns ca la /upload: { ok, path }."""
+    try:
+        team_dir = _team_path(name)
+        session = upload_sessions.get(upload_id, team_dir.name)
+        if not session:
+            return jsonify({"error": "upload not found"}), 404
+        meta = session.meta
+        try:
+            # Aceleași verificări MIME / extensie ca la upload-ul dintr-o singură cerere
+            if meta["kind"] == "document":
+                _document_target(meta["filename"])
+            else:
+                _media_folder(meta["kind"], meta["section"], meta["contentType"])
+        except ValueError:
+            upload_sessions.abort(session)
+            raise
+        upload_sessions.finalize(session)
+        if meta["folder"] in DEDUP_MEDIA_DIRS:
+            media_store.ingest(f"{team_dir.name}/{meta['path']}", session.dest, session.sha256())
+        _workspace_index().refresh(team_dir.name, meta["folder"])
+        out = {"ok": True, "path": meta["path"], "sha256": session.sha256()}
+        if meta["folder"] == "photos":
+            out["derivatives"] = _queue_image_derivatives(team_dir.name, meta["path"])
+        elif meta["folder"] in ("videos", "stretching"):
+            out["ingest"] = _queue_video_ingest(team_dir.name, meta["path"])
+        return jsonify(out)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/teams/<name>/uploads/<upload_id>", methods=["DELETE"])
+def abort_chunked_upload(name, upload_id):
+    """Anulează upload-ul și șterge fișierul temporar."""
+    try:
+        session = upload_sessions.get(upload_id, _team_path(name).name)
+        if not session:
+            return jsonify({"error": "upload not found"}), 404
+        upload_sessions.abort(session)
+        return jsonify({"ok": True})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
 def _parse_range(range_str: str, total_pages: int) -> list:
     """Parse range string to 1-based page numbers. 'all' -> [1..total], '1,3,5' -> [1,3,5], '2-5' -> [2,3,4,5]."""
     s = (range_str or "").strip().lower()
@@ -465,25 +1079,23 @@ def _parse_range(range_str: str, total_pages: int) -> list:
     return sorted(set(out))
 
 
-def _convert_pdf_to_images(pdf_path: Path, page_numbers_1based: list, out_dir: Path) -> int:
-    import fitz  # pymupdf
-    doc = fitz.open(str(pdf_path))
-    count = 0
-    for i, page_1 in enumerate(page_numbers_1based):
-        page_0 = page_1 - 1
-        if page_0 < 0 or page_0 >= len(doc):
-            continue
-        page = doc[page_0]
-        pix = page.get_pixmap(dpi=150, alpha=False)
-        out_name = f"{i + 1:03d}.png"
-        pix.save(str(out_dir / out_name))
-        count += 1
-    doc.close()
-    return count
+# Randare PDF pe mai multe nuclee (PDF_RENDER_WORKERS, PDF_RENDER_PARALLEL_MIN_PAGES)
+pdf_renderer = PdfRenderer.from_env()
+atexit.register(pdf_renderer.shutdown)
+
+
+def _convert_pdf_to_images(pdf_path: Path, page_numbers_1based: list, out_dir: Path,
+                           progress: Optional[Callable[[int, int], None]] = None, doc=None) -> int:
+    """
+    Render pages to 001.png, 002.png, ... in out_dir (serial or sharded across processes).
+    progress(done, total) is called as pages complete; doc is an already open fitz document to reuse.
+    """
+    return pdf_renderer.render(pdf_path, page_numbers_1based, out_dir, doc=doc, progress=progress)
 
 
-def _libreoffice_paths():
-    """Return list of possible soffice executable paths (PATH + env + Windows install dirs)."""
+@functools.lru_cache(maxsize=1)
+def _libreoffice_paths() -> tuple:
+    """Return possible soffice executable paths (PATH + env + Windows install dirs). Scanned once per process."""
     candidates = []
     # Explicit path (e.g. portable install)
     env_path = os.environ.get("LIBREOFFICE_PATH", "").strip()
@@ -520,7 +1132,7 @@ def _libreoffice_paths():
                             candidates.append(str(exe))
             except OSError:
                 pass
-    return candidates
+    return tuple(candidates)
 
 
 def _dispatch_office_app(win32com_client, prog_id: str):
@@ -613,32 +1225,95 @@ def _convert_office_to_pdf_win32(office_path: Path, out_dir: Path) -> Tuple[Opti
             pass
 
 
+# Instanță LibreOffice pornită la prima conversie și refolosită (LIBREOFFICE_RESIDENT, LIBREOFFICE_QUEUE_SIZE, ...)
+office_server = OfficeServer.from_env(_libreoffice_paths)
+atexit.register(office_server.shutdown)
+
+
 def _convert_office_to_pdf(office_path: Path, out_dir: Path) -> Tuple[Optional[Path], Optional[str]]:
-    """Convert to PDF: try LibreOffice first, then on Windows try Microsoft Office. Returns (path, error_msg)."""
-    for cmd in _libreoffice_paths():
-        try:
-            r = subprocess.run(
-                [cmd, "--headless", "--convert-to", "pdf", "--outdir", str(out_dir), str(office_path)],
-                cwd=str(out_dir),
-                capture_output=True,
-                text=True,
-                timeout=120,
-            )
-            if r.returncode != 0:
-                continue
-            pdf_name = office_path.stem + ".pdf"
-            pdf_path = out_dir / pdf_name
-            if pdf_path.exists():
-                return pdf_path, None
-        except FileNotFoundError:
-            continue
+    """Convert to PDF: try LibreOffice (resident instance) first, then on Windows try Microsoft Office. Returns (path, error_msg)."""
+    path, lo_err = office_server.convert(office_path, out_dir)
+    if path:
+        return path, None
     path, err = _convert_office_to_pdf_win32(office_path, out_dir)
-    return path, err
+    if path:
+        return path, None
+    return None, (err or lo_err) if os.name == "nt" else lo_err
+
+
+# Conversiile rulează în fundal (CONVERSION_WORKERS); clientul urmărește job-ul prin /api/jobs/<id>
+conversion_jobs = JobManager.from_env()
+atexit.register(conversion_jobs.shutdown)
+
+
+# Pagini randate / PDF-uri generate, refolosite între echipe (CONVERSION_CACHE_DIR, CONVERSION_CACHE_MAX_MB)
+conversion_cache = ConversionCache.from_env(BASE_DIR / "cache" / "conversions")
+
+
+def _office_pdf(job, doc_file: Path, folder_abs: Path, source_hash: str) -> Path:
+    """PDF for an Office file: reuse the one already in the folder, then the cache, else convert."""
+    pdf_path = folder_abs / (doc_file.stem + ".pdf")
+    if pdf_path.is_file() and pdf_path.stat().st_mtime >= doc_file.stat().st_mtime:
+        conversion_cache.store_pdf(source_hash, pdf_path)
+        return pdf_path
+    if conversion_cache.materialize_pdf(source_hash, pdf_path):
+        return pdf_path
+    # Fișierul poate fi hardlink spre cache; nu-l lăsăm pe LibreOffice să-l suprascrie pe loc
+    pdf_path.unlink(missing_ok=True)
+    pdf_path, office_err = _convert_office_to_pdf(doc_file, folder_abs)
+    if not pdf_path:
+        msg = "Install LibreOffice or Microsoft Office to convert Office files. Or upload a PDF instead."
+        if office_err:
+            msg += " (Office error: " + office_err[:200] + ")"
+        raise JobError(msg)
+    conversion_cache.store_pdf(source_hash, pdf_path)
+    return pdf_path
+
+
+def _convert_document_job(job, doc_file: Path, folder_abs: Path, folder_rel: str, range_str: str) -> dict:
+    """Job body: Office -> PDF (if needed), then PDF pages -> PNG; both steps go through the conversion cache."""
+    source_hash = conversion_cache.digest(doc_file)
+    if doc_file.suffix.lower() == ".pdf":
+        pdf_path = doc_file
+    else:
+        pdf_path = _office_pdf(job, doc_file, folder_abs, source_hash)
+    job.check_cancelled()
+    import fitz
+    doc = fitz.open(str(pdf_path))
+    try:
+        total_pages = len(doc)
+        if total_pages == 0:
+            raise JobError("document has no pages")
+        page_list = _parse_range(range_str, total_pages)
+        if not page_list:
+            raise JobError("range resulted in no pages")
+        job.progress(0, len(page_list))
+        key = conversion_cache.pages_key(source_hash, page_list, {"dpi": pdf_renderer.dpi})
+        count = conversion_cache.materialize_pages(key, folder_abs)
+        if count is not None:
+            job.progress(count, len(page_list))
+            return {"count": count, "path": folder_rel, "cached": True}
+        names = [f"{i + 1:03d}.png" for i in range(len(page_list))]
+        for n in names:
+            (folder_abs / n).unlink(missing_ok=True)
+        count = _convert_pdf_to_images(pdf_path, page_list, folder_abs, progress=job.progress, doc=doc)
+    finally:
+        doc.close()
+    conversion_cache.store_pages(key, folder_abs, [n for n in names if (folder_abs / n).is_file()])
+    return {"count": count, "path": folder_rel, "cached": False}
+
+
+def _refresh_documents(job) -> None:
+    """După orice job de conversie (reușit sau nu), indexul vede paginile noi / șterse."""
+    _workspace_index().refresh(job.team, "documents")
 
 
 @app.route("/api/teams/<name>/convert-document", methods=["POST"])
 def convert_document(name):
-    """Convert document in src folder to images. Body: { src: 'documents/folder', range: 'all'|'1,3,5'|'2-5' }."""
+    """
+    Pune în coadă conversia documentului din folderul src în imagini.
+    Body: { src: 'documents/folder', range: 'all'|'1,3,5'|'2-5' }. Răspuns 202 { ok, jobId }; rezultatul vine prin /api/jobs/<jobId>.
+    """
     try:
         team_dir = _team_path(name)
         data = request.get_json() or {}
@@ -657,28 +1332,15 @@ def convert_document(name):
                 break
         if not doc_file:
             return jsonify({"error": "no document file in folder"}), 400
-        suffix = doc_file.suffix.lower()
-        pdf_path = None
-        if suffix == ".pdf":
-            pdf_path = doc_file
-        else:
-            pdf_path, office_err = _convert_office_to_pdf(doc_file, folder_abs)
-            if not pdf_path:
-                msg = "Install LibreOffice or Microsoft Office to convert Office files. Or upload a PDF instead."
-                if office_err:
-                    msg += " (Office error: " + office_err[:200] + ")"
-                return jsonify({"error": msg}), 400
-        import fitz
-        doc = fitz.open(str(pdf_path))
-        total_pages = len(doc)
-        doc.close()
-        if total_pages == 0:
-            return jsonify({"error": "document has no pages"}), 400
-        page_list = _parse_range(range_str, total_pages)
-        if not page_list:
-            return jsonify({"error": "range resulted in no pages"}), 400
-        count = _convert_pdf_to_images(pdf_path, page_list, folder_abs)
-        return jsonify({"ok": True, "count": count, "path": folder_rel})
+        job = conversion_jobs.submit(
+            "convert-document",
+            team_dir.name,
+            _profiled_job("convert-document",
+                          lambda job: _convert_document_job(job, doc_file, folder_abs, folder_rel, range_str)),
+            params={"src": folder_rel, "range": range_str},
+            on_finish=_refresh_documents,
+        )
+        return jsonify({"ok": True, "jobId": job.id, "status": job.status}), 202
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
@@ -754,49 +1416,47 @@ def _try_accept_cookies(page) -> None:
             continue
 
 
-def _convert_web_to_images(url: str, range_list: list, out_dir: Path) -> int:
-    """Capture URL to PNG(s). range_list [1] = full page; [1,2,3,...] = that many viewport screenshots."""
-    try:
-        from playwright.sync_api import sync_playwright
-    except ImportError:
-        raise RuntimeError(
-            "Playwright not installed. Run: pip install playwright && playwright install chromium"
-        )
-    count = 0
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        try:
-            context = browser.new_context(
-                viewport={"width": 1920, "height": 1080},
-                ignore_https_errors=True,
-            )
-            page = context.new_page()
-            page.goto(url, wait_until="networkidle", timeout=30000)
-            page.wait_for_timeout(2000)  # allow JS/render
-            _try_accept_cookies(page)
-            if range_list == [1]:
-                # single full-page screenshot
-                out_dir.mkdir(parents=True, exist_ok=True)
-                page.screenshot(path=str(out_dir / "001.png"), full_page=True)
-                count = 1
-            else:
-                # N viewport-sized screenshots (scroll and capture)
-                out_dir.mkdir(parents=True, exist_ok=True)
-                total = len(range_list)
-                for i in range(total):
-                    # scroll to i * viewport height
-                    page.evaluate(f"window.scrollTo(0, {i * 1080})")
-                    page.wait_for_timeout(500)
-                    page.screenshot(path=str(out_dir / f"{i + 1:03d}.png"))
-                    count += 1
-        finally:
-            browser.close()
-    return count
+# Browsere Chromium ținute calde între capturi (BROWSER_POOL_SIZE, BROWSER_POOL_MAX_USES)
+browser_pool = BrowserPool.from_env()
+atexit.register(browser_pool.shutdown, wait=False)
+
+
+def _convert_web_to_images(url: str, range_list: list, out_dir: Path,
+                           progress: Optional[Callable[[int, int], None]] = None) -> int:
+    """Capture URL to PNG(s) on a pooled browser. range_list [1] = full page; [1,2,3,...] = that many viewport screenshots."""
+
+    def capture(context) -> int:
+        count = 0
+        page = context.new_page()
+        page.goto(url, wait_until="networkidle", timeout=30000)
+        page.wait_for_timeout(2000)  # allow JS/render
+        _try_accept_cookies(page)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        if range_list == [1]:
+            # single full-page screenshot
+            page.screenshot(path=str(out_dir / "001.png"), full_page=True)
+            count = 1
+            if progress:
+                progress(1, 1)
+        else:
+            # N viewport-sized screenshots (scroll and capture)
+            for i in range(len(range_list)):
+                # scroll to i * viewport height
+                page.evaluate(f"window.scrollTo(0, {i * 1080})")
+                page.wait_for_timeout(500)
+                page.screenshot(path=str(out_dir / f"{i + 1:03d}.png"))
+                count += 1
+                if progress:
+                    progress(count, len(range_list))
+        return count
+
+    # goto (30 s) + randare + câte un ecran pe pagină; un pool blocat nu mai ține job-ul la nesfârșit
+    return browser_pool.run(capture, timeout=120 + 5 * len(range_list))
 
 
 @app.route("/api/teams/<name>/convert-web", methods=["POST"])
 def convert_web(name):
-    """Convert web URL to images. Body: { url: 'https://...', range: 'all' | '1' | '1-5' }."""
+    """Pune în coadă captura URL-ului în imagini. Body: { url: 'https://...', range: 'all' | '1' | '1-5' }. Răspuns 202 { ok, jobId }."""
     try:
         team_dir = _team_path(name)
         data = request.get_json() or {}
@@ -813,51 +1473,198 @@ def convert_web(name):
         if not str(folder_abs).startswith(str(team_dir)):
             return jsonify({"error": "invalid path"}), 400
         folder_abs.mkdir(parents=True, exist_ok=True)
-        count = _convert_web_to_images(url, range_list, folder_abs)
-        return jsonify({"ok": True, "count": count, "path": folder_rel})
+
+        def body(job) -> dict:
+            job.progress(0, len(range_list))
+            count = _convert_web_to_images(url, range_list, folder_abs, progress=job.progress)
+            return {"count": count, "path": folder_rel}
+
+        job = conversion_jobs.submit(
+            "convert-web",
+            team_dir.name,
+            _profiled_job("convert-web", body),
+            params={"url": url, "range": range_str, "path": folder_rel},
+            on_abort=lambda job: shutil.rmtree(folder_abs, ignore_errors=True),
+            on_finish=_refresh_documents,
+        )
+        return jsonify({"ok": True, "jobId": job.id, "status": job.status}), 202
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"ok": False, "error": str(e)}), 500
 
 
-# ---------- Git: helper commit ----------
-def _git_head_commit(cwd: str) -> Optional[str]:
-    r = subprocess.run(
-        ["git", "rev-parse", "HEAD"],
-        cwd=cwd,
-        capture_output=True,
-        text=True,
-        timeout=5,
-    )
-    if r.returncode != 0:
-        return None
-    return (r.stdout or "").strip()
+# ---------- API Jobs (conversii în fundal) ----------
+@app.route("/api/jobs", methods=["GET"])
+def list_jobs():
+    """Listează job-urile (opțional ?team=<name>), cele mai noi primele."""
+    team = (request.args.get("team") or "").strip() or None
+    jobs = sorted(conversion_jobs.list(team), key=lambda j: j.created_at, reverse=True)
+    return jsonify({"jobs": [j.to_dict() for j in jobs], "stats": conversion_jobs.stats()})
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Status, progres per pagină, rezultat sau eroare pentru un job."""
+    job = conversion_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "job not found"}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route("/api/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_job(job_id):
+    """Anulează job-ul: cele din coadă nu mai pornesc, cele active se opresc la următoarea pagină."""
+    job = conversion_jobs.cancel(job_id)
+    if not job:
+        return jsonify({"error": "job not found"}), 404
+    return jsonify({"ok": True, "status": job.status})
+
+
+@app.route("/api/json-store", methods=["GET"])
+def json_store_stats():
+    """Statistici cache JSON (hits / misses / evictions, backend de serializare)."""
+    return jsonify(json_store.stats())
+
+
+@app.route("/api/workspace-index", methods=["GET"])
+def workspace_index_stats():
+    """Statistici index WORKSPACE (echipe, fișiere, watcher activ, ultima rescanare)."""
+    return jsonify(_workspace_index().stats())
+
+
+@app.route("/api/workspace-index/rescan", methods=["POST"])
+def workspace_index_rescan():
+    """Forțează rescanarea completă a WORKSPACE (ex. după modificări făcute din afara dashboard-ului)."""
+    index = _workspace_index()
+    index.rescan()
+    return jsonify({"ok": True, **index.stats()})
+
+
+@app.route("/api/media-store", methods=["GET"])
+def media_store_stats():
+    """Statistici media store (obiecte, referințe, bytes economisiți prin deduplicare)."""
+    return jsonify(media_store.stats())
+
+
+@app.route("/api/media-store/gc", methods=["POST"])
+def media_store_gc():
+    """
+    Curăță referințele către fișiere dispărute și obiectele orfane.
+    Body opțional: { adopt: true } - fișierele existente din photos/videos/stretching sunt preluate și deduplicate.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        result = media_store.gc(DEDUP_MEDIA_DIRS if data.get("adopt") else ())
+        if data.get("adopt"):
+            _workspace_index().rescan()
+        return jsonify({"ok": True, **result})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/conversion-cache", methods=["GET"])
+def conversion_cache_stats():
+    """Statistici cache conversii (hit/miss, intrări, dimensiune, evacuări)."""
+    return jsonify(conversion_cache.stats())
+
+
+@app.route("/api/office-server", methods=["GET"])
+def office_server_stats():
+    """Statistici LibreOffice (mod rezident/cli, executabil, conversii, reporniri, coadă)."""
+    return jsonify(office_server.stats())
+
+
+@app.route("/api/browser-pool", methods=["GET"])
+def browser_pool_stats():
+    """Statistici pool Chromium (browsere vii, job-uri în coadă, relansări)."""
+    return jsonify(browser_pool.stats())
+
+
+# Coadă git: toate operațiile rulează pe un singur thread, push-urile apropiate sunt grupate într-un commit
+git_queue = GitQueue.from_env(WORKSPACE_DIR.parent, WORKSPACE_DIR.name)
+
+# Offload media (opțional): în git rămân doar manifestele, fișierele mari stau în object store lângă repo
+media_offload = MediaOffload.from_env(WORKSPACE_DIR, MEDIA_DIRS)
+if media_offload.enabled:
+    git_queue.before_add = media_offload.prepare_push
+    git_queue.after_rebase = media_offload.materialize
+
+
+# Pull restrâns la echipele afișate (sparse checkout + partial clone), la cerere din /api/git/pull
+git_sparse = SparseSync.from_env(WORKSPACE_DIR.parent, WORKSPACE_DIR.name)
+
+
+# Status git din cache: fetch periodic în fundal (prin coada git), HEAD / upstream / ahead-behind calculate local
+git_status = GitStatus.from_env(WORKSPACE_DIR.parent, run=git_queue.call)
+
+
+# Flux SSE cu modificările: indexul WORKSPACE, job-urile de conversie și statusul git publică evenimente
+change_feed = ChangeFeed.from_env()
+
+
+def _on_job_finished(job) -> None:
+    """Job terminat: durata intră în /metrics, iar clienții SSE primesc job.finished."""
+    if job.started_at and job.finished_at:
+        JOB_SECONDS.observe(job.finished_at - job.started_at, kind=job.kind, status=job.status)
+    change_feed.publish("job.finished", job.team, jobId=job.id, kind=job.kind, status=job.status, error=job.error)
+
+
+workspace_index.on_change = lambda team, kind, data: change_feed.publish(kind, team, **data)
+conversion_jobs.on_finish = _on_job_finished
+git_status.on_change = lambda st: change_feed.publish(
+    "git.head", None, **{k: st.get(k) for k in ("commit", "branch", "upstreamCommit", "ahead", "behind")})
+git_queue.after_push = git_status.status
+
+
+@app.route("/api/events", methods=["GET"])
+def change_events():
+    """
+    Server-Sent Events: playlist.changed, section.changed, media.added / media.removed, team.added / team.removed,
+    job.finished, git.head. ?team=BSW,ESB filtrează pe echipe (evenimentele git vin mereu).
+    Reluare: Last-Event-ID (trimis automat de EventSource) sau ?since=<id>.
+    """
+    _workspace_index()
+    if git_status.available:
+        git_status.start()
+        git_status.status()  # starea de referință pentru git.head
+    teams = [t.strip() for t in (request.args.get("team") or "").split(",") if t.strip()]
+    token = request.headers.get("Last-Event-ID") or request.args.get("since")
+    if not change_feed.acquire():
+        resp = jsonify({"error": "Too many event streams."})
+        resp.status_code = 503
+        resp.headers["Retry-After"] = "10"
+        return resp
+    resp = Response(change_feed.stream(token, teams), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+    resp.call_on_close(change_feed.release)
+    return resp
+
+
+@app.route("/api/change-feed", methods=["GET"])
+def change_feed_stats():
+    """Statistici flux SSE (clienți conectați, evenimente în jurnal, ultimul id)."""
+    return jsonify(change_feed.stats())
 
 
 # ---------- Git Connect: verificare + return commit ----------
 @app.route("/api/git/connect", methods=["GET", "POST"])
 def git_connect():
-    """Verifică remote și returnează commit-ul curent."""
-    repo_root = WORKSPACE_DIR.parent
-    if not (repo_root / ".git").exists():
+    """
+    Status remote din cache (fetch-ul rulează în fundal): commit, branch, upstream, ahead / behind.
+    Fetch sincron doar la primul apel sau cu ?refresh=1.
+    """
+    if not git_status.available:
         return jsonify({"ok": False, "error": "No git repo in project root."})
-    cwd = str(repo_root)
     try:
-        r = subprocess.run(
-            ["git", "fetch", "--dry-run"],
-            cwd=cwd,
-            capture_output=True,
-            text=True,
-            timeout=15,
-        )
-        if r.returncode != 0:
-            err = (r.stderr or r.stdout or "").strip() or "Git fetch failed."
-            return jsonify({"ok": False, "error": err})
-        commit = _git_head_commit(cwd)
-        return jsonify({"ok": True, "commit": commit or ""})
-    except subprocess.TimeoutExpired:
-        return jsonify({"ok": False, "error": "Connection timeout."})
+        git_status.start()
+        if request.args.get("refresh") or git_status.status()["lastFetch"] is None:
+            git_status.fetch()
+        status = git_status.status()
+        if status["fetchError"]:
+            return jsonify({**status, "ok": False, "error": status["fetchError"]})
+        return jsonify({**status, "ok": True})
     except FileNotFoundError:
         return jsonify({"ok": False, "error": "Git is not installed."})
     except Exception as e:
@@ -866,79 +1673,109 @@ def git_connect():
 
 @app.route("/api/git/commit", methods=["GET"])
 def git_commit():
-    """Returnează commit-ul curent (HEAD)."""
-    repo_root = WORKSPACE_DIR.parent
-    if not (repo_root / ".git").exists():
+    """Returnează commit-ul curent (HEAD) și ahead / behind față de upstream, din cache."""
+    if not git_status.available:
         return jsonify({"ok": False, "error": "No git repo."})
-    commit = _git_head_commit(str(repo_root))
-    return jsonify({"ok": True, "commit": commit or ""})
+    git_status.start()
+    return jsonify({**git_status.status(), "ok": True})
 
 
 @app.route("/api/git/push", methods=["POST"])
 def git_push():
-    """Add, commit, push. Validates expectedCommit before proceeding."""
+    """
+    Add, commit, push prin coada git. Validează expectedCommit (commit-urile făcute de coadă sunt acceptate).
+    Implicit așteaptă rezultatul (același răspuns ca înainte, plus requestId); cu { async: true } răspunde 202 { requestId }.
+    """
     repo_root = WORKSPACE_DIR.parent
     if not (repo_root / ".git").exists():
         return jsonify({"ok": False, "error": "No git repo."})
-    cwd = str(repo_root)
     data = request.get_json() or {}
-    expected_commit = (data.get("expectedCommit") or "").strip()
-    current = _git_head_commit(cwd)
-    if expected_commit and current and current != expected_commit:
-        return jsonify({
-            "ok": False,
-            "error": "Changes have been made in the meantime. Please pull first.",
-            "needPull": True,
-        })
+    req = git_queue.push((data.get("expectedCommit") or "").strip())
+    if data.get("async") or not req.wait(timeout=git_queue.debounce_seconds + 300):
+        return jsonify({"ok": True, "requestId": req.id, "status": req.status}), 202
+    return jsonify({**req.result, "requestId": req.id})
+
+
+@app.route("/api/git/requests/<request_id>", methods=["GET"])
+def git_request_status(request_id):
+    """Status-ul unei cereri de push (queued, running, done, failed) și rezultatul ei."""
+    req = git_queue.get(request_id)
+    if not req:
+        return jsonify({"error": "request not found"}), 404
+    return jsonify(req.to_dict())
+
+
+@app.route("/api/git/queue", methods=["GET"])
+def git_queue_stats():
+    return jsonify(git_queue.stats())
+
+
+@app.route("/api/git/sparse", methods=["GET"])
+def git_sparse_state():
+    """Sparse checkout curent: { sparse, teams, filter }."""
+    if not (WORKSPACE_DIR.parent / ".git").exists():
+        return jsonify({"ok": False, "error": "No git repo."})
     try:
-        workspace_rel = str(WORKSPACE_DIR.relative_to(repo_root)).replace("\\", "/")
-        subprocess.run(["git", "add", workspace_rel], cwd=cwd, capture_output=True, text=True, timeout=10, check=True)
-        r = subprocess.run(
-            ["git", "commit", "-m", "Dashboard: update workspace"],
-            cwd=cwd,
-            capture_output=True,
-            text=True,
-            timeout=10,
-        )
-        out = (r.stdout or "") + (r.stderr or "")
-        nothing_to_commit = r.returncode != 0 and "nothing to commit" in out.lower()
-        if r.returncode != 0 and not nothing_to_commit:
-            return jsonify({"ok": False, "error": (r.stderr or r.stdout or "Commit failed.").strip()})
-        r2 = subprocess.run(["git", "push"], cwd=cwd, capture_output=True, text=True, timeout=60)
-        push_out = (r2.stdout or "") + (r2.stderr or "")
-        if r2.returncode != 0:
-            err = (r2.stderr or r2.stdout or "Push failed.").strip()
-            return jsonify({"ok": False, "error": err})
-        new_commit = _git_head_commit(cwd)
-        if nothing_to_commit or "everything up-to-date" in push_out.lower():
-            return jsonify({
-                "ok": True,
-                "message": "Nothing to push. Your branch is up to date with origin/master.",
-                "commit": new_commit or "",
-                "alreadyUpToDate": True,
-            })
-        return jsonify({"ok": True, "message": "Push successful.", "commit": new_commit or ""})
-    except subprocess.TimeoutExpired:
-        return jsonify({"ok": False, "error": "Timeout."})
+        return jsonify({**git_queue.call(git_sparse.state), "ok": True})
     except FileNotFoundError:
         return jsonify({"ok": False, "error": "Git is not installed."})
-    except Exception as e:
-        return jsonify({"ok": False, "error": str(e)})
+
+
+@app.route("/api/media-offload", methods=["GET"])
+def media_offload_stats():
+    """Status offload media (MEDIA_OFFLOAD): obiecte în store, fișiere urcate / aduse."""
+    return jsonify(media_offload.stats())
 
 
 @app.route("/api/git/pull", methods=["POST"])
 def git_pull():
-    """Run git pull."""
+    """
+    Run git pull.
+    Body opțional: { "teams": ["BSW"] } (sau "team") = pull doar pentru acele echipe (sparse checkout),
+    { "sparse": false } = înapoi la working tree complet.
+    """
     repo_root = WORKSPACE_DIR.parent
     if not (repo_root / ".git").exists():
         return jsonify({"ok": False, "error": "No git repo."})
     cwd = str(repo_root)
+    data = request.get_json(silent=True) or {}
+    teams = data.get("teams") or ([data["team"]] if data.get("team") else None)
+    if teams is not None and not isinstance(teams, list):
+        return jsonify({"ok": False, "error": "teams must be a list."}), 400
+    if teams is not None and not all(isinstance(t, str) and t.strip() for t in teams):
+        return jsonify({"ok": False, "error": "teams must be non-empty team names."}), 400
     try:
-        r = subprocess.run(["git", "pull"], cwd=cwd, capture_output=True, text=True, timeout=60)
+        def pull():
+            if teams:
+                git_sparse.enable(teams)
+            elif data.get("sparse") is False:
+                git_sparse.disable()
+            previous = media_offload.snapshot()
+            with timed_git(["pull"]):
+                result = subprocess.run(["git", "pull"], cwd=cwd, capture_output=True, text=True, timeout=60)
+            # Cu MEDIA_OFFLOAD, fișierele din manifestele noi sunt aduse din object store
+            synced = media_offload.materialize(previous, teams=teams) if result.returncode == 0 else None
+            return result, synced
+
+        # Prin coada git: nu rulează în paralel cu un commit / push în curs
+        r, synced = git_queue.call(pull)
         if r.returncode != 0:
             err = (r.stderr or r.stdout or "Pull failed.").strip()
             return jsonify({"ok": False, "error": err})
-        return jsonify({"ok": True, "message": "Pull successful."})
+        _workspace_index().rescan()
+        git_status.status()
+        # Fișierele șterse/modificate de pull nu mai țin referințe în media store
+        media_store.gc()
+        out = {"ok": True, "message": "Pull successful."}
+        if media_offload.enabled:
+            out["media"] = synced
+        if teams or "sparse" in data:
+            out["sparse"] = git_queue.call(git_sparse.state)
+        return jsonify(out)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"ok": False, "error": str(e)})
     except subprocess.TimeoutExpired:
         return jsonify({"ok": False, "error": "Timeout."})
     except FileNotFoundError:
@@ -947,80 +1784,313 @@ def git_pull():
         return jsonify({"ok": False, "error": str(e)})
 
 
+class _PathTrie:
+    """Prefix tree over path components; protects a path equal to, under, or an ancestor of a stored src."""
+
+    def __init__(self, paths):
+        self.root: dict = {}
+        for p in paths:
+            node = self.root
+            for part in p.split("/"):
+                node = node.setdefault(part, {})
+            node[None] = True
+
+    def protects(self, rel_path: str) -> bool:
+        node = self.root
+        for part in rel_path.split("/"):
+            if None in node:
+                return True
+            node = node.get(part)
+            if node is None:
+                return False
+        return True
+
+
+def _clean_team(index: WorkspaceIndex, team_name: str, dry_run: bool) -> dict:
+    """Curăță (sau doar planifică, la dry run) documents/photos/videos pentru o echipă."""
+    team_dir = WORKSPACE_DIR / team_name
+    pl_path = team_dir / "playlist.json"
+    # Operație distructivă: planul se face pe disc, nu pe indexul care poate rămâne în urmă
+    # (fără watchdog, sau pe share-uri de rețea unde inotify nu primește evenimente)
+    for top in ("playlist.json", "documents", "photos", "videos"):
+        index.refresh(team_name, top)
+    if index.playlist_mtime(team_name) is None:
+        return {"name": team_name, "deleted": [], "errors": [], "skipped": "no playlist.json"}
+    try:
+        data = json_store.read(pl_path)
+        slides = data.get("slides") if isinstance(data.get("slides"), list) else []
+    except Exception as e:
+        return {"name": team_name, "deleted": [], "errors": [f"{team_name}: {e}"], "skipped": "invalid playlist.json"}
+    protected_srcs = set()
+    for s in slides:
+        src = (s.get("src") or "").strip().replace("\\", "/").strip("/")
+        if not src or ".." in src:
+            continue
+        if src.startswith("documents/") or src.startswith("photos/") or src.startswith("videos/"):
+            protected_srcs.add(src)
+            # Originalul și variantele / metadatele lui derivate se păstrează împreună
+            if src.startswith(("photos/", "videos/")):
+                original = original_for(src) or src
+                protected_srcs.update((original, derived_dir(original)))
+    files, dirs = index.media(team_name, ("documents", "photos", "videos"))
+    # Upload-urile pe bucăți în curs (.upload-*.part) și folderele lor nu sunt atinse
+    protected_srcs.update(rel for rel in files if rel.rsplit("/", 1)[-1].startswith(UPLOAD_TEMP_PREFIX))
+    protected = _PathTrie(protected_srcs)
+    to_delete = [rel for rel in list(files) + list(dirs) if not protected.protects(rel)]
+    to_delete.sort(key=lambda p: -p.count("/"))
+    if dry_run:
+        return {"name": team_name, "deleted": to_delete, "errors": []}
+    team_deleted = []
+    errors = []
+    for rel in to_delete:
+        target = (team_dir / rel).resolve()
+        if not str(target).startswith(str(team_dir)) or not target.exists():
+            continue
+        try:
+            if target.is_dir():
+                shutil.rmtree(target)
+            else:
+                target.unlink()
+            team_deleted.append(rel)
+        except Exception as e:
+            errors.append(f"{team_name}/{rel}: {e}")
+    if team_deleted:
+        media_store.release(f"{team_name}/{rel}" for rel in team_deleted)
+        index.refresh(team_name)
+    return {"name": team_name, "deleted": team_deleted, "errors": errors}
+
+
+def _clean_teams(dry_run: bool):
+    """Yields per-team results as teams finish; teams are processed in parallel (CLEAN_WORKSPACE_WORKERS)."""
+    index = _workspace_index()
+    teams = index.teams()
+    if not teams:
+        return
+    try:
+        workers = int(os.environ.get("CLEAN_WORKSPACE_WORKERS", "").strip() or 4)
+    except ValueError:
+        workers = 4
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(teams))), thread_name_prefix="clean-workspace") as pool:
+        futures = [pool.submit(_clean_team, index, t, dry_run) for t in teams]
+        for fut in as_completed(futures):
+            yield fut.result()
+
+
 @app.route("/api/git/clean-workspace", methods=["POST"])
 def clean_workspace():
     """
     Clean WORKSPACE: for each team, delete files/dirs under documents/, photos/, videos/
     that are not referenced in playlist.json. References can be files or directories;
     if a directory is in the playlist, everything inside it is kept (skip).
+    Body / query (opțional): dryRun (doar planul, nu șterge nimic), stream (NDJSON, o linie per echipă
+    + sumar), offset / limit (paginare pentru lista "deleted").
     """
+    data = request.get_json(silent=True) or {}
+
+    def opt(key):
+        value = data.get(key, request.args.get(key))
+        if isinstance(value, str):
+            return value.strip().lower() in ("1", "true", "yes")
+        return bool(value)
+
+    dry_run = opt("dryRun")
     if not WORKSPACE_DIR.exists():
-        return jsonify({"ok": True, "deleted": [], "teams": [], "message": "Workspace not found."})
-    report = {"ok": True, "teams": [], "deleted": [], "errors": []}
-    for team_dir in sorted(WORKSPACE_DIR.iterdir()):
-        if not team_dir.is_dir() or team_dir.name.startswith("."):
-            continue
-        team_name = team_dir.name
-        pl_path = team_dir / "playlist.json"
-        if not pl_path.exists():
-            report["teams"].append({"name": team_name, "deleted": [], "skipped": "no playlist.json"})
-            continue
+        return jsonify({"ok": True, "deleted": [], "teams": [], "message": "Workspace not found.", "dryRun": dry_run})
+
+    if opt("stream"):
+        def generate():
+            total = 0
+            errors = 0
+            for team in _clean_teams(dry_run):
+                total += len(team["deleted"])
+                errors += len(team["errors"])
+                yield json.dumps({"type": "team", **team}, ensure_ascii=False) + "\n"
+            yield json.dumps({"type": "summary", "ok": True, "dryRun": dry_run, "deletedTotal": total, "errorCount": errors}) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    teams = sorted(_clean_teams(dry_run), key=lambda t: t["name"])
+    report = {"ok": True, "dryRun": dry_run, "teams": [], "deleted": [], "errors": []}
+    for team in teams:
+        report["errors"].extend(team.pop("errors"))
+        report["deleted"].extend(f"{team['name']}/{rel}" for rel in team["deleted"])
+        report["teams"].append(team)
+    report["deletedTotal"] = len(report["deleted"])
+    limit = data.get("limit", request.args.get("limit"))
+    if limit is not None:
+        # Paginare: lista plată e tăiată, echipele păstrează doar numărul de elemente
         try:
-            data = json.loads(pl_path.read_text(encoding="utf-8"))
-            slides = data.get("slides") if isinstance(data.get("slides"), list) else []
-        except Exception as e:
-            report["errors"].append(f"{team_name}: {e}")
-            continue
-        protected_srcs = set()
-        for s in slides:
-            src = (s.get("src") or "").strip().replace("\\", "/").strip("/")
-            if not src or ".." in src:
-                continue
-            if src.startswith("documents/") or src.startswith("photos/") or src.startswith("videos/"):
-                protected_srcs.add(src)
-
-        def is_protected(rel_path: str) -> bool:
-            for s in protected_srcs:
-                if s == rel_path or rel_path.startswith(s + "/") or s.startswith(rel_path + "/"):
-                    return True
-            return False
-
-        to_delete = []
-        for sub in ("documents", "photos", "videos"):
-            sub_dir = team_dir / sub
-            if not sub_dir.is_dir():
-                continue
-            for root, dirs, files in os.walk(sub_dir, topdown=False):
-                root_path = Path(root)
-                rel_root = root_path.relative_to(team_dir).as_posix()
-                for f in files:
-                    rel = (root_path / f).relative_to(team_dir).as_posix()
-                    if not is_protected(rel):
-                        to_delete.append(rel)
-                for d in dirs:
-                    rel = (root_path / d).relative_to(team_dir).as_posix()
-                    if not is_protected(rel):
-                        to_delete.append(rel)
-        to_delete.sort(key=lambda p: -p.count("/"))
-        team_deleted = []
-        for rel in to_delete:
-            target = (team_dir / rel).resolve()
-            if not str(target).startswith(str(team_dir)) or not target.exists():
-                continue
-            try:
-                if target.is_dir():
-                    shutil.rmtree(target)
-                else:
-                    target.unlink()
-                team_deleted.append(rel)
-                report["deleted"].append(f"{team_name}/{rel}")
-            except Exception as e:
-                report["errors"].append(f"{team_name}/{rel}: {e}")
-        report["teams"].append({"name": team_name, "deleted": team_deleted})
+            offset = max(0, int(data.get("offset", request.args.get("offset")) or 0))
+            limit = max(0, int(limit))
+        except (TypeError, ValueError):
+            return jsonify({"error": "offset/limit must be integers"}), 400
+        report["deleted"] = report["deleted"][offset:offset + limit]
+        report["offset"] = offset
+        report["nextOffset"] = offset + limit if offset + limit < report["deletedTotal"] else None
+        for team in report["teams"]:
+            team["deletedCount"] = len(team.pop("deleted"))
     return jsonify(report)
 
 
+# ---------- Metrici (Prometheus) ----------
+METRICS_ENABLED = os.environ.get("METRICS", "1").strip().lower() not in ("0", "false", "no")
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_seconds", "Request handling time per route (streamed bodies excluded).", ("route", "method", "status"))
+JOB_SECONDS = REGISTRY.histogram(
+    "job_seconds", "Background job run time (convert-document, convert-web, ingest, ...).", ("kind", "status"),
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600))
+
+# Statisticile existente devin gauge-uri, citite doar la scrape
+for _component, _stats in (
+    ("conversion_cache", conversion_cache.stats),
+    ("json_store", json_store.stats),
+    ("media_store", media_store.stats),
+    ("browser_pool", browser_pool.stats),
+    ("office", office_server.stats),
+    ("jobs", conversion_jobs.stats),
+    ("git_queue", git_queue.stats),
+    ("git_status", git_status.stats),
+    ("workspace_index", workspace_index.stats),
+    ("change_feed", change_feed.stats),
+):
+    REGISTRY.collect(_component, _stats)
+
+if METRICS_ENABLED:
+    @app.before_request
+    def _metrics_start():
+        g.metrics_t0 = time.perf_counter()
+
+    @app.after_request
+    def _metrics_observe(response):
+        t0 = g.pop("metrics_t0", None)
+        if t0 is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+            REQUEST_SECONDS.observe(time.perf_counter() - t0, route=route, method=request.method,
+                                    status=response.status_code)
+        return response
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Metrici în format text Prometheus (latențe per rută, job-uri, git, upload-uri, cache-uri)."""
+    if not METRICS_ENABLED:
+        return jsonify({"error": "metrics disabled"}), 404
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+
+# ---------- Profilare la cerere ----------
+request_profiler = RequestProfiler.from_env(BASE_DIR / "diagnostics" / "profiles")
+REGISTRY.collect("profiler", request_profiler.stats)
+
+
+def _profile_meta() -> dict:
+    """Route, method and params of the current request for the profile record (secrets redacted)."""
+    body = request.get_json(silent=True) if request.is_json else None
+    return {
+        "route": request.url_rule.rule if request.url_rule is not None else None,
+        "method": request.method,
+        "path": request.path,
+        "params": safe_params(request.view_args, request.args.to_dict(), body if isinstance(body, dict) else None),
+    }
+
+
+def _profiled_job(kind: str, body: Callable):
+    """Job pornit dintr-o cerere profilată: corpul job-ului primește propriul profil (route = job:<kind>)."""
+    if "profile" not in g:
+        return body
+    meta = _profile_meta()
+    meta.update({"route": f"job:{kind}", "method": "JOB", "request": meta.pop("route")})
+    return request_profiler.wrap(body, meta)
+
+
+if request_profiler.enabled:
+    @app.before_request
+    def _profile_start():
+        if request.endpoint in ("list_profiles", "get_profile"):
+            return
+        route = request.url_rule.rule if request.url_rule is not None else None
+        if request_profiler.wanted(route, request.headers.get("X-Profile")):
+            prof = request_profiler.start()
+            if prof is not None:
+                g.profile = (prof, time.perf_counter())
+
+    @app.after_request
+    def _profile_stop(response):
+        started = g.pop("profile", None)
+        if started is not None:
+            prof, t0 = started
+            profile_id = request_profiler.stop(prof, time.perf_counter() - t0,
+                                               {**_profile_meta(), "status": response.status_code})
+            if profile_id:
+                response.headers["X-Profile-Id"] = profile_id
+        return response
+
+    @app.teardown_request
+    def _profile_abort(_exc):
+        # Excepție înainte de after_request: profilul se închide oricum (lock-ul nu rămâne ocupat)
+        started = g.pop("profile", None)
+        if started is not None:
+            prof, t0 = started
+            request_profiler.stop(prof, time.perf_counter() - t0, {**_profile_meta(), "status": 500})
+
+
+@app.route("/api/profiles", methods=["GET"])
+def list_profiles():
+    """Profilurile recente, cele mai noi primele (?limit=50). Cu PROFILE_TOKEN setat cere header-ul X-Profile."""
+    if not request_profiler.authorized(request.headers.get("X-Profile")):
+        return jsonify({"error": "forbidden"}), 403
+    try:
+        limit = int(request.args.get("limit") or 50)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    return jsonify({"profiles": request_profiler.list(limit), "stats": request_profiler.stats()})
+
+
+@app.route("/api/profiles/<profile_id>", methods=["GET"])
+def get_profile(profile_id):
+    """Un profil cu funcțiile cele mai costisitoare; ?download=1 trimite fișierul pstats (.prof)."""
+    if not request_profiler.authorized(request.headers.get("X-Profile")):
+        return jsonify({"error": "forbidden"}), 403
+    if request.args.get("download", "").strip().lower() in ("1", "true", "yes"):
+        path = request_profiler.path(profile_id, ".prof")
+        if path is None:
+            return jsonify({"error": "profile not found"}), 404
+        return send_file(path, mimetype="application/octet-stream", as_attachment=True, download_name=path.name)
+    record = request_profiler.get(profile_id)
+    if record is None:
+        return jsonify({"error": "profile not found"}), 404
+    return jsonify(record)
+
+
+def _serve() -> None:
+    """
+    Pornește serverul HTTP. Implicit waitress (multi-thread, pur Python, merge și în build-ul PyInstaller);
+    DASHBOARD_SERVER=dev sau lipsa waitress -> serverul werkzeug, tot cu un thread per cerere.
+    Un singur proces: cozile de job-uri, indexul și lock-urile per echipă sunt în memorie.
+    """
+    host = os.environ.get("DASHBOARD_HOST", "").strip() or "127.0.0.1"
+    try:
+        port = int(os.environ.get("DASHBOARD_PORT", "").strip() or 5000)
+        threads = max(1, int(os.environ.get("DASHBOARD_THREADS", "").strip() or 16))
+    except ValueError:
+        port, threads = 5000, 16
+    if os.environ.get("DASHBOARD_SERVER", "waitress").strip().lower() == "waitress":
+        try:
+            from waitress import serve
+        except ImportError:
+            serve = None
+        if serve is not None:
+            print(f"Serving on http://{host}:{port} (waitress, {threads} threads)")
+            serve(app, host=host, port=port, threads=threads, channel_timeout=300)
+            return
+    # debug=False evită procesul „reloader” care rămânea activ după Ctrl+C
+    app.run(host=host, port=port, debug=False, threaded=True)
+
+
 if __name__ == "__main__":
+    # Necesar pentru pool-ul de procese (randare PDF) în build-ul PyInstaller pe Windows
+    multiprocessing.freeze_support()
     print("WORKSPACE_DIR =", WORKSPACE_DIR)
-    # debug=False evită procesul „reloader” care rămânea activ după Ctrl+C
-    app.run(host="127.0.0.1", port=5000, debug=False)
+    workspace_index.start()
+    git_status.start()
+    _serve()
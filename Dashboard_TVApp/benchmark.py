@@ -0,0 +1,389 @@
+"""
+Benchmark reproductibil pentru API-ul dashboard-ului, pe un WORKSPACE sintetic.
+
+Generează un WORKSPACE temporar (echipe, playlist-uri, fișiere media, documente deja convertite,
+PDF-uri de test), importă aplicația cu WORKSPACE_PATH îndreptat spre el și apelează endpoint-urile
+prin clientul de test Flask (fără rețea). Pentru fiecare scenariu se măsoară latența (p50 / p90 /
+p95 / p99) și throughput-ul, iar rezultatul se scrie într-un fișier JSON (baseline) care poate fi
+comparat cu o rulare ulterioară:
+
+    python benchmark.py --output bench-baseline.json
+    python benchmark.py --compare bench-baseline.json
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+BASE_DIR = Path(__file__).resolve().parent
+SCENARIOS = ("list_teams", "restaurant_status", "get_playlist", "clean_workspace", "upload_team_file",
+             "convert_document")
+BENCH_PDF_DIR = "documents/bench-pdf"
+SECTIONS = ("announcements", "canteen_menu", "info_section")
+
+
+# ---------- WORKSPACE sintetic ----------
+def _png_bytes(rng: random.Random, size: tuple = (64, 36)) -> bytes:
+    from PIL import Image
+
+    img = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+    return buf.getvalue()
+
+
+def _jpeg_bytes(rng: random.Random, size: tuple = (320, 180)) -> bytes:
+    from PIL import Image
+
+    img = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=80)
+    return buf.getvalue()
+
+
+def _pdf_bytes(pages: int, title: str) -> bytes:
+    import fitz  # pymupdf
+
+    doc = fitz.open()
+    try:
+        for n in range(1, pages + 1):
+            page = doc.new_page(width=595, height=842)
+            page.insert_text((72, 96), f"{title} - page {n}", fontsize=24)
+            for line in range(30):
+                page.insert_text((72, 140 + line * 20), f"Line {line + 1}: synthetic benchmark content.", fontsize=11)
+        return doc.tobytes()
+    finally:
+        doc.close()
+
+
+def generate_workspace(root: Path, teams: int, slides: int, media: int, pages: int, pdf_pages: int,
+                       seed: int) -> dict:
+    """
+    Writes a synthetic WORKSPACE under root; the same parameters + seed always give the same tree.
+    Each team: playlist.json with `slides` slides, `media` photos (half referenced, half orphaned for
+    clean_workspace), converted documents with `pages` PNGs each, section content.json files and a
+    documents/bench-pdf/ folder holding a `pdf_pages` page PDF for convert_document.
+    """
+    rng = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    now = datetime.now(timezone.utc)
+    (root / "restaurant_api_status.json").write_text(json.dumps({
+        "ok": True, "message": "OK", "lastRun": (now - timedelta(hours=2)).isoformat(),
+    }), encoding="utf-8")
+    page_png = _png_bytes(rng)
+    pdf = _pdf_bytes(pdf_pages, "Benchmark")
+    files = 0
+    names = [f"team{i:03d}" for i in range(teams)]
+    for team in names:
+        team_dir = root / team
+        for sub in ("photos", "videos", "documents", *SECTIONS):
+            (team_dir / sub).mkdir(parents=True, exist_ok=True)
+        photos = []
+        for m in range(media):
+            name = f"photo_{m:04d}.jpg"
+            (team_dir / "photos" / name).write_bytes(_jpeg_bytes(rng, (160, 90)))
+            photos.append(f"photos/{name}")
+            files += 1
+        docs = []
+        for d in range(max(1, slides // 10)):
+            folder = team_dir / "documents" / f"doc_{d:03d}"
+            folder.mkdir(exist_ok=True)
+            (folder / "source.pdf").write_bytes(b"%PDF-1.4\n% placeholder\n")
+            for p in range(1, pages + 1):
+                (folder / f"{p:03d}.png").write_bytes(page_png)
+            docs.append(f"documents/doc_{d:03d}")
+            files += pages + 1
+        bench_pdf = team_dir / BENCH_PDF_DIR
+        bench_pdf.mkdir(parents=True, exist_ok=True)
+        (bench_pdf / "bench.pdf").write_bytes(pdf)
+        referenced = photos[: len(photos) // 2]
+        playlist = []
+        for s in range(slides):
+            kind = rng.choice(("image", "image", "pdf", "web_url"))
+            slide = {"id": f"{team}-slide-{s}", "duration": rng.randint(5, 60), "enabled": True, "title": f"Slide {s}"}
+            if kind == "image" and referenced:
+                slide.update(type="image", src=rng.choice(referenced))
+            elif kind == "pdf":
+                slide.update(type="pdf", src=rng.choice(docs), converted=True, pageCount=pages, range="all")
+            else:
+                slide.update(type="web_url", src=f"https://example.com/{team}/{s}")
+            playlist.append(slide)
+        playlist.append({"id": f"{team}-bench-pdf", "type": "pdf", "src": BENCH_PDF_DIR, "duration": 10, "enabled": False})
+        (team_dir / "playlist.json").write_text(json.dumps({"slides": playlist, "version": 1}, indent=2), encoding="utf-8")
+        (team_dir / "announcements" / "content.json").write_text(json.dumps({
+            "cooldownSeconds": 30,
+            "items": [{"text": f"Announcement {i} for {team}", "color": "#000000", "bold": False} for i in range(10)],
+        }), encoding="utf-8")
+        (team_dir / "canteen_menu" / "content.json").write_text(json.dumps({
+            "menuPdfItems": [], "menuPdfUrls": [], "restaurantLastUpdated": now.strftime("%Y-%m-%d"),
+        }), encoding="utf-8")
+        (team_dir / "info_section" / "content.json").write_text(json.dumps({
+            "items": [{"title": f"Info {i}", "body": "x" * 200} for i in range(5)],
+        }), encoding="utf-8")
+    return {"teams": names, "files": files, "uploadImage": _jpeg_bytes(rng)}
+
+
+# ---------- măsurare ----------
+def _percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def summarize(samples: list, wall_seconds: float, errors: int) -> dict:
+    values = sorted(samples)
+    ms = lambda v: round(v * 1000, 3)
+    return {
+        "count": len(values),
+        "errors": errors,
+        "throughput": round(len(values) / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+        "meanMs": ms(sum(values) / len(values)) if values else 0.0,
+        "minMs": ms(values[0]) if values else 0.0,
+        "p50Ms": ms(_percentile(values, 50)),
+        "p90Ms": ms(_percentile(values, 90)),
+        "p95Ms": ms(_percentile(values, 95)),
+        "p99Ms": ms(_percentile(values, 99)),
+        "maxMs": ms(values[-1]) if values else 0.0,
+    }
+
+
+def run_scenario(app, call: Callable, iterations: int, warmup: int, concurrency: int) -> dict:
+    """Runs call(client, i) warmup + iterations times over `concurrency` threads (one test client each)."""
+    local = threading.local()
+    samples: list = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def one(i: int, record: bool) -> None:
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        t0 = time.perf_counter()
+        try:
+            call(client, i)
+            failed = False
+        except Exception:
+            failed = True
+        elapsed = time.perf_counter() - t0
+        if record:
+            with lock:
+                if failed:
+                    errors[0] += 1
+                else:
+                    samples.append(elapsed)
+
+    for i in range(warmup):
+        one(i, False)
+    t0 = time.perf_counter()
+    if concurrency <= 1:
+        for i in range(iterations):
+            one(warmup + i, True)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench") as pool:
+            list(pool.map(lambda i: one(warmup + i, True), range(iterations)))
+    return summarize(samples, time.perf_counter() - t0, errors[0])
+
+
+def _expect(resp, *codes: int):
+    if resp.status_code not in codes:
+        raise RuntimeError(f"HTTP {resp.status_code}: {resp.get_data(as_text=True)[:200]}")
+    return resp
+
+
+def build_scenarios(app_module, workspace: dict, job_timeout: float) -> dict:
+    """Scenario name -> call(client, i). Teams rotate with i so concurrent calls spread over the workspace."""
+    teams = workspace["teams"]
+    image = workspace["uploadImage"]
+
+    def team(i: int) -> str:
+        return teams[i % len(teams)]
+
+    def list_teams(client, i):
+        _expect(client.get("/api/teams"), 200)
+
+    def restaurant_status(client, i):
+        _expect(client.get("/api/restaurant-status"), 200)
+
+    def get_playlist(client, i):
+        _expect(client.get(f"/api/teams/{team(i)}/playlist"), 200)
+
+    def clean_workspace(client, i):
+        # dryRun: fiecare iterație vede același WORKSPACE (nimic nu e șters)
+        _expect(client.post("/api/git/clean-workspace", json={"dryRun": True}), 200)
+
+    def upload_team_file(client, i):
+        data = {"kind": "image", "file": (io.BytesIO(image), f"bench_{i}.jpg", "image/jpeg")}
+        _expect(client.post(f"/api/teams/{team(i)}/upload", data=data, content_type="multipart/form-data"), 200)
+
+    def convert_document(client, i):
+        # Latența include și job-ul din fundal: de la cerere până la paginile scrise pe disc
+        resp = _expect(client.post(f"/api/teams/{team(i)}/convert-document",
+                                   json={"src": BENCH_PDF_DIR, "range": "all"}), 202)
+        job = app_module.conversion_jobs.get(resp.get_json()["jobId"])
+        if job is None or not job.wait(job_timeout):
+            raise RuntimeError("convert-document job did not finish")
+        if job.status != "done":
+            raise RuntimeError(job.error or job.status)
+
+    return {
+        "list_teams": list_teams,
+        "restaurant_status": restaurant_status,
+        "get_playlist": get_playlist,
+        "clean_workspace": clean_workspace,
+        "upload_team_file": upload_team_file,
+        "convert_document": convert_document,
+    }
+
+
+def _wait_idle(app_module, timeout: float = 120) -> None:
+    """Waits for background jobs (e.g. image derivatives after uploads) so they don't leak into the next scenario."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if all(j.status in ("done", "failed", "cancelled") for j in app_module.conversion_jobs.list()):
+            return
+        time.sleep(0.05)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        r = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=str(BASE_DIR), capture_output=True,
+                           text=True, timeout=5)
+        return r.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# ---------- comparare ----------
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """Rows (scenario, metric, before, after, delta %, regression) for scenarios present in both runs."""
+    rows = []
+    for name, now in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        for metric, higher_is_worse in (("p50Ms", True), ("p95Ms", True), ("throughput", False)):
+            old, new = before.get(metric) or 0.0, now.get(metric) or 0.0
+            delta = (new - old) / old * 100 if old else 0.0
+            worse = delta > threshold if higher_is_worse else -delta > threshold
+            rows.append((name, metric, old, new, round(delta, 1), worse))
+    return rows
+
+
+def _print_results(results: dict) -> None:
+    print(f"{'scenario':<20}{'n':>6}{'err':>5}{'req/s':>10}{'p50 ms':>10}{'p90 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, r in results["scenarios"].items():
+        print(f"{name:<20}{r['count']:>6}{r['errors']:>5}{r['throughput']:>10}{r['p50Ms']:>10}"
+              f"{r['p90Ms']:>10}{r['p95Ms']:>10}{r['p99Ms']:>10}")
+
+
+def _print_comparison(rows: list, baseline: dict, current: dict, threshold: float) -> bool:
+    if baseline.get("params") != current.get("params"):
+        print("warning: baseline was recorded with different parameters; deltas are not comparable")
+    print(f"\ncompared with {baseline.get('git') or '?'} ({baseline.get('createdAt')}), threshold {threshold}%")
+    regressed = False
+    for name, metric, old, new, delta, worse in rows:
+        regressed = regressed or worse
+        print(f"{name:<20}{metric:<12}{old:>10} -> {new:<10}{delta:>+8}%{'  REGRESSION' if worse else ''}")
+    return regressed
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard API on a synthetic WORKSPACE.")
+    parser.add_argument("--teams", type=int, default=10)
+    parser.add_argument("--slides", type=int, default=40, help="slides per playlist")
+    parser.add_argument("--media", type=int, default=20, help="photos per team (half referenced by the playlist)")
+    parser.add_argument("--pages", type=int, default=3, help="converted pages per document folder")
+    parser.add_argument("--pdf-pages", type=int, default=4, help="pages of the PDF used by convert_document")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--convert-iterations", type=int, default=10,
+                        help="iterations for convert_document (each one renders a PDF)")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the results (baseline) to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to compare against; exit code 1 on regression")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent (default 10)")
+    parser.add_argument("--workdir", help="where to generate the workspace (default: a temp dir, removed afterwards)")
+    args = parser.parse_args(argv)
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error("unknown scenario(s): " + ", ".join(unknown))
+
+    workdir = Path(args.workdir).resolve() if args.workdir else Path(tempfile.mkdtemp(prefix="dashboard-bench-"))
+    ws_root = workdir / "WORKSPACE"
+    if ws_root.exists():
+        shutil.rmtree(ws_root)
+    print(f"Generating workspace in {ws_root} ...")
+    workspace = generate_workspace(ws_root, args.teams, args.slides, args.media, args.pages, args.pdf_pages, args.seed)
+
+    # Aplicația citește configurația la import: WORKSPACE, cache-urile și media store-ul stau în workdir
+    os.environ["WORKSPACE_PATH"] = str(ws_root)
+    os.environ["CONVERSION_CACHE_DIR"] = str(workdir / "conversion-cache")
+    os.environ["MEDIA_STORE_DIR"] = str(workdir / ".media_store")
+    os.environ.setdefault("CONVERSION_CACHE_MAX_MB", "0")  # fără cache, fiecare iterație randează PDF-ul
+    sys.path.insert(0, str(BASE_DIR))
+    import app as app_module
+
+    app_module.app.testing = True
+    calls = build_scenarios(app_module, workspace, job_timeout=120)
+    results = {
+        "version": 1,
+        "createdAt": datetime.now(timezone.utc).isoformat(),
+        "git": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "params": {k: getattr(args, k) for k in ("teams", "slides", "media", "pages", "pdf_pages", "iterations",
+                                                 "warmup", "convert_iterations", "concurrency", "seed")},
+        "workspaceFiles": workspace["files"],
+        "scenarios": {},
+    }
+    try:
+        app_module.workspace_index.start()
+        for name in scenarios:
+            iterations = args.convert_iterations if name == "convert_document" else args.iterations
+            warmup = min(args.warmup, 1) if name == "convert_document" else args.warmup
+            print(f"  {name} ({iterations} x, concurrency {args.concurrency}) ...")
+            results["scenarios"][name] = run_scenario(app_module.app, calls[name], iterations, warmup, args.concurrency)
+            _wait_idle(app_module)
+    finally:
+        app_module.workspace_index.stop()
+        app_module.conversion_jobs.shutdown()
+        app_module.pdf_renderer.shutdown()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print()
+    _print_results(results)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if _print_comparison(compare(baseline, results, args.threshold), baseline, results, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    # Pool-ul de procese pentru randarea PDF pornește procese noi (spawn pe Windows)
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""
+Pool de browsere Chromium (Playwright) ținute calde pentru captura paginilor web.
+
+Playwright sync API este legat de thread-ul care l-a pornit, deci fiecare browser
+are propriul thread worker; job-urile intră printr-o coadă comună (concurență = mărimea pool-ului).
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Callable, Optional
+
+from metrics import REGISTRY
+
+CHROMIUM_LAUNCH_SECONDS = REGISTRY.histogram("chromium_launch_seconds", "Chromium launch time.")
+
+DEFAULT_CONTEXT_OPTIONS = {
+    "viewport": {"width": 1920, "height": 1080},
+    "ignore_https_errors": True,
+}
+
+
+def _env_int(name: str, default: int, minimum: int = 0) -> int:
+    try:
+        return max(minimum, int(os.environ.get(name, "").strip() or default))
+    except ValueError:
+        return default
+
+
+class BrowserPool:
+    """N warm headless Chromium browsers; each job gets a fresh isolated context."""
+
+    def __init__(self, size: int = 2, max_uses: int = 50, launch_args: Optional[list] = None):
+        self.size = max(1, size)
+        self.max_uses = max(0, max_uses)  # 0 = never recycle on count
+        self.launch_args = launch_args or []
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads: list = []
+        self._started = False
+        self._closing = False
+        self._stats = {
+            "launches": 0,
+            "recycles": 0,
+            "crashes": 0,
+            "jobsDone": 0,
+            "jobsFailed": 0,
+            "busy": 0,
+            "alive": 0,
+            "lastLaunchSeconds": None,
+            "startFailures": 0,
+            "lastStartError": None,
+        }
+
+    @classmethod
+    def from_env(cls) -> "BrowserPool":
+        """BROWSER_POOL_SIZE (default 2), BROWSER_POOL_MAX_USES (captures before recycle, default 50)."""
+        return cls(
+            size=_env_int("BROWSER_POOL_SIZE", 2, minimum=1),
+            max_uses=_env_int("BROWSER_POOL_MAX_USES", 50),
+        )
+
+    def _ensure_started(self) -> None:
+        """Start the worker threads if needed; caller holds self._lock."""
+        if self._started:
+            return
+        try:
+            import playwright.sync_api  # noqa: F401
+        except ImportError:
+            raise RuntimeError(
+                "Playwright not installed. Run: pip install playwright && playwright install chromium"
+            )
+        self._started = True
+        self._closing = False
+        for i in range(self.size):
+            t = threading.Thread(target=self._worker, name=f"browser-pool-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _bump(self, key: str, delta: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += delta
+
+    def _launch(self, playwright):
+        t0 = time.perf_counter()
+        browser = playwright.chromium.launch(headless=True, args=self.launch_args)
+        with self._lock:
+            self._stats["launches"] += 1
+            self._stats["alive"] += 1
+            self._stats["lastLaunchSeconds"] = round(time.perf_counter() - t0, 3)
+        CHROMIUM_LAUNCH_SECONDS.observe(time.perf_counter() - t0)
+        return browser
+
+    def _close_browser(self, browser) -> None:
+        try:
+            browser.close()
+        except Exception:
+            pass
+        self._bump("alive", -1)
+
+    def _startup_failed(self, error: BaseException) -> None:
+        """Driver could not start in this worker: when no worker is left, fail the queue and allow a retry."""
+        with self._lock:
+            self._stats["startFailures"] += 1
+            self._stats["lastStartError"] = str(error) or type(error).__name__
+            me = threading.current_thread()
+            if me not in self._threads:
+                return  # pool oprit / repornit între timp
+            self._threads = [t for t in self._threads if t is not me]
+            if self._threads:
+                return  # alt worker a pornit (sau încă pornește) și servește coada
+            self._started = False
+            # submit() pune în coadă sub același lock, deci nu rămâne nimic nepreluat după golire
+            while True:
+                try:
+                    item = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    continue
+                fut = item[2]
+                if fut.set_running_or_notify_cancel():
+                    fut.set_exception(RuntimeError(f"Playwright failed to start: {self._stats['lastStartError']}"))
+                    self._stats["jobsFailed"] += 1
+
+    def _worker(self) -> None:
+        try:
+            from playwright.sync_api import sync_playwright
+
+            manager = sync_playwright()
+            p = manager.__enter__()
+        except BaseException as e:
+            self._startup_failed(e)
+            return
+        try:
+            self._serve(p)
+        finally:
+            try:
+                manager.__exit__(None, None, None)
+            except Exception:
+                pass
+
+    def _serve(self, p) -> None:
+        browser = None
+        uses = 0
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                break
+            fn, context_options, fut = item
+            if not fut.set_running_or_notify_cancel():
+                continue
+            self._bump("busy")
+            try:
+                if browser is None or not browser.is_connected():
+                    if browser is not None:
+                        self._bump("crashes")
+                        self._close_browser(browser)
+                    browser = self._launch(p)
+                    uses = 0
+                context = browser.new_context(**context_options)
+                try:
+                    result = fn(context)
+                finally:
+                    try:
+                        context.close()
+                    except Exception:
+                        pass
+                uses += 1
+                self._bump("jobsDone")
+                fut.set_result(result)
+            except BaseException as e:
+                self._bump("jobsFailed")
+                fut.set_exception(e)
+                # Browserul a căzut în timpul job-ului: îl relansăm la următorul job
+                if browser is not None and not browser.is_connected():
+                    self._bump("crashes")
+                    self._close_browser(browser)
+                    browser = None
+            finally:
+                self._bump("busy", -1)
+            if browser is not None and self.max_uses and uses >= self.max_uses:
+                self._bump("recycles")
+                self._close_browser(browser)
+                browser = None
+        if browser is not None:
+            self._close_browser(browser)
+
+    def submit(self, fn: Callable[[Any], Any], context_options: Optional[dict] = None) -> Future:
+        """Queue fn(context) to run on a pooled browser. Returns a Future."""
+        fut: Future = Future()
+        with self._lock:
+            self._ensure_started()
+            self._jobs.put((fn, dict(context_options or DEFAULT_CONTEXT_OPTIONS), fut))
+        return fut
+
+    def run(self, fn: Callable[[Any], Any], context_options: Optional[dict] = None, timeout: Optional[float] = None):
+        """Blocking variant of submit(); on timeout a still-queued job is cancelled and RuntimeError is raised."""
+        fut = self.submit(fn, context_options)
+        try:
+            return fut.result(timeout=timeout)
+        except FutureTimeout:
+            fut.cancel()  # dacă n-a pornit încă, worker-ul îl sare
+            raise RuntimeError(f"browser capture timed out after {timeout:g}s") from None
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out.update({
+                "size": self.size,
+                "maxUses": self.max_uses,
+                "started": self._started,
+                "queued": self._jobs.qsize(),
+            })
+        return out
+
+    def shutdown(self, wait: bool = True, timeout: float = 10.0) -> None:
+        with self._lock:
+            if not self._started or self._closing:
+                return
+            self._closing = True
+            threads = list(self._threads)
+        for _ in threads:
+            self._jobs.put(None)
+        if wait:
+            for t in threads:
+                t.join(timeout=timeout)
+        with self._lock:
+            self._threads = []
+            self._started = False
@@ -0,0 +1,160 @@
+"""
+Flux de evenimente (Server-Sent Events) pentru modificările din WORKSPACE și din git.
+
+Evenimentele (playlist.changed, section.changed, media.added, media.removed, team.added,
+team.removed, job.finished, git.head) primesc un id crescător și sunt ținute într-un jurnal în
+memorie, mărginit. Un client care se reconectează trimite ultimul id primit (Last-Event-ID sau
+?since=) și primește evenimentele pierdute; dacă acestea au ieșit deja din jurnal (sau serverul a
+fost repornit), primește un eveniment `reset` și trebuie să reîncarce datele.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Iterable, Optional
+
+
+class ChangeFeed:
+    """Bounded in-memory event log + blocking iteration for SSE streams."""
+
+    def __init__(self, max_events: int = 1000, heartbeat_seconds: float = 15, stream_seconds: float = 300,
+                 max_clients: int = 8):
+        self.max_events = max(1, max_events)
+        self.heartbeat_seconds = max(1.0, heartbeat_seconds)
+        self.stream_seconds = max(self.heartbeat_seconds, stream_seconds)
+        self.max_clients = max(0, max_clients)
+        self.epoch = uuid.uuid4().hex[:8]  # se schimbă la repornire: token-urile vechi nu mai sunt valide
+        self._events: deque = deque(maxlen=self.max_events)
+        self._seq = 0
+        self._clients = 0
+        self._cond = threading.Condition()
+        self._stats = {"published": 0, "streams": 0, "rejected": 0, "resets": 0}
+
+    @classmethod
+    def from_env(cls) -> "ChangeFeed":
+        """
+        CHANGE_FEED_EVENTS (1000), CHANGE_FEED_HEARTBEAT_SECONDS (15), CHANGE_FEED_STREAM_SECONDS (300),
+        CHANGE_FEED_MAX_CLIENTS (default: half of DASHBOARD_THREADS - every open stream holds a server thread).
+        """
+        def env_num(name: str, default: float) -> float:
+            try:
+                return float(os.environ.get(name, "").strip() or default)
+            except ValueError:
+                return default
+
+        threads = int(env_num("DASHBOARD_THREADS", 16))
+        return cls(
+            max_events=int(env_num("CHANGE_FEED_EVENTS", 1000)),
+            heartbeat_seconds=env_num("CHANGE_FEED_HEARTBEAT_SECONDS", 15),
+            stream_seconds=env_num("CHANGE_FEED_STREAM_SECONDS", 300),
+            max_clients=int(env_num("CHANGE_FEED_MAX_CLIENTS", max(1, threads // 2))),
+        )
+
+    # ---------- publicare ----------
+    def publish(self, kind: str, team: Optional[str] = None, **data) -> dict:
+        with self._cond:
+            self._seq += 1
+            event = {"id": f"{self.epoch}-{self._seq}", "seq": self._seq, "type": kind, "team": team,
+                     "time": time.time(), "data": data}
+            self._events.append(event)
+            self._stats["published"] += 1
+            self._cond.notify_all()
+        return event
+
+    def token(self) -> str:
+        """Resume token for "now" (nothing missed yet)."""
+        with self._cond:
+            return f"{self.epoch}-{self._seq}"
+
+    def _parse(self, token: Optional[str]) -> Optional[int]:
+        """Sequence number from a resume token; None if missing, malformed or from another server run."""
+        epoch, _, seq = (token or "").partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def _since(self, seq: Optional[int], teams: Optional[set]) -> tuple:
+        """(events after seq for the teams, reset) - reset when seq can no longer be resumed from the log."""
+        if seq is None:
+            return [], True
+        oldest = self._events[0]["seq"] if self._events else self._seq + 1
+        reset = seq < oldest - 1 or seq > self._seq
+        events = [e for e in self._events if e["seq"] > seq and (teams is None or e["team"] is None or e["team"] in teams)]
+        return events, reset
+
+    # ---------- SSE ----------
+    @staticmethod
+    def format(event: dict) -> str:
+        payload = {k: event[k] for k in ("type", "team", "time", "data")}
+        return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    def acquire(self) -> bool:
+        """Reserve a stream slot (max_clients; 0 = unlimited). False when the server is at capacity."""
+        with self._cond:
+            if self.max_clients and self._clients >= self.max_clients:
+                self._stats["rejected"] += 1
+                return False
+            self._clients += 1
+            self._stats["streams"] += 1
+            return True
+
+    def release(self) -> None:
+        with self._cond:
+            self._clients = max(0, self._clients - 1)
+
+    def stream(self, token: Optional[str], teams: Optional[Iterable[str]] = None):
+        """
+        SSE generator for a client holding a slot from acquire() (the caller releases it when the response closes).
+        Ends after stream_seconds; the browser's EventSource reconnects with Last-Event-ID.
+        """
+        teams = set(teams) if teams else None
+        deadline = time.monotonic() + self.stream_seconds
+        with self._cond:
+            if token:
+                seq = self._parse(token)
+                events, reset = self._since(seq, teams)
+                if reset:
+                    self._stats["resets"] += 1
+                    events, seq = [], self._seq
+            else:
+                events, reset, seq = [], False, self._seq
+        yield "retry: 3000\n\n"
+        # `ready` dă clientului un token de reluare chiar dacă nu vine niciun eveniment
+        yield self.format({"id": f"{self.epoch}-{seq}", "type": "reset" if reset else "ready", "team": None,
+                           "time": time.time(), "data": {}})
+        for e in events:
+            seq = e["seq"]
+            yield self.format(e)
+        while time.monotonic() < deadline:
+            with self._cond:
+                if self._seq == seq:
+                    self._cond.wait(min(self.heartbeat_seconds, max(0.0, deadline - time.monotonic())))
+                events, reset = self._since(seq, teams)
+                if reset:
+                    # Clientul a rămas prea mult în urmă (jurnal depășit): reîncărcare completă
+                    self._stats["resets"] += 1
+                    events, seq = [], self._seq
+                else:
+                    seq = self._seq
+            if reset:
+                yield self.format({"id": f"{self.epoch}-{seq}", "type": "reset", "team": None,
+                                   "time": time.time(), "data": {}})
+            elif events:
+                for e in events:
+                    yield self.format(e)
+            else:
+                yield ": keepalive\n\n"
+
+    def stats(self) -> dict:
+        with self._cond:
+            out = dict(self._stats)
+            out.update({
+                "clients": self._clients,
+                "maxClients": self.max_clients,
+                "events": len(self._events),
+                "maxEvents": self.max_events,
+                "lastId": f"{self.epoch}-{self._seq}",
+            })
+        return out
@@ -0,0 +1,181 @@
+"""
+Upload-uri reluabile pe bucăți (init -> PUT chunk-uri cu offset -> finalize).
+
+Fișierul se scrie direct în folderul destinație sub un nume temporar (.upload-<id>.part),
+cu hash SHA-256 calculat pe parcurs; după o deconectare clientul cere offset-ul curent și continuă.
+La finalize fișierul temporar este redenumit atomic în numele final.
+"""
+import hashlib
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+TEMP_PREFIX = ".upload-"
+BLOCK_SIZE = 1024 * 1024
+
+
+class UploadError(ValueError):
+    """Invalid upload request; reported to the client with status 400."""
+
+
+class UploadOffsetMismatch(Exception):
+    """The chunk does not start at the current offset; the client should resume from `offset`."""
+
+    def __init__(self, offset: int):
+        super().__init__(f"offset mismatch, resume from {offset}")
+        self.offset = offset
+
+
+class UploadSession:
+    def __init__(self, team: str, dest: Path, size: int, meta: dict, expected_sha256: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.team = team
+        self.dest = dest
+        self.temp = dest.parent / f"{TEMP_PREFIX}{self.id}.part"
+        self.size = size
+        self.meta = meta
+        self.expected_sha256 = (expected_sha256 or "").strip().lower() or None
+        self.offset = 0
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self._hash = hashlib.sha256()
+        self.lock = threading.Lock()
+
+    def sha256(self) -> str:
+        return self._hash.copy().hexdigest()
+
+    def write(self, stream, offset: int, chunk_sha256: Optional[str] = None, max_chunk: int = 64 * 1024 * 1024) -> int:
+        """Append the request body at `offset`. With chunk_sha256 the chunk is buffered and verified before writing."""
+        with self.lock:
+            if offset != self.offset:
+                raise UploadOffsetMismatch(self.offset)
+            with open(self.temp, "r+b") as f:
+                # Resturi dintr-un chunk întrerupt anterior se suprascriu de la offset-ul confirmat
+                f.seek(self.offset)
+                f.truncate()
+                if chunk_sha256:
+                    data = stream.read(max_chunk + 1)
+                    if len(data) > max_chunk:
+                        raise UploadError("chunk too large")
+                    if self.offset + len(data) > self.size:
+                        raise UploadError("chunk exceeds declared size")
+                    if hashlib.sha256(data).hexdigest() != chunk_sha256.strip().lower():
+                        raise UploadError("chunk checksum mismatch")
+                    f.write(data)
+                    self._hash.update(data)
+                    self.offset += len(data)
+                else:
+                    while True:
+                        block = stream.read(BLOCK_SIZE)
+                        if not block:
+                            break
+                        if self.offset + len(block) > self.size:
+                            raise UploadError("chunk exceeds declared size")
+                        f.write(block)
+                        f.flush()
+                        self._hash.update(block)
+                        self.offset += len(block)
+            self.updated_at = time.time()
+            return self.offset
+
+    def to_dict(self) -> dict:
+        return {
+            "uploadId": self.id,
+            "team": self.team,
+            "offset": self.offset,
+            "size": self.size,
+            "complete": self.offset == self.size,
+        }
+
+
+class UploadManager:
+    """In-memory registry of open upload sessions; sessions idle longer than ttl are discarded."""
+
+    def __init__(self, ttl_seconds: float = 24 * 3600, chunk_size: int = 8 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.chunk_size = chunk_size
+        self._sessions: dict = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "UploadManager":
+        """UPLOAD_CHUNK_MB (recommended chunk size, default 8), UPLOAD_SESSION_TTL_HOURS (default 24)."""
+        def env_float(name: str, default: float) -> float:
+            try:
+                return float(os.environ.get(name, "").strip() or default)
+            except ValueError:
+                return default
+
+        return cls(
+            ttl_seconds=env_float("UPLOAD_SESSION_TTL_HOURS", 24) * 3600,
+            chunk_size=int(env_float("UPLOAD_CHUNK_MB", 8) * 1024 * 1024),
+        )
+
+    def create(self, team: str, dest: Path, size: int, meta: dict, expected_sha256: Optional[str] = None) -> UploadSession:
+        if size < 0:
+            raise UploadError("invalid size")
+        self._expire()
+        session = UploadSession(team, dest, size, meta, expected_sha256)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        session.temp.touch()
+        with self._lock:
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, upload_id: str, team: Optional[str] = None) -> Optional[UploadSession]:
+        self._expire()
+        with self._lock:
+            session = self._sessions.get(upload_id)
+        if session is None or (team is not None and session.team != team):
+            return None
+        return session
+
+    def finalize(self, session: UploadSession) -> Path:
+        """Check size and hash, then atomically move the temp file to its final name."""
+        with session.lock:
+            if session.offset != session.size:
+                raise UploadError(f"upload incomplete ({session.offset}/{session.size} bytes)")
+            if session.expected_sha256 and session.sha256() != session.expected_sha256:
+                raise UploadError("sha256 mismatch")
+            os.replace(session.temp, session.dest)
+        with self._lock:
+            self._sessions.pop(session.id, None)
+        return session.dest
+
+    def abort(self, session: UploadSession) -> None:
+        with self._lock:
+            self._sessions.pop(session.id, None)
+        self._discard(session)
+
+    @staticmethod
+    def _discard(session: UploadSession) -> None:
+        try:
+            session.temp.unlink()
+        except OSError:
+            pass
+        if session.meta.get("ownsDir"):
+            try:
+                session.dest.parent.rmdir()  # doar dacă e gol
+            except OSError:
+                pass
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            stale = [s for s in self._sessions.values() if s.updated_at < cutoff]
+            for s in stale:
+                self._sessions.pop(s.id, None)
+        for s in stale:
+            self._discard(s)
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return {
+            "open": len(sessions),
+            "bytesPending": sum(s.size - s.offset for s in sessions),
+            "chunkSize": self.chunk_size,
+        }
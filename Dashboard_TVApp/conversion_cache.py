@@ -0,0 +1,264 @@
+"""
+Cache adresat după conținut pentru conversiile de documente.
+
+Cheia = hash-ul fișierului sursă + lista de pagini + setările de randare. Paginile randate
+(001.png, ...) și PDF-ul generat din Office sunt stocate o singură dată și copiate în
+documents/<folder> prin hardlink (sau copie, dacă hardlink nu e posibil). Dimensiunea totală
+este limitată; la depășire se elimină intrările folosite cel mai demult (LRU).
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+
+def _link_or_copy(src: Path, dest: Path) -> None:
+    if dest.exists() or dest.is_symlink():
+        dest.unlink()
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+
+
+def _tree_size(path: Path) -> int:
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for f in files:
+            try:
+                total += (Path(root) / f).stat().st_size
+            except OSError:
+                pass
+    return total
+
+
+class ConversionCache:
+    """Pages cache (cache/pages/<key>/) and Office->PDF cache (cache/pdf/<hash>.pdf) with size-bounded LRU."""
+
+    def __init__(self, root: Path, max_bytes: int = 2 * 1024 ** 3, max_digests: int = 1024):
+        self.root = root
+        self.max_bytes = max(0, max_bytes)
+        self.max_digests = max(1, max_digests)
+        self._lock = threading.Lock()
+        self._digests: "OrderedDict[tuple, str]" = OrderedDict()  # (path, size, mtime_ns) -> sha256, LRU
+        self._entries: Optional[dict] = None  # entry path -> [size, last_used]
+        self._bytes = 0  # suma dimensiunilor din _entries, ținută la zi la adăugare / evacuare
+        self._stats = {"hits": 0, "misses": 0, "pdfHits": 0, "pdfMisses": 0, "evictions": 0}
+
+    @classmethod
+    def from_env(cls, default_root: Path) -> "ConversionCache":
+        """CONVERSION_CACHE_DIR (default <dashboard>/cache/conversions), CONVERSION_CACHE_MAX_MB (2048; 0 = disabled)."""
+        root = Path(os.environ.get("CONVERSION_CACHE_DIR", "").strip() or default_root)
+        try:
+            max_mb = int(os.environ.get("CONVERSION_CACHE_MAX_MB", "").strip() or 2048)
+        except ValueError:
+            max_mb = 2048
+        return cls(root.resolve(), max_bytes=max_mb * 1024 * 1024)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def digest(self, path: Path) -> str:
+        """sha256 of the file; memoized per (path, size, mtime) so unchanged files are hashed once."""
+        st = path.stat()
+        memo_key = (str(path), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            cached = self._digests.get(memo_key)
+            if cached:
+                self._digests.move_to_end(memo_key)
+                return cached
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(block)
+        value = h.hexdigest()
+        with self._lock:
+            self._digests[memo_key] = value
+            while len(self._digests) > self.max_digests:
+                self._digests.popitem(last=False)
+        return value
+
+    @staticmethod
+    def pages_key(source_hash: str, page_list: list, settings: dict) -> str:
+        raw = json.dumps({"src": source_hash, "pages": page_list, "settings": settings}, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # ---------- index LRU ----------
+    def _load_index(self) -> None:
+        """Scan the cache dir once (outside the lock); afterwards the index and _bytes are kept up to date."""
+        if self._entries is not None:
+            return
+        entries = {}
+        if self.root.exists():
+            for kind in ("pages", "pdf"):
+                base = self.root / kind
+                if not base.is_dir():
+                    continue
+                for shard in base.iterdir():
+                    if not shard.is_dir():
+                        continue
+                    for entry in shard.iterdir():
+                        if entry.name.startswith("."):
+                            continue
+                        try:
+                            size = _tree_size(entry) if entry.is_dir() else entry.stat().st_size
+                            entries[str(entry)] = [size, entry.stat().st_mtime]
+                        except OSError:
+                            continue
+        with self._lock:
+            if self._entries is None:
+                self._entries = entries
+                self._bytes = sum(v[0] for v in entries.values())
+
+    def _touch(self, entry: Path) -> None:
+        now = time.time()
+        self._load_index()
+        with self._lock:
+            item = self._entries.get(str(entry))
+            if item:
+                item[1] = now
+        try:
+            os.utime(entry, (now, now))
+        except OSError:
+            pass
+
+    def _add(self, entry: Path, size: int) -> None:
+        self._load_index()
+        with self._lock:
+            previous = self._entries.get(str(entry))
+            self._bytes += size - (previous[0] if previous else 0)
+            self._entries[str(entry)] = [size, time.time()]
+            self._evict_locked(keep=str(entry))
+
+    def _evict_locked(self, keep: str) -> None:
+        entries = self._entries
+        if self._bytes <= self.max_bytes:
+            return
+        for path, (size, _used) in sorted(entries.items(), key=lambda kv: kv[1][1]):
+            if self._bytes <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            p = Path(path)
+            try:
+                if p.is_dir():
+                    shutil.rmtree(p)
+                else:
+                    p.unlink()
+            except OSError:
+                continue
+            entries.pop(path, None)
+            self._bytes -= size
+            self._stats["evictions"] += 1
+
+    def _bump(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    # ---------- pagini randate ----------
+    def _pages_dir(self, key: str) -> Path:
+        return self.root / "pages" / key[:2] / key
+
+    def materialize_pages(self, key: str, out_dir: Path) -> Optional[int]:
+        """On hit, link the cached pages into out_dir and return the page count; None on miss."""
+        if not self.enabled:
+            return None
+        entry = self._pages_dir(key)
+        meta_path = entry / "meta.json"
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            names = meta["files"]
+            out_dir.mkdir(parents=True, exist_ok=True)
+            for name in names:
+                _link_or_copy(entry / name, out_dir / name)
+        except (OSError, ValueError, KeyError):
+            self._bump("misses")
+            return None
+        self._touch(entry)
+        self._bump("hits")
+        return len(names)
+
+    def store_pages(self, key: str, out_dir: Path, names: list) -> None:
+        """Copy freshly rendered pages (names in out_dir) into the cache."""
+        if not self.enabled or not names:
+            return
+        entry = self._pages_dir(key)
+        if entry.exists():
+            return
+        tmp = entry.parent / f".tmp-{uuid.uuid4().hex}"
+        try:
+            tmp.mkdir(parents=True)
+            size = 0
+            for name in names:
+                _link_or_copy(out_dir / name, tmp / name)
+                size += (tmp / name).stat().st_size
+            (tmp / "meta.json").write_text(json.dumps({"files": names, "created": time.time()}), encoding="utf-8")
+            size += (tmp / "meta.json").stat().st_size
+            os.replace(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        self._add(entry, size)
+
+    # ---------- PDF generat din Office ----------
+    def _pdf_path(self, source_hash: str) -> Path:
+        return self.root / "pdf" / source_hash[:2] / f"{source_hash}.pdf"
+
+    def materialize_pdf(self, source_hash: str, dest: Path) -> bool:
+        if not self.enabled:
+            return False
+        cached = self._pdf_path(source_hash)
+        if not cached.is_file():
+            self._bump("pdfMisses")
+            return False
+        try:
+            _link_or_copy(cached, dest)
+        except OSError:
+            self._bump("pdfMisses")
+            return False
+        self._touch(cached)
+        self._bump("pdfHits")
+        return True
+
+    def store_pdf(self, source_hash: str, pdf_path: Path) -> None:
+        if not self.enabled:
+            return
+        cached = self._pdf_path(source_hash)
+        if cached.exists():
+            return
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cached.parent / f".tmp-{uuid.uuid4().hex}.pdf"
+        try:
+            shutil.copy2(pdf_path, tmp)
+            os.replace(tmp, cached)
+        except OSError:
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+            return
+        self._add(cached, cached.stat().st_size)
+
+    def stats(self) -> dict:
+        if self.enabled:
+            self._load_index()  # o singură dată per proces, fără lock
+        with self._lock:
+            out = dict(self._stats)
+            out.update({
+                "enabled": self.enabled,
+                "dir": str(self.root),
+                "entries": len(self._entries or {}),
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "digests": len(self._digests),
+            })
+        lookups = out["hits"] + out["misses"]
+        out["hitRate"] = round(out["hits"] / lookups, 3) if lookups else None
+        return out
@@ -0,0 +1,299 @@
+"""
+Coadă pentru operațiile git ale dashboard-ului (add / commit / push, pull).
+
+Un singur thread execută toate operațiile, deci nu mai există curse pe index. Cererile de push
+sosite într-o fereastră de GIT_PUSH_DEBOUNCE_SECONDS sunt grupate într-un singur commit. Dacă
+push-ul e respins (non-fast-forward), se face `git pull --rebase` și push-ul se reîncearcă.
+Fiecare cerere are un id și un status: queued, running, done, failed.
+"""
+import os
+import subprocess
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Optional
+
+from metrics import timed_git
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_NON_FAST_FORWARD = ("non-fast-forward", "fetch first", "[rejected]", "updates were rejected")
+
+
+class GitRequest:
+    def __init__(self, kind: str, expected_commit: Optional[str] = None):
+        self.id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.expected_commit = expected_commit or None
+        self.status = QUEUED
+        self.result: dict = {}
+        self.batch_size = 1
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._event = threading.Event()
+
+    def finish(self, result: dict) -> None:
+        self.result = result
+        self.status = DONE if result.get("ok") else FAILED
+        self.finished_at = time.time()
+        self._event.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._event.wait(timeout)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "result": self.result or None,
+            "batchSize": self.batch_size,
+            "createdAt": self.created_at,
+            "finishedAt": self.finished_at,
+        }
+
+
+class GitQueue:
+    """Serializes git work on one worker thread and coalesces pushes into one commit per debounce window."""
+
+    def __init__(self, repo_root: Path, pathspec: Optional[str], debounce_seconds: float = 3.0,
+                 retries: int = 2, keep: int = 200, timeout: int = 60, own_heads: int = 50):
+        self.repo_root = repo_root
+        self.pathspec = pathspec
+        self.debounce_seconds = max(0.0, debounce_seconds)
+        self.retries = max(0, retries)
+        self.keep = keep
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._pushes: list = []
+        self._first_push_at: Optional[float] = None
+        self._calls: deque = deque()
+        self._requests: "OrderedDict[str, GitRequest]" = OrderedDict()
+        # Lanțul HEAD-urilor produse de coadă fără commit-uri străine între ele (ultimul = HEAD-ul curent):
+        # un expectedCommit din lanț e vechi doar față de propriile noastre commit-uri și e acceptat
+        self._own_chain: deque = deque(maxlen=max(1, own_heads))
+        self._thread: Optional[threading.Thread] = None
+        # Apelat înainte de `git add`; întoarce căi (relative la repo) care nu mai trebuie urmărite de git
+        self.before_add: Optional[Callable[[], list]] = None
+        # Apelat după un `pull --rebase` reușit (ex. refacerea fișierelor media aduse de remote)
+        self.after_rebase: Optional[Callable[[], object]] = None
+        # Apelat după fiecare push reușit (ex. anunțarea noului HEAD)
+        self.after_push: Optional[Callable[[], object]] = None
+        self._stats = {"pushRequests": 0, "commits": 0, "pushes": 0, "rebases": 0, "failures": 0}
+
+    @classmethod
+    def from_env(cls, repo_root: Path, pathspec: Optional[str]) -> "GitQueue":
+        """GIT_PUSH_DEBOUNCE_SECONDS (3), GIT_PUSH_RETRIES (rebase + push attempts after a rejection, 2)."""
+        def env_num(name: str, default: float) -> float:
+            try:
+                return float(os.environ.get(name, "").strip() or default)
+            except ValueError:
+                return default
+
+        return cls(repo_root, pathspec, debounce_seconds=env_num("GIT_PUSH_DEBOUNCE_SECONDS", 3),
+                   retries=int(env_num("GIT_PUSH_RETRIES", 2)))
+
+    # ---------- API ----------
+    def push(self, expected_commit: Optional[str] = None) -> GitRequest:
+        req = GitRequest("push", expected_commit)
+        with self._cond:
+            self._remember(req)
+            self._pushes.append(req)
+            if self._first_push_at is None:
+                self._first_push_at = time.monotonic()
+            self._stats["pushRequests"] += 1
+            self._ensure_worker()
+            self._cond.notify_all()
+        return req
+
+    def call(self, fn: Callable[[], object]):
+        """Run fn on the git worker (after the operations already queued) and return its result."""
+        fut: Future = Future()
+        with self._cond:
+            self._calls.append((fn, fut))
+            self._ensure_worker()
+            self._cond.notify_all()
+        return fut.result()
+
+    def get(self, request_id: str) -> Optional[GitRequest]:
+        with self._cond:
+            return self._requests.get(request_id)
+
+    def stats(self) -> dict:
+        with self._cond:
+            out = dict(self._stats)
+            out.update({
+                "queuedPushes": len(self._pushes),
+                "queuedCalls": len(self._calls),
+                "debounceSeconds": self.debounce_seconds,
+                "retries": self.retries,
+            })
+        return out
+
+    # ---------- worker ----------
+    def _remember(self, req: GitRequest) -> None:
+        self._requests[req.id] = req
+        while len(self._requests) > self.keep:
+            self._requests.popitem(last=False)
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._worker, name="git-queue", daemon=True)
+            self._thread.start()
+
+    def _worker(self) -> None:
+        while True:
+            call, batch = None, None
+            with self._cond:
+                while not self._pushes and not self._calls:
+                    self._cond.wait()
+                if self._calls:
+                    call = self._calls.popleft()
+                else:
+                    remaining = self._first_push_at + self.debounce_seconds - time.monotonic()
+                    if remaining > 0:
+                        self._cond.wait(remaining)
+                        continue
+                    batch, self._pushes, self._first_push_at = self._pushes, [], None
+            if call is not None:
+                fn, fut = call
+                if fut.set_running_or_notify_cancel():
+                    try:
+                        fut.set_result(fn())
+                    except BaseException as e:
+                        fut.set_exception(e)
+            else:
+                self._run_push(batch)
+
+    def _git(self, *args: str, timeout: Optional[int] = None) -> subprocess.CompletedProcess:
+        with timed_git(args):
+            return subprocess.run(["git", *args], cwd=str(self.repo_root), capture_output=True, text=True,
+                                  timeout=timeout or self.timeout)
+
+    def head(self) -> Optional[str]:
+        r = self._git("rev-parse", "HEAD", timeout=5)
+        return (r.stdout or "").strip() if r.returncode == 0 else None
+
+    def _run_push(self, batch: list) -> None:
+        for req in batch:
+            req.status = RUNNING
+            req.batch_size = len(batch)
+        try:
+            current = self.head()
+            own = self._own_heads(current)
+            accepted = []
+            for req in batch:
+                if req.expected_commit and current and req.expected_commit != current \
+                        and req.expected_commit not in own:
+                    req.finish({
+                        "ok": False,
+                        "error": "Changes have been made in the meantime. Please pull first.",
+                        "needPull": True,
+                    })
+                else:
+                    accepted.append(req)
+            if not accepted:
+                return
+            result = self._commit_and_push(current, len(accepted))
+        except subprocess.TimeoutExpired:
+            result = {"ok": False, "error": "Timeout."}
+        except FileNotFoundError:
+            result = {"ok": False, "error": "Git is not installed."}
+        except Exception as e:
+            result = {"ok": False, "error": str(e)}
+        if not result.get("ok"):
+            with self._cond:
+                self._stats["failures"] += 1
+        for req in batch:
+            if req.status == RUNNING:
+                req.finish(dict(result))
+
+    def _own_heads(self, current: Optional[str]) -> set:
+        """Own heads still valid for `current`; empty once HEAD moved outside the queue (pull, external commit)."""
+        with self._cond:
+            if not current or not self._own_chain or self._own_chain[-1] != current:
+                return set()
+            return set(self._own_chain)
+
+    def _record_head(self, head_before: Optional[str], new_commit: Optional[str], rebased: bool) -> None:
+        """Extend the own-head chain after a push; a rebase brought foreign commits, so the chain restarts."""
+        with self._cond:
+            if rebased or not head_before or not self._own_chain or self._own_chain[-1] != head_before:
+                self._own_chain.clear()
+                if head_before and not rebased:
+                    self._own_chain.append(head_before)
+            if new_commit and (not self._own_chain or self._own_chain[-1] != new_commit):
+                self._own_chain.append(new_commit)
+
+    def _untrack(self, paths: list) -> None:
+        """git rm --cached for the given paths that are still in the index (the files stay on disk)."""
+        listed = self._git("ls-files", "-z", "--", self.pathspec, timeout=30)
+        tracked = set(listed.stdout.split("\0")) if listed.returncode == 0 else set()
+        drop = [p for p in paths if p in tracked]
+        for i in range(0, len(drop), 200):
+            self._git("rm", "--cached", "-q", "--", *drop[i:i + 200], timeout=30)
+
+    def _commit_and_push(self, head_before: Optional[str], changes: int) -> dict:
+        if not self.pathspec:
+            return {"ok": False, "error": "WORKSPACE is not inside the git repository."}
+        untrack = self.before_add() if self.before_add else []
+        r = self._git("add", self.pathspec, timeout=30)
+        if r.returncode != 0:
+            return {"ok": False, "error": (r.stderr or r.stdout or "git add failed.").strip()}
+        if untrack:
+            self._untrack(untrack)
+        message = "Dashboard: update workspace"
+        if changes > 1:
+            message += f" ({changes} saves)"
+        r = self._git("commit", "-m", message, timeout=30)
+        out = (r.stdout or "") + (r.stderr or "")
+        nothing_to_commit = r.returncode != 0 and "nothing to commit" in out.lower()
+        if r.returncode != 0 and not nothing_to_commit:
+            return {"ok": False, "error": (r.stderr or r.stdout or "Commit failed.").strip()}
+        if not nothing_to_commit:
+            with self._cond:
+                self._stats["commits"] += 1
+        push_out = ""
+        rebased = False
+        for attempt in range(self.retries + 1):
+            r = self._git("push")
+            push_out = (r.stdout or "") + (r.stderr or "")
+            if r.returncode == 0:
+                break
+            rejected = any(marker in push_out.lower() for marker in _NON_FAST_FORWARD)
+            if not rejected or attempt == self.retries:
+                return {"ok": False, "error": (r.stderr or r.stdout or "Push failed.").strip()}
+            # Altcineva a împins între timp: rebase pe remote și reîncercare, fără să-l oblige pe utilizator să facă pull
+            rb = self._git("pull", "--rebase")
+            with self._cond:
+                self._stats["rebases"] += 1
+            if rb.returncode != 0:
+                self._git("rebase", "--abort")
+                return {
+                    "ok": False,
+                    "error": (rb.stderr or rb.stdout or "Rebase failed.").strip(),
+                    "needPull": True,
+                }
+            rebased = True
+            if self.after_rebase:
+                self.after_rebase()
+        new_commit = self.head()
+        self._record_head(head_before, new_commit, rebased)
+        with self._cond:
+            self._stats["pushes"] += 1
+        if self.after_push:
+            self.after_push()
+        if nothing_to_commit or "everything up-to-date" in push_out.lower():
+            return {
+                "ok": True,
+                "message": "Nothing to push. Your branch is up to date with origin/master.",
+                "commit": new_commit or "",
+                "alreadyUpToDate": True,
+            }
+        return {"ok": True, "message": "Push successful.", "commit": new_commit or ""}
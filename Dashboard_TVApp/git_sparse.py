@@ -0,0 +1,113 @@
+"""
+Pull restrâns la una sau câteva echipe (nod TV): sparse checkout + partial clone.
+
+Sparse checkout în mod „cone”: rămân în working tree directoarele de top ale repo-ului din afara
+WORKSPACE (aplicația), fișierele de la rădăcina WORKSPACE (ex. restaurant_api_status.json) și doar
+WORKSPACE/<team> pentru echipele cerute. Cu un filtru partial clone (implicit blob:none) fetch-urile
+următoare nu mai aduc conținutul fișierelor din afara selecției; serverele fără suport pentru
+filtre îl ignoră și trimit tot, ca înainte.
+"""
+import os
+import re
+import subprocess
+from pathlib import Path
+from typing import Iterable, Optional
+
+from metrics import timed_git
+
+MIN_GIT_VERSION = (2, 27)
+
+
+class SparseSync:
+    """Configures sparse checkout / partial clone filter for a team-scoped pull; git calls run in repo_root."""
+
+    def __init__(self, repo_root: Path, workspace_name: Optional[str], filter_spec: str = "blob:none",
+                 timeout: int = 60):
+        self.repo_root = repo_root
+        self.workspace_name = workspace_name
+        self.filter_spec = filter_spec
+        self.timeout = timeout
+        self._version: Optional[tuple] = None
+
+    @classmethod
+    def from_env(cls, repo_root: Path, workspace_name: Optional[str]) -> "SparseSync":
+        """GIT_PARTIAL_CLONE_FILTER: fetch filter used with sparse pull (default blob:none; empty = off)."""
+        return cls(repo_root, workspace_name,
+                   filter_spec=os.environ.get("GIT_PARTIAL_CLONE_FILTER", "blob:none").strip())
+
+    def _git(self, *args: str, timeout: Optional[int] = None) -> subprocess.CompletedProcess:
+        with timed_git(args):
+            return subprocess.run(["git", *args], cwd=str(self.repo_root), capture_output=True, text=True,
+                                  timeout=timeout or self.timeout)
+
+    def _check(self, r: subprocess.CompletedProcess, what: str) -> None:
+        if r.returncode != 0:
+            raise RuntimeError((r.stderr or r.stdout or f"{what} failed.").strip())
+
+    def version(self) -> tuple:
+        if self._version is None:
+            m = re.search(r"(\d+)\.(\d+)", self._git("version", timeout=5).stdout or "")
+            self._version = (int(m.group(1)), int(m.group(2))) if m else (0, 0)
+        return self._version
+
+    def _remote(self) -> str:
+        branch = self._git("symbolic-ref", "--short", "-q", "HEAD", timeout=5).stdout.strip()
+        if branch:
+            remote = self._git("config", f"branch.{branch}.remote", timeout=5).stdout.strip()
+            if remote:
+                return remote
+        remotes = self._git("remote", timeout=5).stdout.split()
+        return "origin" if "origin" in remotes or not remotes else remotes[0]
+
+    def directories(self, teams: Iterable[str]) -> list:
+        """Cone directories: top-level repo dirs except WORKSPACE, plus WORKSPACE/<team> for each team."""
+        if not self.workspace_name:
+            raise ValueError("WORKSPACE is not inside the git repository.")
+        teams = list(teams)
+        if any(not isinstance(t, str) for t in teams):
+            raise ValueError("Team names must be strings.")
+        teams = sorted({t.strip() for t in teams if t.strip()})
+        if not teams:
+            raise ValueError("At least one team is required.")
+        for t in teams:
+            if "/" in t or "\\" in t or t.startswith("."):
+                raise ValueError(f"Invalid team name: {t}")
+        r = self._git("ls-tree", "-d", "--name-only", "HEAD", timeout=10)
+        self._check(r, "git ls-tree")
+        top = [d for d in r.stdout.splitlines() if d and d != self.workspace_name]
+        return top + [f"{self.workspace_name}/{t}" for t in teams]
+
+    def enable(self, teams: Iterable[str]) -> dict:
+        """Restrict the working tree to the given teams (and set the partial clone filter, if configured)."""
+        if self.version() < MIN_GIT_VERSION:
+            raise RuntimeError("Sparse pull needs git %d.%d or newer." % MIN_GIT_VERSION)
+        dirs = self.directories(teams)
+        if self.filter_spec:
+            remote = self._remote()
+            self._check(self._git("config", f"remote.{remote}.promisor", "true", timeout=5), "git config")
+            self._check(self._git("config", f"remote.{remote}.partialclonefilter", self.filter_spec, timeout=5),
+                        "git config")
+        self._check(self._git("sparse-checkout", "init", "--cone"), "git sparse-checkout init")
+        self._check(self._git("sparse-checkout", "set", *dirs), "git sparse-checkout set")
+        return self.state()
+
+    def disable(self) -> dict:
+        """Back to a full working tree (the partial clone filter stays; missing blobs are fetched on demand)."""
+        if self.sparse_enabled():
+            self._check(self._git("sparse-checkout", "disable"), "git sparse-checkout disable")
+        return self.state()
+
+    def sparse_enabled(self) -> bool:
+        r = self._git("config", "--bool", "core.sparseCheckout", timeout=5)
+        return r.stdout.strip() == "true"
+
+    def state(self) -> dict:
+        enabled = self.sparse_enabled()
+        teams = []
+        if enabled and self.workspace_name:
+            prefix = self.workspace_name + "/"
+            listed = self._git("sparse-checkout", "list", timeout=10).stdout.splitlines()
+            teams = [d[len(prefix):] for d in listed if d.startswith(prefix)]
+        remote = self._remote()
+        partial = self._git("config", f"remote.{remote}.partialclonefilter", timeout=5).stdout.strip()
+        return {"sparse": enabled, "teams": teams, "filter": partial or None}
@@ -0,0 +1,173 @@
+"""
+Status git cache-uit: HEAD, branch, upstream și ahead/behind, calculate local.
+
+Un thread de fundal rulează `git fetch` la fiecare GIT_FETCH_INTERVAL_SECONDS, deci refs-urile
+remote sunt actualizate fără ca endpoint-urile să aștepte rețeaua. Statusul local se recalculează
+doar când se schimbă fișierele de refs din .git (HEAD, branch-ul curent, upstream, packed-refs).
+"""
+import os
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from metrics import timed_git
+
+
+class GitStatus:
+    """Background fetcher + cached local status; `run` executes git calls (e.g. through the git queue)."""
+
+    def __init__(self, repo_root: Path, interval_seconds: float = 60, fetch_timeout: int = 30,
+                 run: Optional[Callable[[Callable[[], object]], object]] = None):
+        self.repo_root = repo_root
+        self.interval_seconds = max(0.0, interval_seconds)
+        self.fetch_timeout = fetch_timeout
+        self._run = run or (lambda fn: fn())
+        self._lock = threading.Lock()
+        self._status: Optional[dict] = None
+        self._fingerprint: Optional[tuple] = None
+        self._watch: tuple = ()
+        self._last_fetch: Optional[float] = None
+        self._fetch_error: Optional[str] = None
+        self._fetch_lock = threading.Lock()
+        self._started = False
+        self._wake = threading.Event()
+        self._stats = {"fetches": 0, "fetchFailures": 0, "localRefreshes": 0}
+        # on_change(status): HEAD sau commit-ul upstream s-a schimbat (ex. eveniment git.head în fluxul SSE)
+        self.on_change: Optional[Callable[[dict], None]] = None
+
+    @classmethod
+    def from_env(cls, repo_root: Path, run=None) -> "GitStatus":
+        """GIT_FETCH_INTERVAL_SECONDS: background fetch interval (default 60; 0 = fetch only on demand)."""
+        try:
+            interval = float(os.environ.get("GIT_FETCH_INTERVAL_SECONDS", "").strip() or 60)
+        except ValueError:
+            interval = 60
+        return cls(repo_root, interval_seconds=interval, run=run)
+
+    @property
+    def available(self) -> bool:
+        return (self.repo_root / ".git").exists()
+
+    def _git(self, *args: str, timeout: int = 10) -> subprocess.CompletedProcess:
+        with timed_git(args):
+            return subprocess.run(["git", *args], cwd=str(self.repo_root), capture_output=True, text=True,
+                                  timeout=timeout)
+
+    # ---------- fetch în fundal ----------
+    def start(self) -> None:
+        with self._lock:
+            if self._started or not self.interval_seconds:
+                return
+            self._started = True
+        threading.Thread(target=self._fetch_worker, name="git-fetch", daemon=True).start()
+
+    def _fetch_worker(self) -> None:
+        while True:
+            if self.available:
+                self.fetch()
+                if self.on_change is not None:
+                    self.status()  # recalculează ahead / behind și anunță un upstream nou
+            self._wake.wait(self.interval_seconds)
+            self._wake.clear()
+
+    def fetch(self) -> bool:
+        """Update remote-tracking refs (git fetch). Returns True on success; the error is kept for status()."""
+        with self._fetch_lock:
+            try:
+                r = self._run(lambda: self._git("fetch", "--quiet", "--prune", timeout=self.fetch_timeout))
+                ok = r.returncode == 0
+                error = None if ok else ((r.stderr or r.stdout or "").strip() or "Git fetch failed.")
+            except subprocess.TimeoutExpired:
+                ok, error = False, "Connection timeout."
+            except FileNotFoundError:
+                ok, error = False, "Git is not installed."
+            with self._lock:
+                self._last_fetch = time.time()
+                self._fetch_error = error
+                self._stats["fetches" if ok else "fetchFailures"] += 1
+            return ok
+
+    def fetch_soon(self) -> None:
+        self._wake.set()
+
+    # ---------- status local ----------
+    def _git_dir(self) -> Optional[Path]:
+        d = self.repo_root / ".git"
+        return d if d.is_dir() else None  # worktree/submodul (.git fișier): fără amprentă, recalcul la fiecare cerere
+
+    def _current_fingerprint(self) -> Optional[tuple]:
+        git_dir = self._git_dir()
+        if git_dir is None:
+            return None
+        out = []
+        # config: upstream-ul branch-ului (branch.<name>.merge) poate fi schimbat fără să se miște vreun ref
+        for rel in ("HEAD", "packed-refs", "config") + self._watch:
+            try:
+                st = (git_dir / rel).stat()
+                out.append((rel, st.st_mtime_ns, st.st_size))
+            except OSError:
+                out.append((rel, None, None))
+        return tuple(out)
+
+    def _refs(self) -> tuple:
+        """(branch, upstream name, watched ref files) for the current HEAD."""
+        branch = self._git("symbolic-ref", "--short", "-q", "HEAD").stdout.strip() or None
+        upstream = self._git("rev-parse", "--abbrev-ref", "--symbolic-full-name", "@{u}")
+        upstream_name = upstream.stdout.strip() if upstream.returncode == 0 else None
+        watch = []
+        if branch:
+            watch.append(f"refs/heads/{branch}")
+        if upstream_name:
+            watch.append(f"refs/remotes/{upstream_name}")
+        return branch, upstream_name, tuple(watch)
+
+    def _compute(self, branch: Optional[str], upstream_name: Optional[str]) -> dict:
+        head = self._git("rev-parse", "HEAD")
+        if head.returncode != 0:
+            return {"commit": "", "branch": None, "upstream": None, "upstreamCommit": None, "ahead": None, "behind": None}
+        upstream_commit = ahead = behind = None
+        if upstream_name:
+            upstream_commit = self._git("rev-parse", "@{u}").stdout.strip() or None
+            counts = self._git("rev-list", "--left-right", "--count", "HEAD...@{u}").stdout.split()
+            if len(counts) == 2:
+                ahead, behind = int(counts[0]), int(counts[1])
+        return {
+            "commit": head.stdout.strip(),
+            "branch": branch,
+            "upstream": upstream_name,
+            "upstreamCommit": upstream_commit,
+            "ahead": ahead,
+            "behind": behind,
+        }
+
+    def status(self) -> dict:
+        """Cached status; git is only invoked when a watched ref file changed since the last call."""
+        changed = False
+        with self._lock:
+            fingerprint = self._current_fingerprint()
+            if self._status is None or fingerprint is None or fingerprint != self._fingerprint:
+                previous = self._status
+                branch, upstream_name, self._watch = self._refs()
+                # Amprenta de dinainte de calcul: un ref mutat între apelurile git (fetch, commit din coadă)
+                # invalidează statusul la următoarea cerere, în loc să fie ascuns sub amprenta nouă
+                self._fingerprint = self._current_fingerprint()
+                self._status = self._compute(branch, upstream_name)
+                self._stats["localRefreshes"] += 1
+                changed = previous is not None and any(
+                    previous.get(k) != self._status.get(k) for k in ("commit", "upstreamCommit"))
+            out = dict(self._status)
+            out.update({"lastFetch": self._last_fetch, "fetchError": self._fetch_error})
+        if changed and self.on_change is not None:
+            try:
+                self.on_change(out)
+            except Exception:
+                pass
+        return out
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out.update({"intervalSeconds": self.interval_seconds, "lastFetch": self._last_fetch})
+        return out
@@ -0,0 +1,141 @@
+"""
+Variante derivate pentru imaginile încărcate: una la rezoluția ecranului TV (implicit 1920x1080)
+și un thumbnail mic, într-un format compact (WebP, cu rezervă JPEG/PNG).
+
+Variantele stau lângă original în photos/.derived/<fișier original>/ (screen.*, thumb.*, meta.json),
+astfel încât playlist-ul și dashboard-ul pot referi varianta ieftină. Necesită Pillow (opțional):
+fără el originalul rămâne singura variantă.
+"""
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Optional
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow e opțional
+    Image = None
+    ImageOps = None
+    features = None
+
+DERIVED_DIR = ".derived"
+
+
+def derived_dir(src: str) -> str:
+    """'photos/x.png' -> 'photos/.derived/x.png' (relative to the team folder)."""
+    folder, _, name = src.rpartition("/")
+    return f"{folder}/{DERIVED_DIR}/{name}"
+
+
+def original_for(src: str) -> Optional[str]:
+    """'photos/.derived/x.png/screen.webp' -> 'photos/x.png'; None if src is not a derivative."""
+    parts = src.split("/")
+    if len(parts) >= 3 and parts[1] == DERIVED_DIR:
+        return f"{parts[0]}/{parts[2]}"
+    return None
+
+
+def _parse_size(value: str, default: tuple) -> tuple:
+    try:
+        w, _, h = value.lower().partition("x")
+        return int(w), int(h or w)
+    except ValueError:
+        return default
+
+
+class ImageDerivatives:
+    """Builds screen/thumb variants for one image; all paths are relative to the team folder."""
+
+    def __init__(self, screen_size: tuple = (1920, 1080), thumb_size: tuple = (320, 320),
+                 fmt: str = "webp", quality: int = 82, enabled: bool = True):
+        self.screen_size = screen_size
+        self.thumb_size = thumb_size
+        self.fmt = fmt.lower()
+        self.quality = quality
+        self.enabled = enabled and Image is not None
+
+    @classmethod
+    def from_env(cls) -> "ImageDerivatives":
+        """IMAGE_DERIVATIVES (1), IMAGE_SCREEN_SIZE (1920x1080), IMAGE_THUMB_SIZE (320), IMAGE_DERIVATIVE_FORMAT (webp), IMAGE_DERIVATIVE_QUALITY (82)."""
+        try:
+            quality = int(os.environ.get("IMAGE_DERIVATIVE_QUALITY", "").strip() or 82)
+        except ValueError:
+            quality = 82
+        return cls(
+            screen_size=_parse_size(os.environ.get("IMAGE_SCREEN_SIZE", "").strip() or "1920x1080", (1920, 1080)),
+            thumb_size=_parse_size(os.environ.get("IMAGE_THUMB_SIZE", "").strip() or "320", (320, 320)),
+            fmt=os.environ.get("IMAGE_DERIVATIVE_FORMAT", "").strip() or "webp",
+            quality=quality,
+            enabled=os.environ.get("IMAGE_DERIVATIVES", "1").strip().lower() not in ("0", "false", "no"),
+        )
+
+    def _format_for(self, im) -> tuple:
+        """(PIL format, extension) for a variant; WebP if supported, else JPEG (PNG when there is alpha)."""
+        if self.fmt == "webp" and features.check("webp"):
+            return "WEBP", ".webp"
+        if im.mode in ("RGBA", "LA", "P"):
+            return "PNG", ".png"
+        return "JPEG", ".jpg"
+
+    def _save(self, im, dest_dir: Path, name: str) -> dict:
+        fmt, ext = self._format_for(im)
+        if fmt == "JPEG" and im.mode != "RGB":
+            im = im.convert("RGB")
+        elif fmt == "WEBP" and im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if "transparency" in im.info or im.mode in ("LA", "P") else "RGB")
+        dest = dest_dir / f"{name}{ext}"
+        tmp = dest_dir / f".tmp-{uuid.uuid4().hex}{ext}"
+        options = {"quality": self.quality} if fmt in ("WEBP", "JPEG") else {"optimize": True}
+        if fmt == "WEBP":
+            options["method"] = 4
+        im.save(tmp, fmt, **options)
+        os.replace(tmp, dest)
+        return {"file": dest.name, "width": im.width, "height": im.height, "bytes": dest.stat().st_size}
+
+    def build(self, team_dir: Path, src: str) -> Optional[dict]:
+        """Create the variants for team_dir/src and write meta.json. Returns the metadata (None if disabled)."""
+        if not self.enabled:
+            return None
+        original = team_dir / src
+        rel_dir = derived_dir(src)
+        out_dir = team_dir / rel_dir
+        with Image.open(original) as im:
+            if getattr(im, "is_animated", False):
+                # GIF/WebP animat: varianta de ecran rămâne originalul, doar thumbnail din primul cadru
+                frame = im.convert("RGBA")
+                animated = True
+            else:
+                frame = ImageOps.exif_transpose(im)
+                frame.load()
+                animated = False
+            width, height = frame.size
+            out_dir.mkdir(parents=True, exist_ok=True)
+            variants = {}
+            sw, sh = self.screen_size
+            if not animated and (width > sw or height > sh):
+                screen = frame.copy()
+                screen.thumbnail((sw, sh), Image.LANCZOS)
+                variants["screen"] = self._save(screen, out_dir, "screen")
+            else:
+                # Deja la rezoluția ecranului (sau animat): varianta de ecran este chiar originalul
+                variants["screen"] = {"file": None, "width": width, "height": height, "bytes": original.stat().st_size}
+            thumb = frame.copy()
+            thumb.thumbnail(self.thumb_size, Image.LANCZOS)
+            variants["thumb"] = self._save(thumb, out_dir, "thumb")
+        for v in variants.values():
+            name = v.pop("file")
+            v["path"] = f"{rel_dir}/{name}" if name else src
+        meta = {
+            "original": {"path": src, "width": width, "height": height, "bytes": original.stat().st_size},
+            "variants": variants,
+        }
+        (out_dir / "meta.json").write_text(json.dumps(meta, indent=2, ensure_ascii=False), encoding="utf-8")
+        return meta
+
+    @staticmethod
+    def read(team_dir: Path, src: str) -> Optional[dict]:
+        try:
+            return json.loads((team_dir / derived_dir(src) / "meta.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
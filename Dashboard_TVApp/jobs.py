@@ -0,0 +1,188 @@
+"""
+Coadă de job-uri în fundal pentru conversii (document -> imagini, web -> imagini).
+
+Endpoint-urile pun job-ul în coadă și returnează imediat id-ul; un pool de thread-uri
+execută conversia, iar clientul urmărește statusul / progresul prin /api/jobs/<id>.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job body when the client requested cancellation."""
+
+
+class JobError(Exception):
+    """Expected job failure; the message is reported to the client as-is."""
+
+
+class Job:
+    def __init__(self, kind: str, team: str, params: Optional[dict] = None):
+        self.id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.team = team
+        self.params = params or {}
+        self.status = QUEUED
+        self.done = 0
+        self.total = 0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def check_cancelled(self) -> None:
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def progress(self, done: int, total: int) -> None:
+        """Per-page progress callback for the conversion helpers; also a cancellation point."""
+        self.done = done
+        self.total = total
+        self.check_cancelled()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._finished.wait(timeout)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "team": self.team,
+            "params": self.params,
+            "status": self.status,
+            "progress": {"done": self.done, "total": self.total},
+            "result": self.result,
+            "error": self.error,
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+        }
+
+
+class JobManager:
+    """Thread pool running job bodies; keeps the last `keep` finished jobs for polling."""
+
+    def __init__(self, workers: int = 2, keep: int = 200):
+        self.workers = max(1, workers)
+        self.keep = max(1, keep)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="conversion-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Apelat după fiecare job terminat, indiferent de rezultat (ex. evenimente pentru fluxul SSE)
+        self.on_finish: Optional[Callable[[Job], None]] = None
+
+    @classmethod
+    def from_env(cls) -> "JobManager":
+        """CONVERSION_WORKERS (default 2)."""
+        try:
+            workers = int(os.environ.get("CONVERSION_WORKERS", "").strip() or 2)
+        except ValueError:
+            workers = 2
+        return cls(workers=workers)
+
+    def submit(self, kind: str, team: str, body: Callable[[Job], dict], params: Optional[dict] = None,
+               on_abort: Optional[Callable[[Job], None]] = None,
+               on_finish: Optional[Callable[[Job], None]] = None) -> Job:
+        """
+        Queue body(job) -> result dict. on_abort(job) runs after failure or cancellation (cleanup);
+        on_finish(job) runs after every job, whatever the outcome.
+        """
+        job = Job(kind, team, params)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, body, on_abort, on_finish)
+        return job
+
+    def _run(self, job: Job, body: Callable[[Job], dict], on_abort: Optional[Callable[[Job], None]],
+             on_finish: Optional[Callable[[Job], None]]) -> None:
+        # Statusul final rămâne local până după hook-uri: un client care vede `done` găsește rezultatul complet
+        if job.cancel_requested:
+            status = CANCELLED
+        else:
+            job.status = RUNNING
+            job.started_at = time.time()
+            try:
+                job.result = body(job)
+                status = DONE
+            except JobCancelled:
+                status = CANCELLED
+            except JobError as e:
+                job.error = str(e)
+                status = FAILED
+            except Exception as e:
+                job.error = str(e) or type(e).__name__
+                status = FAILED
+        if status != DONE and on_abort:
+            try:
+                on_abort(job)
+            except Exception:
+                pass
+        if on_finish:
+            try:
+                on_finish(job)
+            except Exception:
+                pass
+        job.finished_at = time.time()
+        job.status = status
+        job._finished.set()
+        # Notificarea globală (metrici, flux SSE) vine după ce statusul final e vizibil
+        if self.on_finish:
+            try:
+                self.on_finish(job)
+            except Exception:
+                pass
+
+    def _prune(self) -> None:
+        finished = [j for j in self._jobs.values() if j.status in FINISHED_STATES]
+        for j in finished[: max(0, len(finished) - self.keep)]:
+            self._jobs.pop(j.id, None)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, team: Optional[str] = None) -> list:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        if team:
+            jobs = [j for j in jobs if j.team == team]
+        return jobs
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Request cancellation; queued jobs never start, running jobs stop at the next progress point."""
+        job = self.get(job_id)
+        if job and job.status not in FINISHED_STATES:
+            job._cancel.set()
+        return job
+
+    def stats(self) -> dict:
+        counts = {s: 0 for s in (QUEUED, RUNNING, DONE, FAILED, CANCELLED)}
+        for j in self.list():
+            counts[j.status] = counts.get(j.status, 0) + 1
+        return {"workers": self.workers, **counts}
+
+    def shutdown(self, wait: bool = False) -> None:
+        for j in self.list():
+            if j.status not in FINISHED_STATES:
+                j._cancel.set()
+        self._executor.shutdown(wait=wait)
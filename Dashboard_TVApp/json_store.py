@@ -0,0 +1,151 @@
+"""
+Citire / scriere pentru fișierele JSON din WORKSPACE (playlist.json, <secțiune>/content.json, ...).
+
+- documentele parsate sunt ținute într-un cache LRU mărginit, cu cheie (mtime, dimensiune, inode):
+  citirile repetate ale aceluiași fișier nu mai fac `json.loads`, iar orice scriere (și cea atomică,
+  care schimbă inode-ul) invalidează intrarea;
+- serializare cu orjson când pachetul e instalat (opțional), altfel modulul json standard;
+- scriere atomică (fișier temporar + fsync + rename), indentată sau compactă (JSON_COMPACT).
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+try:
+    import orjson
+except ImportError:  # opțional
+    orjson = None
+
+_MISSING = object()
+
+
+class JsonStore:
+    """Parsed-document cache + atomic writer. Returned documents are shared: treat them as read-only."""
+
+    def __init__(self, max_entries: int = 512, compact: bool = False, backend: str = "auto"):
+        self.max_entries = max(0, max_entries)
+        self.compact = compact
+        self.backend = "orjson" if orjson is not None and backend in ("auto", "orjson") else "json"
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "writes": 0}
+
+    @classmethod
+    def from_env(cls) -> "JsonStore":
+        """JSON_CACHE_ENTRIES (512; 0 = off), JSON_COMPACT (0 = indented files), JSON_BACKEND (auto | orjson | json)."""
+        try:
+            entries = int(os.environ.get("JSON_CACHE_ENTRIES", "").strip() or 512)
+        except ValueError:
+            entries = 512
+        return cls(
+            max_entries=entries,
+            compact=os.environ.get("JSON_COMPACT", "0").strip().lower() in ("1", "true", "yes"),
+            backend=os.environ.get("JSON_BACKEND", "auto").strip().lower() or "auto",
+        )
+
+    # ---------- serializare ----------
+    def loads(self, raw: bytes):
+        if self.backend == "orjson":
+            return orjson.loads(raw[3:] if raw.startswith(b"\xef\xbb\xbf") else raw)
+        return json.loads(raw.decode("utf-8-sig"))
+
+    def dumps(self, data, indent: Optional[int] = 2) -> bytes:
+        """UTF-8 JSON; indent is ignored (compact output) when JSON_COMPACT is on."""
+        compact = self.compact or not indent
+        if self.backend == "orjson":
+            try:
+                return orjson.dumps(data, option=0 if compact else orjson.OPT_INDENT_2)
+            except TypeError:
+                pass  # ex. chei non-string: cade pe json standard
+        if compact:
+            return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return json.dumps(data, ensure_ascii=False, indent=indent).encode("utf-8")
+
+    # ---------- citire ----------
+    @staticmethod
+    def _key(st: os.stat_result) -> tuple:
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def read(self, path: Path, default=_MISSING):
+        """Parsed content of path (cached while the file is unchanged). Missing file: default, or FileNotFoundError."""
+        name = str(path)
+        try:
+            st = os.stat(name)
+        except FileNotFoundError:
+            self.invalidate(path)
+            if default is _MISSING:
+                raise
+            return default
+        key = self._key(st)
+        with self._lock:
+            entry = self._cache.get(name)
+            if entry is not None and entry[0] == key:
+                self._cache.move_to_end(name)
+                self._stats["hits"] += 1
+                return entry[1]
+            self._stats["misses"] += 1
+        with open(name, "rb") as f:
+            raw = f.read()
+            key = self._key(os.fstat(f.fileno()))
+        data = self.loads(raw)
+        self._remember(name, key, data)
+        return data
+
+    def _remember(self, name: str, key: tuple, data) -> None:
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._cache[name] = (key, data)
+            self._cache.move_to_end(name)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, path: Path) -> None:
+        with self._lock:
+            self._cache.pop(str(path), None)
+
+    # ---------- scriere ----------
+    def write(self, path: Path, data, indent: Optional[int] = 2) -> None:
+        """Write to a temp file next to path, fsync, then rename over it; readers never see a partial file."""
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            with open(tmp, "wb") as f:
+                f.write(self.dumps(data, indent))
+                f.flush()
+                os.fsync(f.fileno())
+            for attempt in range(10):
+                try:
+                    os.replace(tmp, path)
+                    break
+                except PermissionError:
+                    # Windows: fișierul țintă poate fi deschis momentan de un cititor (ex. TV App)
+                    if attempt == 9:
+                        raise
+                    time.sleep(0.05)
+        except BaseException:
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+            raise
+        # Documentul scris nu e pus în cache (apelantul îl poate modifica); următoarea citire îl parsează
+        self.invalidate(path)
+        with self._lock:
+            self._stats["writes"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out.update({
+                "entries": len(self._cache),
+                "maxEntries": self.max_entries,
+                "backend": self.backend,
+                "compact": self.compact,
+            })
+        return out
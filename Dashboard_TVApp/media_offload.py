@@ -0,0 +1,223 @@
+"""
+Mod opțional (MEDIA_OFFLOAD=1): fișierele media mari nu mai intră în git.
+
+La push, fiecare fișier media (pagini randate, imagini, video, documente) peste prag este copiat
+într-un object store adresat după conținut, lângă repo (director local, în locul unui store remote).
+În git rămân doar WORKSPACE/<team>/media-manifest.json (cale -> sha256, dimensiune) și un
+.gitignore generat care exclude fișierele respective. La pull, fișierele lipsă sau modificate sunt
+refăcute din object store, iar cele scoase din manifest sunt șterse.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Optional
+
+MANIFEST_NAME = "media-manifest.json"
+GITIGNORE_HEADER = "# Generat de Dashboard (MEDIA_OFFLOAD): fișierele de mai jos sunt în object store, nu în git\n"
+OFFLOAD_EXT = {
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp",
+    ".mp4", ".webm", ".mov", ".m4v", ".avi",
+    ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx",
+}
+
+
+def _gitignore_escape(rel: str) -> str:
+    out = "".join("\\" + c if c in "[]*?\\" else c for c in rel)
+    return "/" + out
+
+
+def _link_or_copy(src: Path, dest: Path) -> None:
+    tmp = dest.with_name(f".offload-{uuid.uuid4().hex}")
+    try:
+        try:
+            os.link(src, tmp)
+        except OSError:
+            shutil.copy2(src, tmp)
+        os.replace(tmp, dest)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+class MediaOffload:
+    """Pointer manifests per team + content-addressed object directory outside the repository."""
+
+    def __init__(self, workspace: Path, store_root: Path, media_dirs: Iterable[str],
+                 min_bytes: int = 64 * 1024, enabled: bool = False, max_digests: int = 8192):
+        self.workspace = workspace
+        self.store_root = store_root
+        self.media_dirs = tuple(media_dirs)
+        self.min_bytes = max(0, min_bytes)
+        self.enabled = enabled
+        self.max_digests = max(1, max_digests)
+        # path -> (size, mtime_ns, sha256), LRU: o versiune nouă a fișierului o înlocuiește pe cea veche
+        self._digests: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()  # statistici + memo; hash-urile se calculează în afara lui
+        self._sync_lock = threading.Lock()  # un singur push / pull atinge manifestele și fișierele odată
+        self._stats = {"uploaded": 0, "downloaded": 0, "removed": 0, "missing": 0}
+
+    @classmethod
+    def from_env(cls, workspace: Path, media_dirs: Iterable[str]) -> "MediaOffload":
+        """MEDIA_OFFLOAD (0), MEDIA_OFFLOAD_DIR (default <repo>-media-objects next to the repo), MEDIA_OFFLOAD_MIN_KB (64)."""
+        repo_root = workspace.parent
+        root = os.environ.get("MEDIA_OFFLOAD_DIR", "").strip() or repo_root.parent / f"{repo_root.name}-media-objects"
+        try:
+            min_kb = int(os.environ.get("MEDIA_OFFLOAD_MIN_KB", "").strip() or 64)
+        except ValueError:
+            min_kb = 64
+        enabled = os.environ.get("MEDIA_OFFLOAD", "0").strip().lower() in ("1", "true", "yes")
+        return cls(workspace, Path(root).resolve(), media_dirs, min_bytes=min_kb * 1024, enabled=enabled)
+
+    def _object_path(self, sha: str) -> Path:
+        return self.store_root / "objects" / sha[:2] / sha
+
+    def _digest(self, path: Path, st: os.stat_result) -> str:
+        key = str(path)
+        with self._lock:
+            cached = self._digests.get(key)
+            if cached is not None and cached[:2] == (st.st_size, st.st_mtime_ns):
+                self._digests.move_to_end(key)
+                return cached[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(block)
+        sha = h.hexdigest()
+        with self._lock:
+            self._digests[key] = (st.st_size, st.st_mtime_ns, sha)
+            self._digests.move_to_end(key)
+            while len(self._digests) > self.max_digests:
+                self._digests.popitem(last=False)
+        return sha
+
+    def _teams(self) -> list:
+        if not self.workspace.is_dir():
+            return []
+        return [d for d in self.workspace.iterdir() if d.is_dir() and not d.name.startswith(".")]
+
+    @staticmethod
+    def read_manifest(team_dir: Path) -> dict:
+        try:
+            data = json.loads((team_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+            return data.get("files") or {}
+        except (OSError, ValueError):
+            return {}
+
+    def _candidates(self, team_dir: Path):
+        for sub in self.media_dirs:
+            base = team_dir / sub
+            if not base.is_dir():
+                continue
+            for root, _dirs, files in os.walk(base):
+                for name in files:
+                    if name.startswith(".") or Path(name).suffix.lower() not in OFFLOAD_EXT:
+                        continue
+                    p = Path(root) / name
+                    try:
+                        st = p.stat()
+                    except OSError:
+                        continue
+                    if st.st_size >= self.min_bytes:
+                        yield p.relative_to(team_dir).as_posix(), p, st
+
+    # ---------- push ----------
+    def prepare_push(self) -> list:
+        """
+        Upload media to the object store, rewrite manifests and generated .gitignore files.
+        Returns repository-relative paths of offloaded files (to drop from the git index if still tracked).
+        """
+        if not self.enabled:
+            return []
+        offloaded = []
+        with self._sync_lock:
+            for team_dir in self._teams():
+                files = {}
+                for rel, path, st in self._candidates(team_dir):
+                    sha = self._digest(path, st)
+                    obj = self._object_path(sha)
+                    if not obj.is_file():
+                        obj.parent.mkdir(parents=True, exist_ok=True)
+                        _link_or_copy(path, obj)
+                        with self._lock:
+                            self._stats["uploaded"] += 1
+                    files[rel] = {"sha256": sha, "size": st.st_size}
+                    offloaded.append(f"{self.workspace.name}/{team_dir.name}/{rel}")
+                self._write_team(team_dir, files)
+        return offloaded
+
+    def _write_team(self, team_dir: Path, files: dict) -> None:
+        manifest = team_dir / MANIFEST_NAME
+        if files or manifest.exists():
+            data = json.dumps({"version": 1, "files": dict(sorted(files.items()))}, indent=2, ensure_ascii=False)
+            if not manifest.exists() or manifest.read_text(encoding="utf-8") != data:
+                tmp = team_dir / f".{MANIFEST_NAME}.{uuid.uuid4().hex[:8]}.tmp"
+                tmp.write_text(data, encoding="utf-8")
+                os.replace(tmp, manifest)
+        gitignore = team_dir / ".gitignore"
+        if files or gitignore.exists():
+            body = GITIGNORE_HEADER + "".join(_gitignore_escape(rel) + "\n" for rel in sorted(files))
+            if not gitignore.exists() or gitignore.read_text(encoding="utf-8") != body:
+                gitignore.write_text(body, encoding="utf-8")
+
+    # ---------- pull ----------
+    def snapshot(self) -> dict:
+        """{team: set(rel)} from the current manifests; taken before a pull to detect removed files."""
+        if not self.enabled:
+            return {}
+        return {t.name: set(self.read_manifest(t)) for t in self._teams()}
+
+    def materialize(self, previous: Optional[dict] = None, teams: Optional[Iterable[str]] = None) -> dict:
+        """Bring team folders in line with their manifests: fetch missing/changed objects, drop removed files."""
+        result = {"downloaded": 0, "removed": 0, "missing": []}
+        if not self.enabled:
+            return result
+        previous = previous or {}
+        wanted = set(teams) if teams is not None else None
+        with self._sync_lock:
+            for team_dir in self._teams():
+                if wanted is not None and team_dir.name not in wanted:
+                    continue
+                files = self.read_manifest(team_dir)
+                for rel in previous.get(team_dir.name, set()) - set(files):
+                    p = team_dir / rel
+                    if p.is_file():
+                        p.unlink()
+                        result["removed"] += 1
+                for rel, entry in files.items():
+                    p = team_dir / rel
+                    try:
+                        st = p.stat()
+                        if st.st_size == entry.get("size") and self._digest(p, st) == entry.get("sha256"):
+                            continue
+                    except OSError:
+                        pass
+                    obj = self._object_path(entry.get("sha256") or "")
+                    if not obj.is_file():
+                        result["missing"].append(f"{team_dir.name}/{rel}")
+                        continue
+                    p.parent.mkdir(parents=True, exist_ok=True)
+                    _link_or_copy(obj, p)
+                    result["downloaded"] += 1
+        with self._lock:
+            self._stats["downloaded"] += result["downloaded"]
+            self._stats["removed"] += result["removed"]
+            self._stats["missing"] += len(result["missing"])
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats, digests=len(self._digests))
+        objects = list((self.store_root / "objects").glob("*/*")) if self.enabled else []
+        out.update({
+            "enabled": self.enabled,
+            "dir": str(self.store_root),
+            "minBytes": self.min_bytes,
+            "objects": len(objects),
+            "bytes": sum(o.stat().st_size for o in objects),
+        })
+        return out
@@ -0,0 +1,310 @@
+"""
+Stocare media deduplicată (adresată după conținut) pentru photos/, videos/ și stretching/.
+
+Fiecare fișier încărcat este hash-uit la scriere și păstrat o singură dată în
+<store>/objects/<aa>/<sha256>; fișierul din folderul echipei devine hardlink către obiect
+(sau copie, cu referința înregistrată, dacă hardlink nu e posibil). refs.json ține
+evidența referințelor; obiectul se șterge doar când nu mai are nicio referință.
+
+Modificările de referințe se adaugă ca linii într-un jurnal (refs.log), deci un upload nu mai
+rescrie tot refs.json; jurnalul e compactat în refs.json la fiecare COMPACT_EVERY înregistrări,
+după gc și la oprire. La încărcare se citește refs.json și se reaplică jurnalul.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Iterable, Optional
+
+BLOCK_SIZE = 1024 * 1024
+COMPACT_EVERY = 1000
+
+
+def save_stream(stream, dest: Path) -> str:
+    """Write a binary stream to dest while hashing it; returns the sha256 hex digest."""
+    h = hashlib.sha256()
+    with open(dest, "wb") as out:
+        for block in iter(lambda: stream.read(BLOCK_SIZE), b""):
+            h.update(block)
+            out.write(block)
+    return h.hexdigest()
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class MediaStore:
+    """Content-addressed objects + reference table keyed by '<team>/<folder>/<file>'."""
+
+    def __init__(self, root: Path, workspace: Path, enabled: bool = True, compact_every: int = COMPACT_EVERY):
+        self.root = root
+        self.workspace = workspace
+        self.enabled = enabled
+        self.compact_every = max(1, compact_every)
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()  # o singură rescriere a refs.json odată, fără self._lock
+        self._journal_len = 0
+        self._objects: Optional[dict] = None  # sha -> {"size": int, "refs": set}
+        self._paths: dict = {}  # ref -> sha
+        self._stats = {"ingested": 0, "deduplicated": 0, "bytesSaved": 0, "objectsDeleted": 0}
+
+    @classmethod
+    def from_env(cls, workspace: Path) -> "MediaStore":
+        """MEDIA_STORE_DIR (default <WORKSPACE>/../.media_store), MEDIA_STORE (1 = on, 0 = off)."""
+        root = Path(os.environ.get("MEDIA_STORE_DIR", "").strip() or workspace.parent / ".media_store")
+        enabled = os.environ.get("MEDIA_STORE", "1").strip().lower() not in ("0", "false", "no")
+        return cls(root.resolve(), workspace, enabled)
+
+    # ---------- persistență ----------
+    def _db_path(self) -> Path:
+        return self.root / "refs.json"
+
+    def _journal_path(self, suffix: str = "") -> Path:
+        return self.root / f"refs.log{suffix}"
+
+    def _load(self) -> dict:
+        if self._objects is None:
+            objects = {}
+            try:
+                raw = json.loads(self._db_path().read_text(encoding="utf-8"))
+                for sha, item in (raw.get("objects") or {}).items():
+                    objects[sha] = {"size": int(item.get("size") or 0), "refs": set(item.get("refs") or [])}
+            except (OSError, ValueError):
+                pass
+            self._objects = objects
+            self._paths = {ref: sha for sha, item in objects.items() for ref in item["refs"]}
+            # refs.log.old rămâne doar dacă procesul s-a oprit în timpul unei compactări; reaplicarea e idempotentă
+            for journal in (self._journal_path(".old"), self._journal_path()):
+                self._replay(journal)
+        return self._objects
+
+    def _replay(self, journal: Path) -> None:
+        try:
+            lines = journal.read_text(encoding="utf-8").splitlines()
+        except OSError:
+            return
+        for line in lines:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # ultima linie poate fi incompletă după o oprire bruscă
+            self._apply(rec)
+            self._journal_len += 1
+
+    def _apply(self, rec: dict) -> None:
+        """Apply one journal record to the in-memory tables (no object files are touched)."""
+        ref = rec.get("ref")
+        old = self._paths.pop(ref, None)
+        if old and old in self._objects:
+            self._objects[old]["refs"].discard(ref)
+            if not self._objects[old]["refs"]:
+                del self._objects[old]
+        if rec.get("op") == "add":
+            sha = rec["sha"]
+            self._objects.setdefault(sha, {"size": int(rec.get("size") or 0), "refs": set()})["refs"].add(ref)
+            self._paths[ref] = sha
+
+    def _log(self, records: list) -> bool:
+        """Append records to refs.log (caller holds the lock); True when the journal is due for compaction."""
+        if not records:
+            return False
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self._journal_path(), "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+        self._journal_len += len(records)
+        return self._journal_len >= self.compact_every
+
+    def flush(self) -> None:
+        """Compact the journal into refs.json; the file is written outside the store lock."""
+        if not self.enabled or self._objects is None:
+            return
+        with self._compact_lock:
+            with self._lock:
+                if not self._journal_len:
+                    return
+                data = {"objects": {sha: {"size": o["size"], "refs": sorted(o["refs"])}
+                                    for sha, o in self._objects.items()}}
+                # Înregistrările noi merg într-un jurnal nou; cel vechi se șterge după ce refs.json e scris
+                try:
+                    os.replace(self._journal_path(), self._journal_path(".old"))
+                except FileNotFoundError:
+                    pass
+                self._journal_len = 0
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp = self.root / f".refs-{uuid.uuid4().hex}.json"
+            tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self._db_path())
+            try:
+                self._journal_path(".old").unlink()
+            except FileNotFoundError:
+                pass
+
+    def _object_path(self, sha: str) -> Path:
+        return self.root / "objects" / sha[:2] / sha
+
+    # ---------- referințe ----------
+    def ingest(self, ref: str, path: Path, sha: Optional[str] = None) -> str:
+        """Register team file `ref` (e.g. 'BSW/photos/logo_ab12.png'); dedupe it against the store. Returns sha256."""
+        if not self.enabled:
+            return sha or ""
+        sha = sha or file_sha256(path)
+        obj = self._object_path(sha)
+        with self._lock:
+            objects = self._load()
+            old = self._paths.get(ref)
+            if old and old != sha:
+                self._drop_ref(ref)
+            if obj.is_file():
+                if not _same_file(obj, path):
+                    tmp = path.with_name(f".dedup-{uuid.uuid4().hex}")
+                    try:
+                        os.link(obj, tmp)
+                        os.replace(tmp, path)
+                        self._stats["deduplicated"] += 1
+                        self._stats["bytesSaved"] += obj.stat().st_size
+                    except OSError:
+                        # Alt volum / fără hardlink: rămâne copia, referința e doar înregistrată
+                        try:
+                            tmp.unlink()
+                        except OSError:
+                            pass
+            else:
+                obj.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    os.link(path, obj)
+                except OSError:
+                    shutil.copy2(path, obj)
+            item = objects.setdefault(sha, {"size": obj.stat().st_size, "refs": set()})
+            item["refs"].add(ref)
+            self._paths[ref] = sha
+            self._stats["ingested"] += 1
+            compact = self._log([{"op": "add", "ref": ref, "sha": sha, "size": item["size"]}])
+        if compact:
+            self.flush()
+        return sha
+
+    def _drop_ref(self, ref: str) -> bool:
+        sha = self._paths.pop(ref, None)
+        if not sha:
+            return False
+        item = self._objects.get(sha)
+        if item:
+            item["refs"].discard(ref)
+            if not item["refs"]:
+                obj = self._object_path(sha)
+                try:
+                    obj.unlink()
+                    obj.parent.rmdir()  # doar dacă shard-ul a rămas gol
+                except OSError:
+                    pass
+                del self._objects[sha]
+                self._stats["objectsDeleted"] += 1
+        return True
+
+    def release(self, refs: Iterable[str]) -> int:
+        """Forget references to deleted team files (or whole folders: every ref under 'a/b/'). Returns refs dropped."""
+        if not self.enabled:
+            return 0
+        dropped = []
+        with self._lock:
+            self._load()
+            for ref in refs:
+                ref = ref.strip("/")
+                prefix = ref + "/"
+                for r in [r for r in self._paths if r == ref or r.startswith(prefix)]:
+                    if self._drop_ref(r):
+                        dropped.append(r)
+            compact = self._log([{"op": "del", "ref": r} for r in dropped])
+        if compact:
+            self.flush()
+        return len(dropped)
+
+    def refcount(self, ref: str) -> int:
+        with self._lock:
+            self._load()
+            sha = self._paths.get(ref)
+            return len(self._objects[sha]["refs"]) if sha in self._objects else 0
+
+    def gc(self, adopt_dirs: Iterable[str] = ()) -> dict:
+        """
+        Drop refs whose team file vanished or changed (e.g. after git pull), delete orphan objects.
+        adopt_dirs: media folders (photos, videos, ...) whose existing files are ingested and deduplicated.
+        """
+        if not self.enabled:
+            return {"enabled": False}
+        adopted = 0
+        with self._lock:
+            self._load()
+            paths = dict(self._paths)
+        # Verificarea (stat + hash) se face fără lock; upload-urile continuă între timp
+        stale = []
+        for ref, sha in paths.items():
+            p = self.workspace / ref
+            if not p.is_file() or (not _same_file(self._object_path(sha), p) and file_sha256(p) != sha):
+                stale.append((ref, sha))
+        objects_dir = self.root / "objects"
+        orphans = []
+        if objects_dir.is_dir():
+            for shard in objects_dir.iterdir():
+                orphans.extend(obj for obj in (shard.iterdir() if shard.is_dir() else ()) if not obj.name.startswith("."))
+        dropped = []
+        with self._lock:
+            for ref, sha in stale:
+                # Referința poate fi reîncărcată între timp (alt conținut): atunci nu se mai atinge
+                if self._paths.get(ref) == sha and self._drop_ref(ref):
+                    dropped.append(ref)
+            self._log([{"op": "del", "ref": r} for r in dropped])
+            for obj in orphans:
+                if obj.name not in self._objects:
+                    try:
+                        obj.unlink()
+                        self._stats["objectsDeleted"] += 1
+                    except OSError:
+                        pass
+        self.flush()
+        adopt_dirs = tuple(adopt_dirs)
+        if adopt_dirs and self.workspace.is_dir():
+            for team_dir in self.workspace.iterdir():
+                if not team_dir.is_dir() or team_dir.name.startswith("."):
+                    continue
+                for sub in adopt_dirs:
+                    base = team_dir / sub
+                    if not base.is_dir():
+                        continue
+                    for f in base.iterdir():
+                        if f.is_file() and not f.name.startswith("."):
+                            ref = f"{team_dir.name}/{sub}/{f.name}"
+                            if ref not in self._paths:
+                                self.ingest(ref, f)
+                                adopted += 1
+        return {"dropped": len(dropped), "adopted": adopted, **self.stats()}
+
+    def stats(self) -> dict:
+        with self._lock:
+            objects = self._load() if self.enabled else {}
+            refs = sum(len(o["refs"]) for o in objects.values())
+            out = dict(self._stats)
+            out.update({
+                "enabled": self.enabled,
+                "dir": str(self.root),
+                "objects": len(objects),
+                "refs": refs,
+                "bytes": sum(o["size"] for o in objects.values()),
+                "bytesReferenced": sum(o["size"] * len(o["refs"]) for o in objects.values()),
+            })
+        return out
+
+
+def _same_file(a: Path, b: Path) -> bool:
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
@@ -0,0 +1,168 @@
+"""
+Metrici în format text Prometheus pentru /metrics, fără dependențe externe.
+
+Contoarele și histogramele se actualizează la fiecare eveniment cu un lock și o căutare binară în
+bucket-uri; tot restul (statisticile din cache-uri, cozi, pool-uri) se citește doar când cineva
+face scrape, prin colectoare înregistrate cu `REGISTRY.collect(...)`.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterable
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def _snake(name: str) -> str:
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in values]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict = {}  # labels -> [counts per bucket (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def render(self) -> list:
+        with self._lock:
+            series = sorted((k, (list(v[0]), v[1])) for k, v in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(round(total, 6))}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Metric definitions + scrape-time collectors; render() produces the Prometheus text exposition."""
+
+    def __init__(self, prefix: str = "dashboard"):
+        self.prefix = prefix
+        self._metrics: dict = {}
+        self._collectors: list = []
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def _get(self, cls, name: str, *args, **kwargs):
+        full = f"{self.prefix}_{name}"
+        with self._lock:
+            metric = self._metrics.get(full)
+            if metric is None:
+                metric = self._metrics[full] = cls(full, *args, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._get(Counter, name, help_text, labelnames)
+
+    def histogram(self, name: str, help_text: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def collect(self, component: str, stats: Callable[[], dict]) -> None:
+        """Expose the numeric fields of stats() as <prefix>_<component>_<field> gauges, read only on scrape."""
+        with self._lock:
+            self._collectors.append((component, stats))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines = [
+            f"# HELP {self.prefix}_start_time_seconds Process start time (unix).",
+            f"# TYPE {self.prefix}_start_time_seconds gauge",
+            f"{self.prefix}_start_time_seconds {_number(round(self.started_at, 3))}",
+        ]
+        for metric in metrics:
+            lines += metric.render()
+        for component, stats in collectors:
+            try:
+                data = stats() or {}
+            except Exception:
+                continue
+            for key, value in data.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{self.prefix}_{component}_{_snake(key)}"
+                lines += [f"# TYPE {name} gauge", f"{name} {_number(value)}"]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Metrici comune, folosite din mai multe module
+GIT_SECONDS = REGISTRY.histogram("git_command_seconds", "Duration of git subprocesses.", ("command",))
+UPLOAD_BYTES = REGISTRY.counter("upload_bytes_total", "Bytes received by upload endpoints.", ("kind",))
+PAGES_RENDERED = REGISTRY.counter("pages_rendered_total", "PDF / Office pages rendered to PNG.")
+
+
+@contextmanager
+def timed_git(args: Iterable[str]):
+    """Time a git subprocess into dashboard_git_command_seconds{command=<first arg>}."""
+    args = list(args)
+    with GIT_SECONDS.time(command=args[0] if args else ""):
+        yield
@@ -0,0 +1,534 @@
+"""
+Conversie Office -> PDF printr-o instanță LibreOffice rezidentă.
+
+soffice pornește o singură dată (lazy) cu listener pe socket și primește conversiile prin UNO; este
+verificat înainte de fiecare job și repornit dacă nu răspunde sau depășește timeout-ul. Dacă modulul
+`uno` nu se poate importa în Python-ul aplicației (cazul obișnuit într-un venv pe Windows), apelurile
+UNO trec printr-un mic proces „bridge” rulat cu Python-ul inclus în LibreOffice (program/python) sau
+cu un interpretor care are python3-uno. Doar dacă nu există niciunul, fiecare conversie rulează
+`soffice --convert-to pdf` (mod cli, semnalat în log și în /api/office-server), tot prin aceeași
+coadă și cu un profil LibreOffice separat.
+"""
+import json
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from pathlib import Path
+from shutil import which
+from typing import Callable, Optional, Tuple
+
+from metrics import REGISTRY
+
+OFFICE_START_SECONDS = REGISTRY.histogram("office_start_seconds", "Resident LibreOffice (soffice) start time.")
+
+# După o pornire rezidentă eșuată (port ocupat, profil blocat, UNO fără răspuns) conversiile merg prin CLI atât timp
+RESIDENT_BACKOFF_SECONDS = 300
+
+PDF_FILTERS = {
+    ".doc": "writer_pdf_Export",
+    ".docx": "writer_pdf_Export",
+    ".xls": "calc_pdf_Export",
+    ".xlsx": "calc_pdf_Export",
+    ".ppt": "impress_pdf_Export",
+    ".pptx": "impress_pdf_Export",
+}
+
+# Rulat cu Python-ul LibreOffice: o cerere JSON pe linie la stdin, un răspuns JSON pe linie la stdout
+BRIDGE_SCRIPT = r'''
+import json, sys, time
+import uno
+from com.sun.star.beans import PropertyValue
+
+
+def prop(name, value):
+    p = PropertyValue()
+    p.Name = name
+    p.Value = value
+    return p
+
+
+def connect(url, timeout):
+    local = uno.getComponentContext()
+    resolver = local.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            ctx = resolver.resolve("uno:" + url)
+            break
+        except Exception:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.25)
+    return ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+
+
+desktop = None
+for line in sys.stdin:
+    req = json.loads(line)
+    out = {"ok": True}
+    try:
+        if req["op"] == "connect":
+            desktop = connect(req["url"], req["timeout"])
+        elif req["op"] == "ping":
+            desktop.getComponents()
+        elif req["op"] == "convert":
+            doc = desktop.loadComponentFromURL(req["src"], "_blank", 0, (prop("Hidden", True), prop("ReadOnly", True)))
+            try:
+                doc.storeToURL(req["dst"], (prop("FilterName", req["filter"]),))
+            finally:
+                doc.close(True)
+    except Exception as e:
+        out = {"ok": False, "error": str(e).strip() or type(e).__name__}
+    sys.stdout.write(json.dumps(out) + "\n")
+    sys.stdout.flush()
+'''
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+def _uno_available() -> bool:
+    try:
+        import uno  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _has_uno(python: str) -> bool:
+    try:
+        r = subprocess.run([python, "-c", "import uno"], capture_output=True, timeout=30)
+        return r.returncode == 0
+    except (OSError, subprocess.SubprocessError):
+        return False
+
+
+class _InProcessUno:
+    """UNO calls made directly from this interpreter (uno importable)."""
+
+    def __init__(self):
+        self._desktop = None
+
+    def connect(self, url: str, timeout: float, alive: Callable[[], bool]) -> None:
+        import uno
+
+        local = uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                ctx = resolver.resolve("uno:" + url)
+                break
+            except Exception:
+                if not alive() or time.monotonic() > deadline:
+                    raise RuntimeError("LibreOffice did not start.")
+                time.sleep(0.25)
+        self._desktop = ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+
+    def ping(self) -> bool:
+        if self._desktop is None:
+            return False
+        try:
+            self._desktop.getComponents()
+            return True
+        except Exception:
+            return False
+
+    def convert(self, src_uri: str, dst_uri: str, filter_name: str) -> None:
+        from com.sun.star.beans import PropertyValue
+
+        def prop(name, value):
+            p = PropertyValue()
+            p.Name = name
+            p.Value = value
+            return p
+
+        doc = self._desktop.loadComponentFromURL(src_uri, "_blank", 0, (prop("Hidden", True), prop("ReadOnly", True)))
+        try:
+            doc.storeToURL(dst_uri, (prop("FilterName", filter_name),))
+        finally:
+            doc.close(True)
+
+    def close(self) -> None:
+        self._desktop = None
+
+
+class _BridgeUno:
+    """UNO calls forwarded to BRIDGE_SCRIPT running under LibreOffice's own Python."""
+
+    def __init__(self, python: str, script: Path):
+        self.python = python
+        self.script = script
+        self._proc: Optional[subprocess.Popen] = None
+
+    def _call(self, **req) -> dict:
+        proc = self._proc
+        if proc is None or proc.poll() is not None:
+            raise RuntimeError("LibreOffice UNO bridge is not running.")
+        try:
+            proc.stdin.write(json.dumps(req) + "\n")
+            proc.stdin.flush()
+            line = proc.stdout.readline()
+        except (OSError, ValueError) as e:
+            raise RuntimeError(f"LibreOffice UNO bridge failed: {e}")
+        if not line:
+            raise RuntimeError("LibreOffice UNO bridge exited.")
+        out = json.loads(line)
+        if not out.get("ok"):
+            raise RuntimeError(out.get("error") or "UNO call failed.")
+        return out
+
+    def connect(self, url: str, timeout: float, alive: Callable[[], bool]) -> None:
+        self.close()
+        self._proc = subprocess.Popen(
+            [self.python, str(self.script)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+        )
+        try:
+            self._call(op="connect", url=url, timeout=timeout)
+        except RuntimeError:
+            self.close()
+            raise RuntimeError("LibreOffice did not start.")
+
+    def ping(self) -> bool:
+        try:
+            self._call(op="ping")
+            return True
+        except (RuntimeError, ValueError):
+            return False
+
+    def convert(self, src_uri: str, dst_uri: str, filter_name: str) -> None:
+        self._call(op="convert", src=src_uri, dst=dst_uri, filter=filter_name)
+
+    def close(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is not None and proc.poll() is None:
+            try:
+                proc.kill()
+                proc.wait(timeout=10)
+            except Exception:
+                pass
+
+
+class OfficeServer:
+    """Single worker thread feeding conversions to one soffice; the queue is bounded."""
+
+    def __init__(self, candidates: Callable[[], tuple], port: int = 2002, queue_size: int = 8,
+                 timeout: int = 120, resident: bool = True, profile_dir: Optional[Path] = None,
+                 python: Optional[str] = None):
+        self._candidates = candidates
+        self.port = port
+        self.timeout = timeout
+        self.resident = resident
+        self.python = python
+        self.profile_dir = profile_dir or Path(tempfile.gettempdir()) / "dashboard_tvapp_libreoffice"
+        self._jobs: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._exes: Optional[list] = None
+        self._uno = None  # _InProcessUno / _BridgeUno, ales la prima conversie
+        self._mode: Optional[str] = None
+        self._resident_error: Optional[str] = None
+        self._resident_retry_at = 0.0
+        self._proc: Optional[subprocess.Popen] = None
+        self._busy_since: Optional[float] = None
+        self._stats = {
+            "conversions": 0,
+            "failures": 0,
+            "starts": 0,
+            "restarts": 0,
+            "startFailures": 0,
+            "cliFallbacks": 0,
+            "lastStartSeconds": None,
+        }
+
+    @classmethod
+    def from_env(cls, candidates: Callable[[], tuple]) -> "OfficeServer":
+        """
+        LIBREOFFICE_PORT (2002), LIBREOFFICE_QUEUE_SIZE (8), LIBREOFFICE_TIMEOUT (120 s), LIBREOFFICE_RESIDENT (1),
+        LIBREOFFICE_PYTHON (interpreter with `uno` for the bridge; default: soffice's program/python).
+        """
+        return cls(
+            candidates,
+            port=_env_int("LIBREOFFICE_PORT", 2002),
+            queue_size=_env_int("LIBREOFFICE_QUEUE_SIZE", 8),
+            timeout=_env_int("LIBREOFFICE_TIMEOUT", 120),
+            resident=os.environ.get("LIBREOFFICE_RESIDENT", "1").strip().lower() not in ("0", "false", "no"),
+            python=os.environ.get("LIBREOFFICE_PYTHON", "").strip() or None,
+        )
+
+    # ---------- executabile soffice (descoperite o singură dată) ----------
+    def executables(self) -> list:
+        """All existing soffice candidates, in order; the last one that worked is moved to the front."""
+        with self._lock:
+            if self._exes is None:
+                self._exes = self._discover()
+            return list(self._exes)
+
+    def executable(self) -> Optional[str]:
+        exes = self.executables()
+        return exes[0] if exes else None
+
+    def _discover(self) -> list:
+        found = []
+        for cmd in self._candidates():
+            path = cmd if Path(cmd).is_file() else which(cmd)
+            if path and path not in found:
+                found.append(path)
+        return found
+
+    def _prefer(self, exe: str) -> None:
+        with self._lock:
+            if self._exes and exe in self._exes and self._exes[0] != exe:
+                self._exes.remove(exe)
+                self._exes.insert(0, exe)
+
+    def _forget_executable(self, exe: str) -> None:
+        with self._lock:
+            if self._exes and exe in self._exes:
+                self._exes.remove(exe)
+
+    # ---------- alegerea modului ----------
+    def _resolve_mode(self) -> str:
+        """resident-uno, resident-bridge or cli; decided once, on the worker thread (may start a python process)."""
+        if self._mode is not None:
+            return self._mode
+        if not self.resident:
+            self._mode = "cli"
+        elif _uno_available():
+            self._uno, self._mode = _InProcessUno(), "resident-uno"
+        else:
+            python = self._bridge_python()
+            if python:
+                script = self.profile_dir / "uno_bridge.py"
+                script.parent.mkdir(parents=True, exist_ok=True)
+                script.write_text(BRIDGE_SCRIPT, encoding="utf-8")
+                self._uno, self._mode = _BridgeUno(python, script), "resident-bridge"
+            else:
+                self._mode = "cli"
+                self._resident_error = (
+                    "No Python with the `uno` module found (LibreOffice program/python, python3-uno or "
+                    "LIBREOFFICE_PYTHON); every document starts a new soffice process."
+                )
+                print(f"WARNING: LibreOffice resident mode unavailable: {self._resident_error}", file=sys.stderr)
+        return self._mode
+
+    def _bridge_python(self) -> Optional[str]:
+        pythons = [self.python] if self.python else []
+        for exe in self.executables():
+            program = Path(exe).resolve().parent
+            pythons += [str(program / "python.exe"), str(program / "python")]
+        if os.name != "nt":
+            pythons.append("python3")  # distribuțiile Linux: python3-uno e instalat pentru Python-ul sistemului
+        for python in pythons:
+            if (Path(python).is_file() or which(python)) and _has_uno(python):
+                return python
+        return None
+
+    # ---------- coadă ----------
+    def convert(self, office_path: Path, out_dir: Path) -> Tuple[Optional[Path], Optional[str]]:
+        """Queue a conversion and wait for it. Returns (pdf_path, error_message)."""
+        if not self.executables():
+            return None, "LibreOffice (soffice) not found."
+        self._ensure_worker()
+        fut: Future = Future()
+        try:
+            self._jobs.put_nowait((office_path, out_dir, fut))
+        except queue.Full:
+            return None, "LibreOffice conversion queue is full, try again later."
+        while True:
+            try:
+                return fut.result(timeout=1)
+            except FutureTimeout:
+                started = self._busy_since
+                if fut.running() and started and time.monotonic() - started > self.timeout:
+                    # LibreOffice blocat: îl oprim, worker-ul primește eroare și instanța se repornește la următorul job
+                    self._kill()
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name="libreoffice-server", daemon=True)
+                self._thread.start()
+
+    def _worker(self) -> None:
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                break
+            office_path, out_dir, fut = item
+            if not fut.set_running_or_notify_cancel():
+                continue
+            self._busy_since = time.monotonic()
+            try:
+                if self._resolve_mode() == "cli":
+                    result = self._convert_cli(office_path, out_dir)
+                else:
+                    result = self._convert_resident(office_path, out_dir)
+            except Exception as e:
+                result = (None, str(e).strip() or type(e).__name__)
+            self._busy_since = None
+            with self._lock:
+                self._stats["conversions" if result[0] else "failures"] += 1
+            fut.set_result(result)
+
+    # ---------- mod rezident (UNO) ----------
+    def _uno_url(self) -> str:
+        return f"socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext"
+
+    def _start(self) -> None:
+        """Start soffice with the UNO listener, trying each executable until one answers."""
+        errors = []
+        for exe in self.executables():
+            t0 = time.perf_counter()
+            try:
+                self._proc = subprocess.Popen(
+                    [
+                        exe, "--headless", "--invisible", "--nologo", "--norestore",
+                        "--nodefault", "--nolockcheck",
+                        f"-env:UserInstallation={(self.profile_dir / 'resident').as_uri()}",
+                        f"--accept={self._uno_url()}",
+                    ],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+            except OSError as e:
+                errors.append(f"{exe}: {e}")
+                continue
+            proc = self._proc
+            try:
+                self._uno.connect(self._uno_url(), 30, lambda: proc.poll() is None)
+            except Exception as e:
+                self._kill()
+                errors.append(f"{exe}: {e}")
+                continue
+            self._prefer(exe)
+            with self._lock:
+                self._stats["starts"] += 1
+                self._stats["lastStartSeconds"] = round(time.perf_counter() - t0, 3)
+            OFFICE_START_SECONDS.observe(time.perf_counter() - t0)
+            return
+        raise RuntimeError("LibreOffice did not start. " + "; ".join(errors))
+
+    def _healthy(self) -> bool:
+        if self._proc is None or self._proc.poll() is not None or self._uno is None:
+            return False
+        return self._uno.ping()
+
+    def _kill(self) -> None:
+        proc, self._proc = self._proc, None
+        if self._uno is not None:
+            self._uno.close()
+        if proc is not None and proc.poll() is None:
+            try:
+                proc.kill()
+                proc.wait(timeout=10)
+            except Exception:
+                pass
+
+    def _convert_resident(self, office_path: Path, out_dir: Path) -> Tuple[Optional[Path], Optional[str]]:
+        if not self._healthy():
+            if time.monotonic() < self._resident_retry_at:
+                return self._fallback_cli(office_path, out_dir)
+            if self._stats["starts"]:
+                with self._lock:
+                    self._stats["restarts"] += 1
+            self._kill()
+            try:
+                self._start()
+            except Exception as e:
+                self._resident_retry_at = time.monotonic() + RESIDENT_BACKOFF_SECONDS
+                with self._lock:
+                    self._stats["startFailures"] += 1
+                    self._resident_error = str(e).strip() or type(e).__name__
+                print(f"WARNING: LibreOffice resident start failed, using soffice --convert-to for "
+                      f"{RESIDENT_BACKOFF_SECONDS} s: {self._resident_error}", file=sys.stderr)
+                return self._fallback_cli(office_path, out_dir)
+            with self._lock:
+                self._resident_error = None
+
+        filter_name = PDF_FILTERS.get(office_path.suffix.lower())
+        if not filter_name:
+            return None, None
+        pdf_path = out_dir / (office_path.stem + ".pdf")
+        try:
+            self._uno.convert(office_path.resolve().as_uri(), pdf_path.resolve().as_uri(), filter_name)
+        except Exception as e:
+            # Instanța poate fi căzută/blocată: următorul job o verifică și o repornește
+            if not self._healthy():
+                self._kill()
+            return None, str(e).strip() or type(e).__name__
+        return (pdf_path if pdf_path.exists() else None), None
+
+    def _fallback_cli(self, office_path: Path, out_dir: Path) -> Tuple[Optional[Path], Optional[str]]:
+        with self._lock:
+            self._stats["cliFallbacks"] += 1
+        return self._convert_cli(office_path, out_dir)
+
+    # ---------- mod CLI (fără uno, sau instanța rezidentă nu pornește) ----------
+    def _convert_cli(self, office_path: Path, out_dir: Path) -> Tuple[Optional[Path], Optional[str]]:
+        """soffice --convert-to with each candidate in turn (as before the resident mode), first success wins."""
+        error = "LibreOffice (soffice) not found."
+        pdf_path = out_dir / (office_path.stem + ".pdf")
+        for exe in self.executables():
+            try:
+                r = subprocess.run(
+                    [
+                        exe, "--headless", "--norestore",
+                        f"-env:UserInstallation={(self.profile_dir / 'cli').as_uri()}",
+                        "--convert-to", "pdf", "--outdir", str(out_dir), str(office_path),
+                    ],
+                    cwd=str(out_dir),
+                    capture_output=True,
+                    text=True,
+                    timeout=self.timeout,
+                )
+            except FileNotFoundError:
+                self._forget_executable(exe)
+                continue
+            except subprocess.TimeoutExpired:
+                error = "LibreOffice conversion timed out."
+                continue
+            if r.returncode != 0:
+                error = (r.stderr or r.stdout or "LibreOffice conversion failed.").strip()
+                continue
+            if pdf_path.exists():
+                self._prefer(exe)
+                return pdf_path, None
+        return None, error
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out.update({
+                "executable": self._exes[0] if self._exes else None,
+                "candidates": len(self._exes) if self._exes is not None else None,
+                "mode": self._mode or ("resident" if self.resident else "cli"),
+                "residentError": self._resident_error,
+                "residentRetryIn": max(0, round(self._resident_retry_at - time.monotonic())) or None,
+                "python": self._uno.python if isinstance(self._uno, _BridgeUno) else None,
+                "running": self._proc is not None and self._proc.poll() is None,
+                "pid": self._proc.pid if self._proc is not None else None,
+                "queued": self._jobs.qsize(),
+            })
+        return out
+
+    def shutdown(self) -> None:
+        try:
+            self._jobs.put_nowait(None)
+        except queue.Full:
+            pass
+        self._kill()
@@ -0,0 +1,133 @@
+"""
+Randare pagini PDF -> PNG (pymupdf), serial sau în paralel pe mai multe procese.
+
+În modul paralel lista de pagini este împărțită în bucăți; fiecare proces worker
+își deschide propriul document fitz și scrie 001.png, 002.png, ... direct în folderul țintă.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Callable, Optional
+
+from metrics import PAGES_RENDERED
+
+DPI = 150
+
+
+def render_pages(pdf_path: str, items: list, out_dir: str, dpi: int = DPI) -> int:
+    """Render (out_index, page_1based) pairs from pdf_path; out_index 1 -> 001.png. Runs in worker processes."""
+    import fitz  # pymupdf
+
+    doc = fitz.open(pdf_path)
+    try:
+        return _render_from_doc(doc, items, Path(out_dir), dpi)
+    finally:
+        doc.close()
+
+
+def _render_from_doc(doc, items: list, out_dir: Path, dpi: int, progress: Optional[Callable[[int], None]] = None) -> int:
+    count = 0
+    for out_index, page_1 in items:
+        page_0 = page_1 - 1
+        if page_0 < 0 or page_0 >= len(doc):
+            continue
+        pix = doc[page_0].get_pixmap(dpi=dpi, alpha=False)
+        pix.save(str(out_dir / f"{out_index:03d}.png"))
+        count += 1
+        if progress:
+            progress(count)
+    return count
+
+
+class PdfRenderer:
+    """Chooses serial or process-pool rendering depending on page count; the pool is created lazily and reused."""
+
+    def __init__(self, workers: int = 1, min_parallel_pages: int = 8, dpi: int = DPI):
+        self.workers = max(1, workers)
+        self.min_parallel_pages = max(1, min_parallel_pages)
+        self.dpi = dpi
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "PdfRenderer":
+        """PDF_RENDER_WORKERS (default: CPU count; 1 = serial), PDF_RENDER_PARALLEL_MIN_PAGES (default 8)."""
+        def env_int(name: str, default: int) -> int:
+            try:
+                return int(os.environ.get(name, "").strip() or default)
+            except ValueError:
+                return default
+
+        return cls(
+            workers=env_int("PDF_RENDER_WORKERS", os.cpu_count() or 1),
+            min_parallel_pages=env_int("PDF_RENDER_PARALLEL_MIN_PAGES", 8),
+        )
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn, nu fork: procesul serverului are multe thread-uri (waitress, watchdog, git, browsere),
+                # iar un fork poate moșteni un lock ținut de unul dintre ele; worker-ul are nevoie doar de fitz
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def _reset_pool(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def render(self, pdf_path: Path, page_numbers_1based: list, out_dir: Path, doc=None,
+               progress: Optional[Callable[[int, int], None]] = None) -> int:
+        """
+        Render the pages to out_dir with the same 001.png... naming as the page list order.
+        doc: an already open fitz document (reused for serial rendering, avoids a second open).
+        """
+        items = [(i + 1, p) for i, p in enumerate(page_numbers_1based)]
+        total = len(items)
+        report = (lambda done: progress(done, total)) if progress else None
+        if self.workers <= 1 or total < self.min_parallel_pages:
+            if doc is not None:
+                count = _render_from_doc(doc, items, out_dir, self.dpi, report)
+            else:
+                import fitz  # pymupdf
+
+                doc = fitz.open(str(pdf_path))
+                try:
+                    count = _render_from_doc(doc, items, out_dir, self.dpi, report)
+                finally:
+                    doc.close()
+        else:
+            count = self._render_parallel(pdf_path, items, out_dir, report)
+        PAGES_RENDERED.inc(count)
+        return count
+
+    def _render_parallel(self, pdf_path: Path, items: list, out_dir: Path,
+                         report: Optional[Callable[[int], None]]) -> int:
+        # Bucăți mici (~4 per worker) ca progresul să avanseze uniform și workerii să rămână ocupați
+        chunk = max(1, -(-len(items) // (self.workers * 4)))
+        shards = [items[i:i + chunk] for i in range(0, len(items), chunk)]
+        pool = self._pool()
+        pending = {pool.submit(render_pages, str(pdf_path), shard, str(out_dir), self.dpi) for shard in shards}
+        count = 0
+        try:
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    count += fut.result()
+                if report:
+                    report(count)
+        except BrokenProcessPool:
+            self._reset_pool()
+            raise RuntimeError("PDF render worker crashed")
+        finally:
+            for fut in pending:
+                fut.cancel()
+        return count
+
+    def shutdown(self) -> None:
+        self._reset_pool()
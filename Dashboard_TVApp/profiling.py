@@ -0,0 +1,216 @@
+"""
+Profilare la cerere pentru apeluri individuale (cProfile), fără repornirea serverului.
+
+O cerere este profilată dacă trimite header-ul `X-Profile: <PROFILE_TOKEN>` sau dacă ruta ei apare în
+PROFILE_ROUTES. Profilul (format pstats, deschis cu `python -m pstats` / snakeviz) se scrie în
+PROFILE_DIR împreună cu un fișier .json cu ruta, parametrii, durata și funcțiile cele mai costisitoare;
+se păstrează doar ultimele PROFILE_KEEP profiluri. Job-urile pornite dintr-o cerere profilată
+(convert-document, convert-web) primesc un profil separat, legat de cel al cererii.
+
+cProfile nu suportă două profilări simultane, așa că se profilează o singură cerere odată; celelalte
+rulează normal.
+"""
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+ID_RE = re.compile(r"^\d{8}-\d{6}-\d{6}-[0-9a-f]{4}$")
+SECRET_KEYS = ("token", "password", "secret", "authorization")
+
+
+def _clip(value, limit: int = 200):
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, default=str)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def safe_params(*sources: Optional[dict]) -> dict:
+    """Merge request params for the profile metadata; secrets are redacted and long values clipped."""
+    out = {}
+    for source in sources:
+        for key, value in (source or {}).items():
+            if any(s in str(key).lower() for s in SECRET_KEYS):
+                value = "***"
+            out[str(key)] = _clip(value)
+    return out
+
+
+class RequestProfiler:
+    """cProfile capture for selected requests / jobs, written to root with count-based rotation."""
+
+    def __init__(self, root: Path, token: str = "", routes: Iterable[str] = (), min_ms: float = 0,
+                 keep: int = 50, top: int = 30):
+        self.root = root
+        self.token = token
+        self.routes = {r for r in routes if r}
+        self.min_ms = max(0.0, min_ms)
+        self.keep = max(1, keep)
+        self.top = max(1, top)
+        self._active = threading.Lock()  # un singur profil odată
+        self._lock = threading.Lock()
+        self._stats = {"captured": 0, "discarded": 0, "busy": 0, "rotated": 0}
+
+    @classmethod
+    def from_env(cls, default_root: Path) -> "RequestProfiler":
+        """
+        PROFILE_TOKEN (header X-Profile), PROFILE_ROUTES (route templates, comma-separated; * = all),
+        PROFILE_MIN_MS (0; faster calls are discarded), PROFILE_KEEP (50), PROFILE_DIR (default <dashboard>/diagnostics/profiles).
+        """
+        def env_num(name: str, default: float) -> float:
+            try:
+                return float(os.environ.get(name, "").strip() or default)
+            except ValueError:
+                return default
+
+        root = Path(os.environ.get("PROFILE_DIR", "").strip() or default_root)
+        routes = [r.strip() for r in os.environ.get("PROFILE_ROUTES", "").split(",")]
+        return cls(root.resolve(), token=os.environ.get("PROFILE_TOKEN", "").strip(), routes=routes,
+                   min_ms=env_num("PROFILE_MIN_MS", 0), keep=int(env_num("PROFILE_KEEP", 50)))
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token or self.routes)
+
+    def _token_ok(self, header_token: Optional[str]) -> bool:
+        return bool(self.token) and hmac.compare_digest((header_token or "").encode(), self.token.encode())
+
+    def authorized(self, header_token: Optional[str]) -> bool:
+        """Token check for the listing endpoints; without a token they are open only when route profiling is on."""
+        if self.token:
+            return self._token_ok(header_token)
+        return bool(self.routes)
+
+    def wanted(self, route: Optional[str], header_token: Optional[str]) -> bool:
+        if self._token_ok(header_token):
+            return True
+        return "*" in self.routes or (route is not None and route in self.routes)
+
+    # ---------- captură ----------
+    def start(self, wait: float = 0) -> Optional[cProfile.Profile]:
+        """Start profiling the current thread; None when another capture is still running after `wait` seconds."""
+        if not (self._active.acquire(timeout=wait) if wait > 0 else self._active.acquire(blocking=False)):
+            with self._lock:
+                self._stats["busy"] += 1
+            return None
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except Exception:
+            # alt profiler (ex. un debugger) ocupă deja interpretorul: cererea rulează neprofilată
+            self._active.release()
+            with self._lock:
+                self._stats["busy"] += 1
+            return None
+        return prof
+
+    def stop(self, prof: cProfile.Profile, wall_seconds: float, meta: dict) -> Optional[str]:
+        """Stop the capture started by start() and save it; returns the profile id (None if discarded)."""
+        try:
+            prof.disable()
+        finally:
+            self._active.release()
+        if wall_seconds * 1000 < self.min_ms:
+            with self._lock:
+                self._stats["discarded"] += 1
+            return None
+        return self.save(prof, wall_seconds, meta)
+
+    def wrap(self, body: Callable, meta: dict) -> Callable:
+        """Profile a job body (runs in a worker thread) as its own capture, labelled with meta."""
+        def profiled(*args, **kwargs):
+            # Cererea care a pus job-ul în coadă ține încă profilul ei până la răspuns
+            prof = self.start(wait=10)
+            if prof is None:
+                return body(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return body(*args, **kwargs)
+            finally:
+                self.stop(prof, time.perf_counter() - t0, meta)
+        return profiled
+
+    def save(self, prof: cProfile.Profile, wall_seconds: float, meta: dict) -> str:
+        # Id-ul începe cu momentul capturii (cu microsecunde): ordinea alfabetică e cea cronologică, folosită la rotație
+        profile_id = datetime.now().strftime("%Y%m%d-%H%M%S-%f") + "-" + uuid.uuid4().hex[:4]
+        stats = pstats.Stats(prof)
+        top = sorted(stats.stats.items(), key=lambda kv: kv[1][3], reverse=True)[: self.top]
+        record = {
+            "id": profile_id,
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+            **meta,
+            "wallMs": round(wall_seconds * 1000, 3),
+            "profiledMs": round(stats.total_tt * 1000, 3),
+            "calls": stats.total_calls,
+            "top": [
+                {"function": f"{name} ({os.path.basename(filename)}:{line})", "calls": nc,
+                 "ownMs": round(tt * 1000, 3), "cumulativeMs": round(ct * 1000, 3)}
+                for (filename, line, name), (_cc, nc, tt, ct, _callers) in top
+            ],
+        }
+        self.root.mkdir(parents=True, exist_ok=True)
+        stats.dump_stats(str(self.root / f"{profile_id}.prof"))
+        (self.root / f"{profile_id}.json").write_text(json.dumps(record, ensure_ascii=False, indent=2), encoding="utf-8")
+        with self._lock:
+            self._stats["captured"] += 1
+            self._rotate()
+        return profile_id
+
+    def _rotate(self) -> None:
+        records = sorted(self.root.glob("*.json"))
+        for old in records[: max(0, len(records) - self.keep)]:
+            for p in (old, old.with_suffix(".prof")):
+                try:
+                    p.unlink()
+                except OSError:
+                    pass
+            self._stats["rotated"] += 1
+
+    # ---------- citire ----------
+    def path(self, profile_id: str, suffix: str = ".json") -> Optional[Path]:
+        if not ID_RE.match(profile_id or ""):
+            return None
+        p = self.root / f"{profile_id}{suffix}"
+        return p if p.is_file() else None
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        p = self.path(profile_id)
+        if p is None:
+            return None
+        try:
+            return json.loads(p.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def list(self, limit: int = 50) -> list:
+        """Newest first, without the per-function breakdown."""
+        if not self.root.is_dir():
+            return []
+        out = []
+        for p in sorted(self.root.glob("*.json"), reverse=True)[: max(0, limit)]:
+            record = self.get(p.stem)
+            if record:
+                record.pop("top", None)
+                out.append(record)
+        return out
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+        out.update({
+            "enabled": self.enabled,
+            "routes": sorted(self.routes),
+            "minMs": self.min_ms,
+            "keep": self.keep,
+            "dir": str(self.root),
+        })
+        return out
@@ -0,0 +1,83 @@
+"""
+Fixture-uri comune pentru teste: un remote git bare cu clone locale și aplicația Flask
+pornită pe un WORKSPACE temporar. Testele rulează din Dashboard_TVApp: `python -m pytest tests`.
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "Test", "GIT_AUTHOR_EMAIL": "test@example.com",
+    "GIT_COMMITTER_NAME": "Test", "GIT_COMMITTER_EMAIL": "test@example.com",
+    "GIT_CONFIG_NOSYSTEM": "1",
+}
+
+
+def git(cwd: Path, *args: str) -> str:
+    r = subprocess.run(["git", *args], cwd=str(cwd), capture_output=True, text=True)
+    assert r.returncode == 0, f"git {' '.join(args)}: {r.stderr or r.stdout}"
+    return r.stdout.strip()
+
+
+def commit_file(repo: Path, rel: str, text: str, message: str = "change") -> str:
+    """Write rel, commit it and return the new HEAD."""
+    path = repo / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    git(repo, "add", rel)
+    git(repo, "commit", "-q", "-m", message)
+    return git(repo, "rev-parse", "HEAD")
+
+
+class Remote:
+    """Bare repository (branch main, one commit) and clones of it tracking origin/main."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.bare = root / "remote.git"
+        git(root, "init", "-q", "--bare", "-b", "main", str(self.bare))
+        seed = self.clone("seed")
+        commit_file(seed, "README.md", "seed\n", "initial")
+        git(seed, "push", "-q", "origin", "main")
+
+    def clone(self, name: str) -> Path:
+        path = self.root / name
+        git(self.root, "clone", "-q", str(self.bare), name)
+        return path
+
+
+@pytest.fixture(autouse=True)
+def _git_identity(monkeypatch, tmp_path):
+    for key, value in GIT_ENV.items():
+        monkeypatch.setenv(key, value)
+    monkeypatch.setenv("HOME", str(tmp_path))  # fără ~/.gitconfig al utilizatorului
+
+
+@pytest.fixture
+def remote(tmp_path) -> Remote:
+    return Remote(tmp_path)
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """The Flask app on a temporary WORKSPACE (the app reads its configuration at import)."""
+    work = tmp_path_factory.mktemp("app")
+    (work / "WORKSPACE").mkdir()
+    os.environ["WORKSPACE_PATH"] = str(work / "WORKSPACE")
+    os.environ["CONVERSION_CACHE_DIR"] = str(work / "conversion-cache")
+    os.environ["MEDIA_STORE_DIR"] = str(work / ".media_store")
+    import app
+
+    app.app.testing = True
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
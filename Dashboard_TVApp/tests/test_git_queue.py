@@ -0,0 +1,70 @@
+import pytest
+
+from conftest import commit_file, git
+from git_queue import GitQueue
+
+
+@pytest.fixture
+def local(remote):
+    return remote.clone("local")
+
+
+@pytest.fixture
+def queue(local):
+    return GitQueue(local, "WORKSPACE", debounce_seconds=0)
+
+
+def save(queue, local, rel: str, expected=None) -> dict:
+    path = local / "WORKSPACE" / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(rel + "\n", encoding="utf-8")
+    req = queue.push(expected)
+    assert req.wait(30)
+    return req.result
+
+
+def foreign_push(remote, name: str = "other") -> str:
+    other = remote.clone(name)
+    head = commit_file(other, f"{name}.txt", "foreign\n", "foreign change")
+    git(other, "push", "-q")
+    return head
+
+
+def test_stale_commit_from_own_chain_is_accepted(queue, local):
+    h0 = git(local, "rev-parse", "HEAD")
+    first = save(queue, local, "T/playlist.json", expected=h0)
+    assert first["ok"] and first["commit"] != h0
+    # Clientul a citit HEAD înainte de propriul push anterior: e în urmă doar față de commit-urile coadei
+    second = save(queue, local, "T/a.json", expected=h0)
+    assert second["ok"], second
+    assert list(queue._own_chain) == [h0, first["commit"], second["commit"]]
+
+
+def test_foreign_pull_resets_chain(queue, local, remote):
+    h0 = git(local, "rev-parse", "HEAD")
+    first = save(queue, local, "T/playlist.json", expected=h0)
+    assert first["ok"]
+    foreign_push(remote)
+    git(local, "pull", "-q", "--rebase")  # HEAD se mută în afara cozii
+
+    result = save(queue, local, "T/a.json", expected=first["commit"])
+    assert result == {"ok": False, "error": "Changes have been made in the meantime. Please pull first.",
+                      "needPull": True}
+    head = git(local, "rev-parse", "HEAD")
+    assert save(queue, local, "T/a.json", expected=head)["ok"]
+
+
+def test_push_with_rebase_clears_chain(queue, local, remote):
+    h0 = git(local, "rev-parse", "HEAD")
+    first = save(queue, local, "T/playlist.json", expected=h0)
+    assert first["ok"]
+    foreign_push(remote)
+
+    # Push-ul e respins, coada face pull --rebase și reîncearcă: commit-ul străin intră în istorie
+    rebased = save(queue, local, "T/a.json", expected=first["commit"])
+    assert rebased["ok"], rebased
+    assert queue.stats()["rebases"] == 1
+    assert list(queue._own_chain) == [rebased["commit"]]
+    for stale in (h0, first["commit"]):
+        assert save(queue, local, "T/b.json", expected=stale).get("needPull")
+    assert git(local, "rev-parse", "HEAD") == git(local, "rev-parse", "origin/main")
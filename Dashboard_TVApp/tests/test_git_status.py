@@ -0,0 +1,54 @@
+from conftest import commit_file, git
+from git_status import GitStatus
+
+
+def test_ahead_behind_against_bare_remote(remote):
+    local = remote.clone("local")
+    other = remote.clone("other")
+    status = GitStatus(local, interval_seconds=0)
+
+    st = status.status()
+    assert (st["branch"], st["upstream"], st["ahead"], st["behind"]) == ("main", "origin/main", 0, 0)
+
+    theirs = commit_file(other, "a.txt", "a\n")
+    git(other, "push", "-q")
+    assert status.status()["behind"] == 0  # fără fetch, refs-urile remote nu s-au mișcat
+    assert status.fetch()
+    st = status.status()
+    assert (st["ahead"], st["behind"], st["upstreamCommit"]) == (0, 1, theirs)
+    assert st["lastFetch"] is not None and st["fetchError"] is None
+
+    mine = commit_file(local, "b.txt", "b\n")
+    st = status.status()
+    assert (st["commit"], st["ahead"], st["behind"]) == (mine, 1, 1)
+
+
+def test_cached_until_a_ref_moves(remote):
+    local = remote.clone("local")
+    status = GitStatus(local, interval_seconds=0)
+    status.status()
+    status.status()
+    assert status.stats()["localRefreshes"] == 1
+    commit_file(local, "b.txt", "b\n")
+    status.status()
+    assert status.stats()["localRefreshes"] == 2
+
+
+def test_ref_moving_during_compute_is_not_cached(remote):
+    local = remote.clone("local")
+    status = GitStatus(local, interval_seconds=0)
+    compute = status._compute
+    moved = []
+
+    def racing_compute(*args):
+        out = compute(*args)
+        if not moved:
+            # un commit din coadă termină după ce git a citit HEAD, dar înainte de salvarea statusului
+            moved.append(commit_file(local, "c.txt", "c\n"))
+        return out
+
+    status._compute = racing_compute
+    stale = status.status()
+    assert stale["commit"] != moved[0]
+    st = status.status()
+    assert (st["commit"], st["ahead"]) == (moved[0], 1)
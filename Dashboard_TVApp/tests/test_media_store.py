@@ -0,0 +1,115 @@
+import json
+import os
+
+import pytest
+
+from media_store import MediaStore, file_sha256
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    ws = tmp_path / "WORKSPACE"
+    ws.mkdir()
+    return ws
+
+
+def new_store(tmp_path, workspace, **kwargs) -> MediaStore:
+    return MediaStore(tmp_path / ".media_store", workspace, **kwargs)
+
+
+def put(workspace, ref: str, data: bytes):
+    path = workspace / ref
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+def test_same_bytes_in_two_teams_share_one_object(tmp_path, workspace):
+    store = new_store(tmp_path, workspace)
+    a = put(workspace, "A/photos/logo.png", b"logo")
+    b = put(workspace, "B/photos/logo.png", b"logo")
+    sha = store.ingest("A/photos/logo.png", a)
+    assert store.ingest("B/photos/logo.png", b) == sha
+    assert os.path.samefile(a, b)
+    assert store.refcount("A/photos/logo.png") == 2
+    assert store.stats()["objects"] == 1
+
+    # Echipa A își șterge fișierul: obiectul și fișierul echipei B rămân
+    a.unlink()
+    assert store.release(["A/photos/logo.png"]) == 1
+    assert store.refcount("B/photos/logo.png") == 1
+    assert (tmp_path / ".media_store" / "objects" / sha[:2] / sha).is_file()
+    assert b.read_bytes() == b"logo"
+
+    b.unlink()
+    assert store.release(["B/photos/logo.png"]) == 1
+    assert store.stats()["objects"] == 0
+    assert not (tmp_path / ".media_store" / "objects" / sha[:2] / sha).exists()
+
+
+def test_release_team_prefix_does_not_touch_similar_names(tmp_path, workspace):
+    store = new_store(tmp_path, workspace)
+    for ref in ("T1/photos/a.png", "T1/videos/b.mp4", "T10/photos/a.png"):
+        store.ingest(ref, put(workspace, ref, ref.encode()))
+    assert store.release(["T1"]) == 2
+    assert store.refcount("T1/photos/a.png") == 0
+    assert store.refcount("T10/photos/a.png") == 1
+    assert store.stats()["refs"] == 1
+
+
+def test_journal_replayed_after_restart(tmp_path, workspace):
+    store = new_store(tmp_path, workspace, compact_every=3)
+    for i in range(4):  # a treia înregistrare compactează în refs.json, a patra rămâne în refs.log
+        ref = f"A/photos/{i}.png"
+        store.ingest(ref, put(workspace, ref, b"same"))
+    store.release(["A/photos/0.png"])
+    root = tmp_path / ".media_store"
+    assert (root / "refs.json").is_file()
+    assert len((root / "refs.log").read_text(encoding="utf-8").splitlines()) == 2
+
+    reloaded = new_store(tmp_path, workspace)
+    assert reloaded.refcount("A/photos/1.png") == 3
+    assert reloaded.refcount("A/photos/0.png") == 0
+    assert reloaded.stats()["refs"] == 3
+
+    # Oprire în timpul compactării: refs.log.old e reaplicat; o linie tăiată la final e ignorată
+    reloaded.flush()
+    stale = json.loads((root / "refs.json").read_text(encoding="utf-8"))
+    (root / "refs.log.old").write_text(json.dumps({"op": "del", "ref": "A/photos/1.png"}) + "\n", encoding="utf-8")
+    (root / "refs.log").write_text('{"op": "del", "ref": "A/pho', encoding="utf-8")
+    crashed = new_store(tmp_path, workspace)
+    assert crashed.refcount("A/photos/2.png") == 2
+    assert crashed.refcount("A/photos/1.png") == 0
+    assert sum(len(o["refs"]) for o in stale["objects"].values()) == 3
+
+
+def test_gc_after_external_change_keeps_other_teams(tmp_path, workspace):
+    store = new_store(tmp_path, workspace)
+    a = put(workspace, "A/photos/x.png", b"shared")
+    b = put(workspace, "B/photos/x.png", b"shared")
+    sha = store.ingest("A/photos/x.png", a)
+    store.ingest("B/photos/x.png", b)
+    solo = put(workspace, "C/videos/v.mp4", b"only C")
+    solo_sha = store.ingest("C/videos/v.mp4", solo)
+
+    # git pull înlocuiește fișierul lui A (fișier nou, nu scriere pe loc) și șterge video-ul lui C
+    a.unlink()
+    a.write_bytes(b"changed by pull")
+    solo.unlink()
+    result = store.gc()
+    assert result["dropped"] == 2
+    assert store.refcount("A/photos/x.png") == 0
+    assert store.refcount("B/photos/x.png") == 1
+    assert b.read_bytes() == b"shared"
+    objects = tmp_path / ".media_store" / "objects"
+    assert (objects / sha[:2] / sha).is_file()
+    assert not (objects / solo_sha[:2] / solo_sha).exists()
+
+    # Cu adopt, fișierul nou al lui A intră în store sub noul hash
+    result = store.gc(adopt_dirs=("photos",))
+    assert result["adopted"] == 1
+    assert store.refcount("A/photos/x.png") == 1
+    assert store._paths["A/photos/x.png"] == file_sha256(a)
+
+    reloaded = new_store(tmp_path, workspace)
+    assert reloaded.stats()["refs"] == 2
@@ -0,0 +1,75 @@
+import json
+import uuid
+
+import pytest
+
+
+@pytest.fixture
+def team(app_module):
+    """A team with slides a, b, c at version 5."""
+    name = "T" + uuid.uuid4().hex[:8]
+    team_dir = app_module.WORKSPACE_DIR / name
+    team_dir.mkdir()
+    slides = [{"id": i, "type": "image", "src": f"photos/{i}.png", "title": i.upper()} for i in "abc"]
+    (team_dir / "playlist.json").write_text(json.dumps({"slides": slides, "version": 5}), encoding="utf-8")
+    return name
+
+
+def patch(client, team, ops, headers=None, **body):
+    return client.patch(f"/api/teams/{team}/playlist", json={"ops": ops, **body}, headers=headers or {})
+
+
+def ids(client, team) -> list:
+    return [s["id"] for s in client.get(f"/api/teams/{team}/playlist").get_json()["slides"]]
+
+
+def test_insert_after_null_goes_first(client, team):
+    r = patch(client, team, [{"op": "insert", "slide": {"id": "n", "type": "image"}, "after": None}])
+    assert r.status_code == 200 and r.get_json() == {"ok": True, "version": 6}
+    assert r.headers["ETag"] == '"6"'
+    assert ids(client, team) == ["n", "a", "b", "c"]
+
+
+def test_out_of_range_index_is_clamped(client, team):
+    assert patch(client, team, [{"op": "insert", "slide": {"id": "z"}, "index": 99}]).status_code == 200
+    assert patch(client, team, [{"op": "move", "id": "c", "index": -4}]).status_code == 200
+    assert ids(client, team) == ["c", "a", "b", "z"]
+    assert patch(client, team, [{"op": "move", "id": "a", "index": "1"}]).status_code == 400
+
+
+def test_move_after_itself_keeps_position(client, team):
+    r = patch(client, team, [{"op": "move", "id": "b", "after": "b"}])
+    assert r.status_code == 200
+    assert ids(client, team) == ["a", "b", "c"]
+    assert patch(client, team, [{"op": "move", "id": "a", "after": "c"}]).status_code == 200
+    assert ids(client, team) == ["b", "c", "a"]
+
+
+def test_update_with_unset(client, team):
+    r = patch(client, team, [{"op": "update", "id": "b", "changes": {"duration": 7, "id": "x"}, "unset": ["title", "id"]}])
+    assert r.status_code == 200
+    slides = client.get(f"/api/teams/{team}/playlist").get_json()["slides"]
+    assert slides[1] == {"id": "b", "type": "image", "src": "photos/b.png", "duration": 7}
+
+
+def test_all_or_nothing(client, team):
+    r = patch(client, team, [{"op": "delete", "id": "a"}, {"op": "update", "id": "missing", "changes": {}}])
+    assert r.status_code == 400
+    assert "missing" in r.get_json()["error"]
+    playlist = client.get(f"/api/teams/{team}/playlist").get_json()
+    assert [s["id"] for s in playlist["slides"]] == ["a", "b", "c"] and playlist["version"] == 5
+
+
+def test_stale_version_returns_412(client, team):
+    for kwargs in ({"version": 4}, {"headers": {"If-Match": '"4"'}}):
+        r = patch(client, team, [{"op": "delete", "id": "a"}], **kwargs)
+        assert r.status_code == 412
+        assert r.get_json()["version"] == 5 and r.headers["ETag"] == '"5"'
+    assert ids(client, team) == ["a", "b", "c"]
+    assert patch(client, team, [{"op": "delete", "id": "a"}], headers={"If-Match": '"5"'}).status_code == 200
+
+
+def test_if_match_star_accepts_any_version(client, team):
+    r = patch(client, team, [{"op": "delete", "id": "c"}], headers={"If-Match": "*"})
+    assert r.status_code == 200 and r.get_json()["version"] == 6
+    assert ids(client, team) == ["a", "b"]
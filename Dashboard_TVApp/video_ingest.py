@@ -0,0 +1,175 @@
+"""
+Pas de ingest pentru video-urile încărcate (videos/, stretching/).
+
+- remux "faststart" (atomul moov mutat înaintea mdat, fără re-encodare) cu ffmpeg, dacă e nevoie:
+  altfel TV-urile nu pot porni redarea până nu descarcă tot fișierul;
+- metadate (durată, rezoluție, codec) cu ffprobe, sau doar durata citită direct din MP4 când
+  ffprobe lipsește; rezultatul se scrie în <folder>/.derived/<fișier>/meta.json.
+"""
+import json
+import os
+import struct
+import subprocess
+import threading
+import uuid
+from pathlib import Path
+from shutil import which
+from typing import Optional
+
+from image_derivatives import derived_dir
+
+MP4_EXT = {".mp4", ".m4v", ".mov"}
+
+
+def _atoms(f, start: int, end: int):
+    """Yield (type, offset, size) for the MP4 boxes between start and end."""
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, kind = struct.unpack(">I4s", header)
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+        elif size == 0:
+            size = end - offset
+        if size < 8:
+            return
+        yield kind.decode("latin-1"), offset, size
+        offset += size
+
+
+def mp4_layout(path: Path) -> Optional[dict]:
+    """{ faststart, duration } from the top-level boxes (moov before mdat) and mvhd; None if not an MP4."""
+    try:
+        with open(path, "rb") as f:
+            end = os.fstat(f.fileno()).st_size
+            top = {kind: (offset, size) for kind, offset, size in _atoms(f, 0, end) if kind in ("moov", "mdat")}
+            if "moov" not in top:
+                return None
+            duration = None
+            moov_offset, moov_size = top["moov"]
+            for kind, offset, _size in _atoms(f, moov_offset + 8, moov_offset + moov_size):
+                if kind == "mvhd":
+                    f.seek(offset + 8)
+                    version = f.read(1)[0]
+                    f.read(3)
+                    if version == 1:
+                        f.read(16)
+                        timescale, length = struct.unpack(">IQ", f.read(12))
+                    else:
+                        f.read(8)
+                        timescale, length = struct.unpack(">II", f.read(8))
+                    if timescale:
+                        duration = round(length / timescale, 3)
+                    break
+    except (OSError, struct.error, IndexError):
+        return None
+    return {"faststart": "mdat" not in top or top["moov"][0] < top["mdat"][0], "duration": duration}
+
+
+class VideoIngest:
+    """Runs ffprobe/ffmpeg (discovered once) over an uploaded video; paths are relative to the team folder."""
+
+    def __init__(self, ffmpeg: Optional[str] = None, ffprobe: Optional[str] = None, enabled: bool = True,
+                 timeout: int = 600):
+        self._ffmpeg = ffmpeg
+        self._ffprobe = ffprobe
+        self.enabled = enabled
+        self.timeout = timeout
+        self._resolved = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "VideoIngest":
+        """FFMPEG_PATH / FFPROBE_PATH (default: from PATH), VIDEO_INGEST (1 = on, 0 = off)."""
+        return cls(
+            ffmpeg=os.environ.get("FFMPEG_PATH", "").strip() or None,
+            ffprobe=os.environ.get("FFPROBE_PATH", "").strip() or None,
+            enabled=os.environ.get("VIDEO_INGEST", "1").strip().lower() not in ("0", "false", "no"),
+        )
+
+    def tools(self) -> tuple:
+        with self._lock:
+            if not self._resolved:
+                self._ffmpeg = self._ffmpeg or which("ffmpeg")
+                self._ffprobe = self._ffprobe or which("ffprobe")
+                self._resolved = True
+            return self._ffmpeg, self._ffprobe
+
+    def probe(self, path: Path) -> dict:
+        """Duration / resolution / codecs. Uses ffprobe when present, otherwise only the MP4 header."""
+        _ffmpeg, ffprobe = self.tools()
+        if ffprobe:
+            try:
+                r = subprocess.run(
+                    [ffprobe, "-v", "error", "-print_format", "json", "-show_format", "-show_streams", str(path)],
+                    capture_output=True, text=True, timeout=60,
+                )
+                if r.returncode == 0:
+                    data = json.loads(r.stdout or "{}")
+                    streams = data.get("streams") or []
+                    video = next((s for s in streams if s.get("codec_type") == "video"), {})
+                    audio = next((s for s in streams if s.get("codec_type") == "audio"), {})
+                    duration = (data.get("format") or {}).get("duration") or video.get("duration")
+                    return {
+                        "duration": round(float(duration), 3) if duration else None,
+                        "width": video.get("width"),
+                        "height": video.get("height"),
+                        "videoCodec": video.get("codec_name"),
+                        "audioCodec": audio.get("codec_name"),
+                        "probe": "ffprobe",
+                    }
+            except (OSError, ValueError, subprocess.TimeoutExpired):
+                pass
+        layout = mp4_layout(path) or {}
+        return {"duration": layout.get("duration"), "probe": "mp4" if layout else None}
+
+    def _remux_faststart(self, path: Path) -> bool:
+        ffmpeg, _ffprobe = self.tools()
+        if not ffmpeg:
+            return False
+        tmp = path.with_name(f".ingest-{uuid.uuid4().hex}{path.suffix}")
+        try:
+            r = subprocess.run(
+                [ffmpeg, "-v", "error", "-y", "-i", str(path), "-map", "0", "-c", "copy",
+                 "-movflags", "+faststart", str(tmp)],
+                capture_output=True, text=True, timeout=self.timeout,
+            )
+            if r.returncode != 0 or not tmp.is_file():
+                return False
+            # Fișier nou (nu suprascriere): hardlink-urile către conținutul vechi rămân neatinse
+            os.replace(tmp, path)
+            return True
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    def run(self, team_dir: Path, src: str) -> dict:
+        """Remux to faststart if needed, probe and write the sidecar. Returns the sidecar data."""
+        path = team_dir / src
+        remuxed = False
+        layout = mp4_layout(path) if path.suffix.lower() in MP4_EXT else None
+        if layout is not None and not layout["faststart"]:
+            remuxed = self._remux_faststart(path)
+        meta = self.probe(path)
+        meta.update({
+            "path": src,
+            "bytes": path.stat().st_size,
+            "faststart": True if remuxed else (layout or {}).get("faststart"),
+            "remuxed": remuxed,
+        })
+        out_dir = team_dir / derived_dir(src)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        (out_dir / "meta.json").write_text(json.dumps(meta, indent=2, ensure_ascii=False), encoding="utf-8")
+        return meta
+
+    @staticmethod
+    def read(team_dir: Path, src: str) -> Optional[dict]:
+        try:
+            return json.loads((team_dir / derived_dir(src) / "meta.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
@@ -0,0 +1,347 @@
+"""
+Index în memorie al directorului WORKSPACE (echipe, secțiuni, mtime-uri playlist/content.json,
+fișiere media cu dimensiuni), construit o singură dată la pornire.
+
+Actualizarea se face incremental: din evenimentele watchdog (dacă pachetul e instalat), din
+endpoint-urile care scriu în WORKSPACE (refresh explicit) și printr-o rescanare completă periodică.
+"""
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # watchdog e opțional: fără el rămâne doar rescanarea periodică
+    FileSystemEventHandler = object
+    Observer = None
+
+from metrics import REGISTRY
+
+SCAN_SECONDS = REGISTRY.histogram("workspace_scan_seconds", "Full WORKSPACE index rescan duration.")
+
+
+class _Team:
+    __slots__ = ("playlist_mtime", "sections", "files", "dirs")
+
+    def __init__(self):
+        self.playlist_mtime: Optional[float] = None
+        self.sections: dict = {}  # section -> content.json mtime (None = folder fără content.json)
+        self.files: dict = {}  # "photos/x.png" -> size
+        self.dirs: set = set()  # "documents/folder"
+
+    def copy(self) -> "_Team":
+        t = _Team()
+        t.playlist_mtime = self.playlist_mtime
+        t.sections = dict(self.sections)
+        t.files = dict(self.files)
+        t.dirs = set(self.dirs)
+        return t
+
+
+def _diff(old: Optional[_Team], new: Optional[_Team], limit: int = 200) -> list:
+    """[(event type, data)] between two states of a team (playlist / section / media changes)."""
+    if old is None and new is None:
+        return []
+    if old is None:
+        return [("team.added", {})]
+    if new is None:
+        return [("team.removed", {})]
+    out = []
+    if old.playlist_mtime != new.playlist_mtime:
+        out.append(("playlist.changed", {}))
+    for sec in sorted(set(old.sections) | set(new.sections)):
+        if old.sections.get(sec) != new.sections.get(sec):
+            out.append(("section.changed", {"section": sec}))
+    added = sorted(k for k, size in new.files.items() if old.files.get(k) != size)
+    removed = sorted(k for k in old.files if k not in new.files)
+    if added:
+        out.append(("media.added", {"paths": added[:limit], "count": len(added)}))
+    if removed:
+        out.append(("media.removed", {"paths": removed[:limit], "count": len(removed)}))
+    return out
+
+
+def _mtime(path: Path) -> Optional[float]:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return None
+
+
+# Doar evenimentele care pot modifica indexul; opened / closed_no_write (citiri, send_file) sunt ignorate
+_WRITE_EVENTS = ("created", "deleted", "moved", "modified", "closed")
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, index: "WorkspaceIndex"):
+        self.index = index
+
+    def on_any_event(self, event):
+        if event.event_type not in _WRITE_EVENTS:
+            return
+        for attr in ("src_path", "dest_path"):
+            path = getattr(event, attr, None)
+            if path:
+                self.index._mark_dirty(Path(os.fsdecode(path)))
+
+
+class WorkspaceIndex:
+    """
+    Thread-safe snapshot of the WORKSPACE tree; readers never touch the disk.
+    Scans run outside the lock on a copy; the result is committed only if the team's generation
+    did not move meanwhile (committed _Team objects are never mutated).
+    """
+
+    def __init__(self, root: Path, section_dirs: Iterable[str], media_dirs: Iterable[str],
+                 rescan_seconds: float = 300, debounce_seconds: float = 0.5):
+        self.root = root
+        self.section_dirs = tuple(section_dirs)
+        self.media_dirs = tuple(media_dirs)
+        self.rescan_seconds = max(0.0, rescan_seconds)
+        self.debounce_seconds = debounce_seconds
+        self._teams: dict = {}
+        self._gens: dict = {}  # team -> generație, crește la fiecare commit (și la ștergere)
+        self._lock = threading.RLock()
+        self._dirty: set = set()
+        self._dirty_event = threading.Event()
+        self._observer = None
+        self._started = False
+        # on_change(team, event type, data): apelat după fiecare modificare detectată (ex. flux SSE)
+        self.on_change: Optional[Callable[[str, str, dict], None]] = None
+        self._stats = {"fullScans": 0, "lastFullScan": None, "lastFullScanSeconds": None, "partialScans": 0}
+
+    @classmethod
+    def from_env(cls, root: Path, section_dirs: Iterable[str], media_dirs: Iterable[str]) -> "WorkspaceIndex":
+        """WORKSPACE_INDEX_RESCAN_SECONDS: full rescan interval (default 300; 0 = only at startup)."""
+        try:
+            rescan = float(os.environ.get("WORKSPACE_INDEX_RESCAN_SECONDS", "").strip() or 300)
+        except ValueError:
+            rescan = 300
+        return cls(root, section_dirs, media_dirs, rescan_seconds=rescan)
+
+    # ---------- pornire / oprire ----------
+    def start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self.rescan()
+        if Observer is not None and self.root.is_dir():
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_EventHandler(self), str(self.root), recursive=True)
+                self._observer.daemon = True
+                self._observer.start()
+            except Exception:
+                self._observer = None
+        threading.Thread(target=self._dirty_worker, name="workspace-index-events", daemon=True).start()
+        if self.rescan_seconds:
+            threading.Thread(target=self._rescan_worker, name="workspace-index-rescan", daemon=True).start()
+
+    def stop(self) -> None:
+        if self._observer is not None:
+            try:
+                self._observer.stop()
+            except Exception:
+                pass
+            self._observer = None
+
+    def _rescan_worker(self) -> None:
+        while True:
+            time.sleep(self.rescan_seconds)
+            try:
+                self.rescan()
+            except Exception:
+                pass
+
+    def _dirty_worker(self) -> None:
+        while True:
+            self._dirty_event.wait()
+            time.sleep(self.debounce_seconds)  # grupează rafalele (ex. 80 de pagini scrise la conversie)
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+                self._dirty_event.clear()
+            for team, top in dirty:
+                try:
+                    self.refresh(team, top)
+                except Exception:
+                    pass
+
+    def _mark_dirty(self, path: Path) -> None:
+        try:
+            parts = path.relative_to(self.root).parts
+        except ValueError:
+            return
+        if not parts or parts[0].startswith("."):
+            return
+        top = parts[1] if len(parts) > 1 else None
+        with self._lock:
+            self._dirty.add((parts[0], top))
+            self._dirty_event.set()
+
+    # ---------- scanare ----------
+    def rescan(self) -> None:
+        """Full rescan of the workspace (startup, periodic fallback, after git pull)."""
+        t0 = time.perf_counter()
+        with self._lock:
+            gens = dict(self._gens)
+        teams = {}
+        if self.root.is_dir():
+            for d in self.root.iterdir():
+                if d.is_dir() and not d.name.startswith("."):
+                    teams[d.name] = self._scan_team(d)
+        changes, moved = [], []
+        with self._lock:
+            first = self._stats["fullScans"] == 0
+            for name in sorted(set(self._teams) | set(teams)):
+                if self._gens.get(name, 0) != gens.get(name, 0):
+                    # Echipa a fost reîmprospătată în timpul parcurgerii: rezultatul nostru e deja vechi
+                    moved.append(name)
+                    continue
+                old, new = self._teams.get(name), teams.get(name)
+                self._commit(name, new)
+                changes.append((name, _diff(old, new)))
+            self._stats["fullScans"] += 1
+            self._stats["lastFullScan"] = time.time()
+            self._stats["lastFullScanSeconds"] = round(time.perf_counter() - t0, 4)
+        SCAN_SECONDS.observe(time.perf_counter() - t0)
+        if not first:
+            for name, diff in changes:
+                self._emit(name, diff)
+        for name in moved:
+            self.refresh(name)
+
+    def _commit(self, team: str, state: Optional[_Team]) -> None:
+        """Install a new state for the team (None = removed) and bump its generation; caller holds the lock."""
+        if state is None:
+            self._teams.pop(team, None)
+        else:
+            self._teams[team] = state
+        self._gens[team] = self._gens.get(team, 0) + 1
+
+    def _emit(self, team: str, changes: list) -> None:
+        if self.on_change is None:
+            return
+        for kind, data in changes:
+            try:
+                self.on_change(team, kind, data)
+            except Exception:
+                pass
+
+    def _scan_team(self, team_dir: Path) -> _Team:
+        t = _Team()
+        t.playlist_mtime = _mtime(team_dir / "playlist.json")
+        for sec in self.section_dirs:
+            self._scan_section(team_dir, sec, t)
+        for sub in self.media_dirs:
+            self._scan_media(team_dir, sub, t)
+        return t
+
+    def _scan_section(self, team_dir: Path, sec: str, t: _Team) -> None:
+        if (team_dir / sec).is_dir():
+            t.sections[sec] = _mtime(team_dir / sec / "content.json")
+        else:
+            t.sections.pop(sec, None)
+
+    def _scan_media(self, team_dir: Path, sub: str, t: _Team) -> None:
+        prefix = sub + "/"
+        t.files = {k: v for k, v in t.files.items() if not k.startswith(prefix)}
+        t.dirs = {d for d in t.dirs if not (d == sub or d.startswith(prefix))}
+        base = team_dir / sub
+        if not base.is_dir():
+            return
+        for root, dirs, files in os.walk(base):
+            rel_root = Path(root).relative_to(team_dir).as_posix()
+            for d in dirs:
+                t.dirs.add(f"{rel_root}/{d}")
+            for f in files:
+                try:
+                    t.files[f"{rel_root}/{f}"] = (Path(root) / f).stat().st_size
+                except OSError:
+                    pass
+
+    def refresh(self, team: str, top: Optional[str] = None) -> None:
+        """Re-read one team (top=None) or just one of its entries (playlist.json, a section, a media dir)."""
+        team_dir = self.root / team
+        with self._lock:
+            self._stats["partialScans"] += 1
+        for _attempt in range(3):
+            with self._lock:
+                gen = self._gens.get(team, 0)
+                before = self._teams.get(team)
+            # Discul se citește fără lock, pe o copie; cititorii văd starea anterioară până la commit
+            if not team_dir.is_dir():
+                after = None
+            elif before is None or top is None:
+                after = self._scan_team(team_dir)
+            else:
+                after = before.copy()
+                if top == "playlist.json":
+                    after.playlist_mtime = _mtime(team_dir / "playlist.json")
+                # "stretching" e și secțiune, și folder media
+                if top in self.section_dirs:
+                    self._scan_section(team_dir, top, after)
+                if top in self.media_dirs:
+                    self._scan_media(team_dir, top, after)
+            with self._lock:
+                if self._gens.get(team, 0) == gen:
+                    self._commit(team, after)
+                    break
+            # Alt refresh / rescan a câștigat între timp: se recitește toată echipa peste starea lui
+            top = None
+        else:
+            return
+        self._emit(team, _diff(before, after) if self.on_change is not None else [])
+
+    # ---------- citire ----------
+    def teams(self) -> list:
+        with self._lock:
+            return sorted(self._teams)
+
+    def has_team(self, team: str) -> bool:
+        with self._lock:
+            return team in self._teams
+
+    def playlist_mtime(self, team: str) -> Optional[float]:
+        with self._lock:
+            t = self._teams.get(team)
+            return t.playlist_mtime if t else None
+
+    def section_mtime(self, team: str, section: str) -> Optional[float]:
+        with self._lock:
+            t = self._teams.get(team)
+            return t.sections.get(section) if t else None
+
+    def teams_with_content(self, section: str) -> list:
+        """Teams whose <section>/content.json exists, sorted."""
+        with self._lock:
+            return sorted(n for n, t in self._teams.items() if t.sections.get(section) is not None)
+
+    def media(self, team: str, subdirs: Optional[Iterable[str]] = None) -> tuple:
+        """(files {rel: size}, dirs set) for the team, optionally limited to some media subdirs."""
+        with self._lock:
+            t = self._teams.get(team)
+            if t is None:
+                return {}, set()
+            files, dirs = dict(t.files), set(t.dirs)
+        if subdirs is not None:
+            prefixes = tuple(s + "/" for s in subdirs)
+            files = {k: v for k, v in files.items() if k.startswith(prefixes)}
+            dirs = {d for d in dirs if d.startswith(prefixes)}
+        return files, dirs
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out.update({
+                "teams": len(self._teams),
+                "files": sum(len(t.files) for t in self._teams.values()),
+                "bytes": sum(sum(t.files.values()) for t in self._teams.values()),
+                "watcher": "watchdog" if self._observer is not None else None,
+                "rescanSeconds": self.rescan_seconds,
+                "pendingEvents": len(self._dirty),
+            })
+        return out